@@ -0,0 +1,65 @@
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import threading
+from typing import Any, Dict, List, Tuple
+
+# lookups are resolved once per session (and PATH); see use_cache() for persisting probes
+_paths: Dict[Tuple[str, str], str | None] = {}
+_outputs: Dict[str, str] = {}
+_lock = threading.Lock()
+_cache: Any = None
+_cache_key = "pytest-kubernetes/binaries"
+
+
+def use_cache(cache: Any) -> None:
+    """Persist the output of probes in a pytest cache (keyed by binary path and mtime)"""
+    global _cache
+    _cache = cache
+
+
+def which(name: str) -> str | None:
+    """shutil.which(), cached per name and PATH"""
+    key = (name, os.environ.get("PATH", ""))
+    if key not in _paths:
+        _paths[key] = shutil.which(name)
+    return _paths[key]
+
+
+def probe(name: str, arguments: List[str], timeout: int = 10) -> str:
+    """The output of a binary for arguments that do not depend on state, like '--version'
+
+    The output is cached for the binary's path and modification time, so that it is probed
+    again after the binary was updated. Returns an empty string if the binary is missing.
+    """
+    path = which(name)
+    if not path:
+        return ""
+    stat = Path(path).stat()
+    key = json.dumps([path, stat.st_mtime_ns, stat.st_size] + arguments)
+    with _lock:
+        if key not in _outputs and _cache is not None:
+            _outputs.update(_cache.get(_cache_key, {}))
+        if key not in _outputs:
+            _outputs[key] = subprocess.run(
+                [path] + arguments,
+                capture_output=True,
+                check=True,
+                timeout=timeout,
+            ).stdout.decode("utf-8")
+            if _cache is not None:
+                # forget the probes of earlier versions of this binary
+                persisted = {
+                    k: v
+                    for k, v in _cache.get(_cache_key, {}).items()
+                    if not _same_probe(k, path, arguments)
+                }
+                _cache.set(_cache_key, persisted | {key: _outputs[key]})
+        return _outputs[key]
+
+
+def _same_probe(key: str, path: str, arguments: List[str]) -> bool:
+    entry = json.loads(key)
+    return bool(entry[0] == path and entry[3:] == arguments)
@@ -0,0 +1,464 @@
+import asyncio
+import base64
+import http.client
+import json
+import ssl
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import urlencode, urlparse
+
+import yaml
+
+
+def backoff(
+    timeout: float, initial: float = 0.005, maximum: float = 1.0
+) -> Iterator[float]:
+    """Yield exponentially growing delays until the timeout (in seconds) is exhausted.
+
+    The caller is expected to sleep for the yielded delay after each failed attempt.
+    The last delay is cut to the remaining time, so the loop never overshoots the timeout.
+    """
+    deadline = monotonic() + timeout
+    delay = initial
+    while True:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return
+        yield min(delay, remaining)
+        delay = min(delay * 2, maximum)
+
+
+@dataclass(frozen=True)
+class APIResource:
+    """A resource type served by the API server, as found by discovery."""
+
+    group: str
+    version: str
+    name: str
+    kind: str
+    namespaced: bool
+    singular_name: str = ""
+    short_names: Tuple[str, ...] = ()
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.name, self.singular_name, self.kind.lower()) + self.short_names
+
+    @property
+    def api_version(self) -> str:
+        return f"{self.group}/{self.version}" if self.group else self.version
+
+    @property
+    def qualified_name(self) -> str:
+        """The name kubectl prints for this resource, e.g. 'deployment.apps'"""
+        kind = self.kind.lower()
+        return f"{kind}.{self.group}" if self.group else kind
+
+    def path(self, namespace: str | None = None, name: str | None = None) -> str:
+        path = f"/apis/{self.api_version}" if self.group else f"/api/{self.version}"
+        if self.namespaced and namespace:
+            path += f"/namespaces/{namespace}"
+        path += f"/{self.name}"
+        if name:
+            path += f"/{name}"
+        return path
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """An HTTPS connection that verifies the certificate against tls-server-name, if set."""
+
+    server_hostname: str | None = None
+
+    def connect(self) -> None:
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(  # type: ignore
+            self.sock, server_hostname=self.server_hostname or self.host
+        )
+
+
+class KubernetesClient:
+    """A minimal HTTPS client for the Kubernetes API server, built from a kubeconfig.
+
+    Only static credentials are supported (client certificates, bearer tokens and basic auth).
+    Kubeconfigs that rely on exec or auth-provider plugins raise a RuntimeError, so callers
+    can fall back to the kubectl binary. Connections are kept alive and reused per thread.
+    """
+
+    def __init__(self, kubeconfig: Path, context: str | None = None) -> None:
+        config = yaml.safe_load(Path(kubeconfig).read_text()) if kubeconfig else None
+        if not isinstance(config, dict):
+            raise RuntimeError(f"The kubeconfig '{kubeconfig}' is empty or invalid")
+        base_path = Path(kubeconfig).parent
+        context_name = context or config.get("current-context")
+        _context, cluster, user = self._select(config, context_name)
+
+        server = urlparse(cluster.get("server", ""))
+        if server.scheme not in ["http", "https"] or not server.hostname:
+            raise RuntimeError(
+                f"Unsupported API server address: {cluster.get('server')}"
+            )
+        self.server = cluster["server"]
+        self.namespace = _context.get("namespace") or "default"
+        self._scheme = server.scheme
+        self._host = server.hostname
+        self._port = server.port or (443 if server.scheme == "https" else 80)
+        self._base_path = server.path.rstrip("/")
+        self._server_hostname = cluster.get("tls-server-name")
+        self._headers: Dict[str, str] = {"Accept": "application/json"}
+        self._ssl_context = (
+            self._build_ssl_context(cluster, user, base_path)
+            if server.scheme == "https"
+            else None
+        )
+        self._set_credentials(user, base_path)
+        self._local = threading.local()
+        self._discovery_lock = threading.Lock()
+        self._group_versions: Dict[str, List[APIResource]] = {}
+        self._preferred: List[str] | None = None
+
+    @staticmethod
+    def _select(config: Dict, context_name: str | None) -> Tuple[Dict, Dict, Dict]:
+        def by_name(section: str, name: str | None) -> Dict:
+            for entry in config.get(section) or []:
+                if entry.get("name") == name:
+                    return entry.get(section[:-1]) or {}
+            raise RuntimeError(f"Entry '{name}' not found in kubeconfig {section}")
+
+        context = by_name("contexts", context_name)
+        cluster = by_name("clusters", context.get("cluster"))
+        user = by_name("users", context.get("user")) if context.get("user") else {}
+        if "exec" in user or "auth-provider" in user:
+            raise RuntimeError("Kubeconfig credential plugins are not supported")
+        return context, cluster, user
+
+    @staticmethod
+    def _read(entry: Dict, key: str, base_path: Path) -> bytes | None:
+        """Read an inline (*-data) or file-based kubeconfig value."""
+        if entry.get(f"{key}-data"):
+            return base64.b64decode(entry[f"{key}-data"])
+        if entry.get(key):
+            return (base_path / Path(entry[key]).expanduser()).read_bytes()
+        return None
+
+    def _build_ssl_context(
+        self, cluster: Dict, user: Dict, base_path: Path
+    ) -> ssl.SSLContext:
+        context = ssl.create_default_context()
+        if cluster.get("insecure-skip-tls-verify"):
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        else:
+            ca = self._read(cluster, "certificate-authority", base_path)
+            if ca:
+                context.load_verify_locations(cadata=ca.decode("utf-8"))
+        cert = self._read(user, "client-certificate", base_path)
+        key = self._read(user, "client-key", base_path)
+        if cert and key:
+            # the ssl module only loads certificate chains from files
+            with tempfile.TemporaryDirectory() as tmp:
+                cert_file, key_file = Path(tmp) / "client.crt", Path(tmp) / "client.key"
+                cert_file.write_bytes(cert)
+                key_file.write_bytes(key)
+                context.load_cert_chain(cert_file, key_file)
+        return context
+
+    def _set_credentials(self, user: Dict, base_path: Path) -> None:
+        token = user.get("token")
+        if not token and user.get("tokenFile"):
+            token = (base_path / Path(user["tokenFile"])).read_text().strip()
+        if token:
+            self._headers["Authorization"] = f"Bearer {token}"
+        elif user.get("username") and user.get("password"):
+            basic = base64.b64encode(
+                f"{user['username']}:{user['password']}".encode("utf-8")
+            ).decode("ascii")
+            self._headers["Authorization"] = f"Basic {basic}"
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self._ssl_context is None:
+            return http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+        connection = _HTTPSConnection(
+            self._host, self._port, timeout=timeout, context=self._ssl_context
+        )
+        connection.server_hostname = self._server_hostname
+        return connection
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._new_connection(timeout)
+            self._local.connection = connection
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _url(self, path: str, params: Dict | None = None) -> str:
+        query = f"?{urlencode(params)}" if params else ""
+        return f"{self._base_path}{path}{query}"
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Dict | None = None,
+        body: bytes | None = None,
+        headers: Dict[str, str] | None = None,
+        timeout: float = 60,
+    ) -> Tuple[int, bytes]:
+        """Send a request over the pooled connection, return status code and body"""
+        _headers = self._headers | (headers or {})
+        url = self._url(path, params)
+        for attempt in range(2):
+            connection = self._connection(timeout)
+            try:
+                connection.request(method, url, body=body, headers=_headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError) as e:
+                # a kept-alive connection may have been closed by the server: retry once
+                connection.close()
+                if attempt:
+                    raise RuntimeError(
+                        f"Request to {self.server} failed: {e}"
+                    ) from None
+            except OSError as e:
+                connection.close()
+                raise RuntimeError(f"Request to {self.server} failed: {e}") from None
+        raise RuntimeError(f"Request to {self.server} failed")  # pragma: no cover
+
+    def get(self, path: str, params: Dict | None = None, timeout: float = 60) -> Dict:
+        """Get an API object as dict"""
+        status, data = self.request("GET", path, params, timeout=timeout)
+        if status >= 400:
+            raise RuntimeError(self._error_message(status, data))
+        return json.loads(data)  # type: ignore
+
+    def open_stream(
+        self, path: str, params: Dict | None = None, timeout: float | None = 60
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a GET request on a dedicated connection; the caller has to close the connection"""
+        connection = self._new_connection(timeout)  # type: ignore
+        try:
+            connection.request("GET", self._url(path, params), headers=self._headers)
+            response = connection.getresponse()
+            if response.status >= 400:
+                raise RuntimeError(
+                    self._error_message(response.status, response.read())
+                )
+        except OSError as e:
+            connection.close()
+            raise RuntimeError(f"Request to {self.server} failed: {e}") from None
+        except RuntimeError:
+            connection.close()
+            raise
+        return connection, response
+
+    async def open_upgrade(
+        self,
+        path: str,
+        params: Dict | None = None,
+        headers: Dict[str, str] | None = None,
+        timeout: float = 60,
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, Dict[str, str]]:
+        """Send a GET request asking to switch protocols (e.g. to a WebSocket) on a new asyncio
+        connection; return the connection and the (lower-cased) response headers"""
+        server_hostname = self._server_hostname or self._host
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self._host,
+                    self._port,
+                    ssl=self._ssl_context,
+                    server_hostname=server_hostname if self._ssl_context else None,
+                ),
+                timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RuntimeError(f"Request to {self.server} failed: {e}") from None
+        _headers = (
+            {"Host": f"{self._host}:{self._port}"}
+            | self._headers
+            | (headers or {})
+            | {"Connection": "Upgrade"}
+        )
+        request = f"GET {self._url(path, params)} HTTP/1.1\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in _headers.items()
+        )
+        try:
+            writer.write(request.encode("latin-1") + b"\r\n")
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+            status_line, *lines = head.decode("latin-1").split("\r\n")
+            status = int(status_line.split(" ")[1])
+            response_headers = {
+                k.strip().lower(): v.strip()
+                for k, _, v in (line.partition(":") for line in lines if line)
+            }
+            if status != 101:
+                length = int(response_headers.get("content-length", 0))
+                body = await asyncio.wait_for(reader.read(length), timeout)
+                raise RuntimeError(self._error_message(status, body))
+        except (
+            OSError,
+            ValueError,
+            IndexError,
+            asyncio.TimeoutError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+        ) as e:
+            writer.close()
+            raise RuntimeError(f"Request to {self.server} failed: {e}") from None
+        except RuntimeError:
+            writer.close()
+            raise
+        return reader, writer, response_headers
+
+    def stream(
+        self, path: str, params: Dict | None = None, timeout: float = 60
+    ) -> Iterator[bytes]:
+        """Stream a response line by line on a dedicated connection"""
+        connection, response = self.open_stream(path, params, timeout)
+        try:
+            while line := response.readline():
+                yield line
+        except OSError as e:
+            raise RuntimeError(f"Request to {self.server} failed: {e}") from None
+        finally:
+            connection.close()
+
+    def watch(
+        self, path: str, params: Dict | None = None, timeout: float = 60
+    ) -> Iterator[Dict]:
+        """Watch a collection and yield the watch events"""
+        _params = (params or {}) | {
+            "watch": "1",
+            "timeoutSeconds": str(max(int(timeout), 1)),
+        }
+        for line in self.stream(path, _params, timeout=timeout + 1):
+            if line.strip():
+                yield json.loads(line)
+
+    def wait_for_object(self, path: str, name: str, timeout: float = 60) -> bool:
+        """Wait until an object with this name exists in a collection"""
+        params = {"fieldSelector": f"metadata.name={name}"}
+        deadline = monotonic() + timeout
+        collection = self.get(path, params, timeout=timeout)
+        if collection.get("items"):
+            return True
+        params["resourceVersion"] = collection["metadata"].get("resourceVersion", "")
+        while (remaining := deadline - monotonic()) > 0:
+            try:
+                for event in self.watch(path, params, timeout=remaining):
+                    if event.get("type") in ["ADDED", "MODIFIED"]:
+                        return True
+                    if event.get("type") == "ERROR":
+                        # e.g. 410 Gone: the resource version is too old to resume from
+                        break
+            except RuntimeError:
+                pass
+            if (remaining := deadline - monotonic()) <= 0:
+                return False
+            # the watch ended early or failed; list again and resume from a fresh version
+            collection = self.get(
+                path, params | {"resourceVersion": ""}, timeout=remaining
+            )
+            if collection.get("items"):
+                return True
+            params["resourceVersion"] = collection["metadata"].get(
+                "resourceVersion", ""
+            )
+            sleep(min(0.05, max(deadline - monotonic(), 0)))
+        return False
+
+    def _discover_group_version(self, group_version: str) -> List[APIResource]:
+        if group_version not in self._group_versions:
+            group, _, version = group_version.rpartition("/")
+            path = f"/apis/{group_version}" if group else f"/api/{version}"
+            self._group_versions[group_version] = [
+                APIResource(
+                    group,
+                    version,
+                    r["name"],
+                    r["kind"],
+                    bool(r.get("namespaced")),
+                    r.get("singularName") or r["kind"].lower(),
+                    tuple(r.get("shortNames") or []),
+                )
+                for r in self.get(path).get("resources", [])
+                if "/" not in r["name"]
+            ]
+        return self._group_versions[group_version]
+
+    def _preferred_group_versions(self) -> List[str]:
+        if self._preferred is None:
+            groups = self.get("/apis").get("groups", [])
+            self._preferred = ["v1"] + [
+                g["preferredVersion"]["groupVersion"] for g in groups
+            ]
+        return self._preferred
+
+    def invalidate_discovery(self) -> None:
+        """Forget all discovered resources, e.g. after a CRD was applied"""
+        with self._discovery_lock:
+            self._group_versions = {}
+            self._preferred = None
+
+    def resource(self, name: str) -> APIResource:
+        """Resolve a resource name as accepted by kubectl (plural, singular, kind, short name)"""
+        name, _, group = name.lower().partition(".")
+        for refresh in [False, True]:
+            if refresh:
+                self.invalidate_discovery()
+            with self._discovery_lock:
+                for group_version in self._preferred_group_versions():
+                    if group and group_version.rpartition("/")[0] != group:
+                        continue
+                    for resource in self._discover_group_version(group_version):
+                        if name in resource.names:
+                            return resource
+        raise RuntimeError(f'the server doesn\'t have a resource type "{name}"')
+
+    def _by_kind(self, group_version: str, kind: str) -> APIResource | None:
+        for resource in self._discover_group_version(group_version):
+            if resource.kind == kind:
+                return resource
+        return None
+
+    def resource_for(self, api_version: str, kind: str) -> APIResource:
+        """Resolve the resource of a manifest from its apiVersion and kind"""
+        for refresh in [False, True]:
+            if refresh:
+                self.invalidate_discovery()
+            with self._discovery_lock:
+                try:
+                    resource = self._by_kind(api_version, kind)
+                except RuntimeError:
+                    resource = None
+            if resource:
+                return resource
+        raise RuntimeError(f'no matches for kind "{kind}" in version "{api_version}"')
+
+    def readyz(self, timeout: float = 5) -> bool:
+        """Probe the readyz endpoint of the API server"""
+        try:
+            status, _ = self.request("GET", "/readyz", timeout=timeout)
+        except RuntimeError:
+            return False
+        return status == 200
+
+    @staticmethod
+    def _error_message(status: int, data: bytes) -> str:
+        try:
+            return str(json.loads(data).get("message", data.decode("utf-8")))
+        except (ValueError, AttributeError):
+            return f"API request failed with status {status}: {data.decode('utf-8')}"
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
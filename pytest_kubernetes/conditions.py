@@ -0,0 +1,341 @@
+from dataclasses import dataclass
+import json
+import re
+import threading
+from time import monotonic
+from typing import Any, Dict, List, Tuple
+
+from pytest_kubernetes.client import APIResource, KubernetesClient
+
+# container states a pod does not recover from without a change of its spec
+FAILURE_REASONS = [
+    "ImagePullBackOff",
+    "ErrImageNeverPull",
+    "InvalidImageName",
+    "CreateContainerConfigError",
+    "CreateContainerError",
+]
+WORKLOAD_KINDS = ["Deployment", "StatefulSet", "DaemonSet", "ReplicaSet", "Job"]
+
+_SEGMENT = re.compile(
+    r"\.([^.\[]+)|\[(\d+|\*)\]|\[\?\(@\.([\w.]+)\s*==\s*[\"']?([^\"')]*)[\"']?\)\]"
+)
+
+
+def jsonpath(obj: Any, expression: str) -> List[Any]:
+    """Evaluate a (simple) kubectl JSONPath expression like '{.status.conditions[?(@.type=="Ready")].status}'"""
+    expression = expression.strip().strip("'\"").strip()
+    if expression.startswith("{") and expression.endswith("}"):
+        expression = expression[1:-1]
+    values = [obj]
+    position = 0
+    while position < len(expression):
+        match = _SEGMENT.match(expression, position)
+        if not match:
+            raise ValueError(f"Unsupported JSONPath expression: {expression}")
+        field, index, filter_field, filter_value = match.groups()
+        selected = []
+        for value in values:
+            if field is not None and isinstance(value, dict) and field in value:
+                selected.append(value[field])
+            elif index == "*" and isinstance(value, list):
+                selected.extend(value)
+            elif index is not None and index != "*" and isinstance(value, list):
+                if int(index) < len(value):
+                    selected.append(value[int(index)])
+            elif filter_field is not None and isinstance(value, list):
+                selected.extend(
+                    item
+                    for item in value
+                    if _text(jsonpath(item, "." + filter_field)) == filter_value
+                )
+        values = selected
+        position = match.end()
+    return values
+
+
+def _text(values: List[Any]) -> str | None:
+    if not values:
+        return None
+    value = values[0]
+    if isinstance(value, bool):
+        return str(value).lower()
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _rollout_complete(obj: Dict) -> bool:
+    """The criteria of 'kubectl rollout status' for Deployments, StatefulSets and DaemonSets"""
+    spec, status = obj.get("spec", {}), obj.get("status", {})
+    if status.get("observedGeneration", 0) < obj["metadata"].get("generation", 0):
+        return False
+    if obj["kind"] == "DaemonSet":
+        desired = status.get("desiredNumberScheduled", 0)
+        return bool(
+            status.get("updatedNumberScheduled", 0) == desired
+            and status.get("numberAvailable", 0) == desired
+        )
+    replicas = spec.get("replicas", 1)
+    if obj["kind"] == "StatefulSet":
+        return bool(
+            status.get("readyReplicas", 0) == replicas
+            and status.get("updatedReplicas", 0) == replicas
+        )
+    return bool(
+        status.get("updatedReplicas", 0) == replicas
+        and status.get("replicas", 0) == replicas
+        and status.get("availableReplicas", 0) == replicas
+    )
+
+
+def satisfied(obj: Dict | None, condition: str) -> bool:
+    """Check a condition in the syntax of 'kubectl wait --for' (and 'rollout') against an object"""
+    if condition == "delete":
+        return obj is None
+    if obj is None:
+        return False
+    if condition == "create":
+        return True
+    if condition in ["rollout", "rollout complete"]:
+        return _rollout_complete(obj)
+    if condition.startswith("condition="):
+        condition_type, _, expected = condition[len("condition=") :].partition("=")
+        return any(
+            c.get("type", "").lower() == condition_type.lower()
+            and c.get("status", "").lower() == (expected or "true").lower()
+            for c in obj.get("status", {}).get("conditions", [])
+        )
+    if condition.startswith("jsonpath="):
+        expression = condition[len("jsonpath=") :]
+        value: str | None = None
+        if "}" in expression and not expression.rstrip("'\"").endswith("}"):
+            expression, _, value = expression.rpartition("=")
+        values = jsonpath(obj, expression)
+        if value is None:
+            return bool(values)
+        return _text(values) == value.strip("'\"")
+    raise ValueError(f"Unsupported condition: {condition}")
+
+
+def supported(condition: str) -> bool:
+    try:
+        satisfied({"kind": "", "metadata": {}}, condition)
+    except ValueError:
+        return False
+    return True
+
+
+def _pod_failure(pod: Dict) -> str | None:
+    status = pod.get("status", {})
+    for container in status.get("initContainerStatuses", []) + status.get(
+        "containerStatuses", []
+    ):
+        waiting = container.get("state", {}).get("waiting", {})
+        if waiting.get("reason") in FAILURE_REASONS:
+            return (
+                f"pod/{pod['metadata']['name']} container {container['name']} is in "
+                f"{waiting['reason']}: {waiting.get('message', '')}".rstrip(": ")
+            )
+    return None
+
+
+def failure(obj: Dict | None) -> str | None:
+    """A reason why an object will not become ready without intervention; None if there is none"""
+    if obj is None:
+        return None
+    name = f"{obj['kind'].lower()}/{obj['metadata']['name']}"
+    if obj["kind"] == "Pod":
+        if obj.get("status", {}).get("phase") == "Failed":
+            return f"{name} failed"
+        return _pod_failure(obj)
+    for c in obj.get("status", {}).get("conditions", []):
+        if (
+            obj["kind"] == "Job"
+            and c.get("type") == "Failed"
+            and c.get("status") == "True"
+        ):
+            return f"{name} failed: {c.get('message', c.get('reason', ''))}"
+        if c.get("reason") == "ProgressDeadlineExceeded":
+            return f"{name} exceeded its progress deadline"
+    return None
+
+
+def _selects(workload: Dict, pod: Dict) -> bool:
+    if pod["metadata"].get("namespace") != workload["metadata"].get("namespace"):
+        return False
+    match_labels = workload.get("spec", {}).get("selector", {}).get("matchLabels")
+    labels = pod["metadata"].get("labels", {})
+    return bool(match_labels) and all(
+        labels.get(k) == v for k, v in match_labels.items()
+    )
+
+
+@dataclass
+class Target:
+    resource: APIResource
+    name: str
+    namespace: str | None
+    condition: str
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        namespace = self.namespace if self.resource.namespaced else None
+        return (self.resource.qualified_name, namespace or "", self.name)
+
+    def __str__(self) -> str:
+        return f"{self.resource.name}/{self.name} ({self.condition})"
+
+
+class Waiter:
+    """Wait for many targets and conditions at once, with one watch per resource type.
+
+    Each resource type (and namespace) is listed and then watched in its own thread. The
+    conditions are evaluated on every change; waiting stops as soon as all of them are met,
+    or one of the targets (or the pods of a targeted workload) failed definitively.
+    """
+
+    def __init__(self, client: KubernetesClient, targets: List[Target]) -> None:
+        self._client = client
+        self._targets = targets
+        self._objects: Dict[Tuple[str, str, str], Dict] = {}
+        self._pods: Dict[Tuple[str, str], Dict] = {}
+        self._listed: set = set()
+        self._errors: List[str] = []
+        self._changed = threading.Condition()
+        self._stopped = False
+
+    def _streams(self) -> Dict[Tuple[APIResource, str | None], List[str]]:
+        streams: Dict[Tuple[APIResource, str | None], List[str]] = {}
+        for target in self._targets:
+            namespace = target.namespace if target.resource.namespaced else None
+            streams.setdefault((target.resource, namespace), []).append(target.name)
+        return streams
+
+    def _store(self, resource: APIResource, obj: Dict, deleted: bool = False) -> None:
+        metadata = obj["metadata"]
+        if resource.kind == "Pod":
+            pod_key = (metadata.get("namespace", ""), metadata["name"])
+            if deleted:
+                self._pods.pop(pod_key, None)
+            else:
+                self._pods[pod_key] = obj
+        key = (resource.qualified_name, metadata.get("namespace", ""), metadata["name"])
+        if deleted:
+            self._objects.pop(key, None)
+        else:
+            self._objects[key] = {"kind": resource.kind} | obj
+
+    def _follow(
+        self,
+        resource: APIResource,
+        namespace: str | None,
+        names: List[str],
+        deadline: float,
+    ) -> None:
+        params = {}
+        if len(names) == 1 and resource.kind != "Pod":
+            params["fieldSelector"] = f"metadata.name={names[0]}"
+        path = resource.path(namespace)
+        try:
+            while not self._stopped and monotonic() < deadline:
+                collection = self._client.get(path, params)
+                with self._changed:
+                    for key in list(self._objects):
+                        if key[0] == resource.qualified_name and key[1] in [
+                            namespace,
+                            "",
+                        ]:
+                            self._objects.pop(key)
+                    if resource.kind == "Pod":
+                        self._pods = {
+                            k: v for k, v in self._pods.items() if k[0] != namespace
+                        }
+                    for item in collection.get("items", []):
+                        self._store(resource, item)
+                    self._listed.add((resource.qualified_name, namespace))
+                    self._changed.notify_all()
+                version = collection["metadata"].get("resourceVersion", "")
+                while not self._stopped and (remaining := deadline - monotonic()) > 0:
+                    # short watches, so that this thread ends soon after waiting stopped
+                    events = self._client.watch(
+                        path,
+                        params
+                        | {"resourceVersion": version, "allowWatchBookmarks": "true"},
+                        timeout=min(remaining, 5),
+                    )
+                    expired = False
+                    for event in events:
+                        if event["type"] == "ERROR":
+                            # the resource version is too old: list again
+                            expired = True
+                            break
+                        version = event["object"]["metadata"].get(
+                            "resourceVersion", version
+                        )
+                        if event["type"] == "BOOKMARK":
+                            continue
+                        with self._changed:
+                            self._store(
+                                resource, event["object"], event["type"] == "DELETED"
+                            )
+                            self._changed.notify_all()
+                    if expired:
+                        break
+        except RuntimeError as e:
+            with self._changed:
+                self._errors.append(str(e))
+                self._changed.notify_all()
+
+    def _failure(self, target: Target, obj: Dict | None) -> str | None:
+        if target.condition == "delete" or "fail" in target.condition.lower():
+            return None
+        reason = failure(obj)
+        if reason is None and obj is not None and obj["kind"] in WORKLOAD_KINDS:
+            for pod in self._pods.values():
+                if _selects(obj, pod) and (reason := _pod_failure(pod)):
+                    break
+        return reason
+
+    def wait(self, timeout: float) -> None:
+        deadline = monotonic() + timeout
+        streams = self._streams()
+        # watch the pods of targeted workloads for failures, too
+        if any(t.resource.kind in WORKLOAD_KINDS for t in self._targets):
+            pods = self._client.resource("pods")
+            for target in self._targets:
+                if target.resource.kind in WORKLOAD_KINDS:
+                    streams.setdefault((pods, target.namespace), [])
+        threads = [
+            threading.Thread(
+                target=self._follow,
+                args=(resource, namespace, names, deadline),
+                daemon=True,
+            )
+            for (resource, namespace), names in streams.items()
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            with self._changed:
+                while True:
+                    if self._errors:
+                        raise RuntimeError(self._errors[0])
+                    pending = []
+                    listed = len(self._listed) == len(streams)
+                    for target in self._targets:
+                        obj = self._objects.get(target.key)
+                        if not listed:
+                            pending.append(target)
+                        elif (reason := self._failure(target, obj)) is not None:
+                            raise RuntimeError(f"Waiting for {target} failed: {reason}")
+                        elif not satisfied(obj, target.condition):
+                            pending.append(target)
+                    if not pending:
+                        return
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(
+                            f"Timed out waiting for {', '.join(map(str, pending))}"
+                        )
+                    self._changed.wait(remaining)
+        finally:
+            self._stopped = True
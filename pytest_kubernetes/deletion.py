@@ -0,0 +1,66 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from pytest_kubernetes.providers.base import AClusterManager
+
+# the number of clusters that are deleted at the same time
+PARALLEL_DELETIONS = 8
+
+
+class DeletionQueue:
+    """Delete clusters in the background, so that tests do not wait for their teardown.
+
+    Up to PARALLEL_DELETIONS clusters are deleted in parallel. A manager for a cluster with
+    the name of a cluster that is still being deleted waits for that deletion before it
+    creates its cluster (see guard()). join() waits for all pending deletions up to a
+    deadline and reports every deletion that failed or did not finish.
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=PARALLEL_DELETIONS, thread_name_prefix="k8s-delete"
+        )
+        # the latest deletion of each cluster, to chain the next deletion to
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._deletions: List[Tuple[str, Future]] = []
+
+    @staticmethod
+    def _key(manager: "AClusterManager") -> Tuple[str, str]:
+        return type(manager).__name__, manager.cluster_name
+
+    def submit(self, manager: "AClusterManager") -> None:
+        """Delete a cluster in the background"""
+        key = self._key(manager)
+        previous = self._pending.get(key)
+
+        def delete():
+            if previous:
+                # a cluster with this name may have been recreated after the previous deletion
+                wait([previous])
+            manager.delete()
+
+        future = self._executor.submit(delete)
+        self._pending[key] = future
+        self._deletions.append((key[1], future))
+
+    def guard(self, manager: "AClusterManager") -> None:
+        """Make a manager wait for the deletion of a cluster with its name before creating"""
+        manager._pending_deletion = self._pending.get(self._key(manager))
+
+    def join(self, timeout: float | None = None) -> List[str]:
+        """Wait for all pending deletions; return the failed and unfinished ones
+
+        No deletions can be submitted afterwards.
+        """
+        deletions, self._deletions, self._pending = self._deletions, [], {}
+        done, _ = wait([future for _, future in deletions], timeout=timeout)
+        # deletions that are still queued are not started anymore
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return [
+            f"Deleting cluster '{name}' failed: {future.exception()}"
+            if future in done
+            else f"Deleting cluster '{name}' did not finish in time"
+            for name, future in deletions
+            if future not in done or future.exception()
+        ]
@@ -0,0 +1,66 @@
+import json
+import subprocess
+from typing import Dict, List, Set
+
+
+def run(arguments: List[str], timeout: int = 600) -> str:
+    """Run a docker command and return its output"""
+    proc = subprocess.run(
+        ["docker"] + arguments,
+        capture_output=True,
+        check=True,
+        timeout=timeout,
+    )
+    return proc.stdout.decode()
+
+
+def image_exists(image: str) -> bool:
+    try:
+        proc = subprocess.run(
+            ["docker", "image", "inspect", image], capture_output=True
+        )
+    except FileNotFoundError:
+        return False
+    return proc.returncode == 0
+
+
+def image_labels(image: str) -> Dict[str, str]:
+    return (
+        json.loads(
+            run(["image", "inspect", "--format", "{{json .Config.Labels}}", image])
+            or "null"
+        )
+        or {}
+    )
+
+
+def containers(*labels: str) -> List[str]:
+    """Names of all containers with the given labels ('key=value')"""
+    filters = [arg for label in labels for arg in ["--filter", f"label={label}"]]
+    return run(["ps", "-a", "--format", "{{.Names}}"] + filters).split()
+
+
+def inspect(container: str, template: str) -> str:
+    return run(["inspect", "--format", template, container]).strip()
+
+
+def stop(container: str) -> None:
+    run(["stop", container])
+
+
+def start(container: str) -> None:
+    run(["start", container])
+
+
+def image_id(image: str) -> str | None:
+    """The ID (config digest) of a local image; None if there is no such image"""
+    try:
+        return run(["image", "inspect", "--format", "{{.Id}}", image]).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def node_image_ids(container: str) -> Set[str]:
+    """The IDs of all images in the container runtime of a Kubernetes node container"""
+    data = json.loads(run(["exec", container, "crictl", "images", "-o", "json"]))
+    return {image["id"] for image in data.get("images", [])}
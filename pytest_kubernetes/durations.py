@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+from pytest_kubernetes.tracing import Span
+
+# the categories of the report, by the operation of the outermost span
+CATEGORIES = {
+    "create": "create",
+    "ready": "ready",
+    "load_image": "load images",
+    "load_images": "load images",
+    "apply": "apply",
+    "apply_many": "apply",
+    "wait": "wait",
+    "port_forwarding": "port-forward",
+    "kubectl": "kubectl",
+}
+# a test (phase) repeating the same kubectl command this often is flagged
+REPETITIVE_CALLS = 10
+# set while a phase of a test runs; threads started without copying the context (like
+# background deletions) are not attributed to any test
+_phase: ContextVar[Tuple[str, str] | None] = ContextVar(
+    "pytest_kubernetes_phase", default=None
+)
+
+
+@contextmanager
+def phase(nodeid: str, when: str) -> Iterator[None]:
+    """Attribute the operations in this context to a phase (setup, call, teardown) of a test"""
+    token = _phase.set((nodeid, when))
+    try:
+        yield
+    finally:
+        _phase.reset(token)
+
+
+def _command(argv: List[str]) -> str:
+    """The verb and resource type of a kubectl call, e.g. 'get pod' for 'kubectl get pod/a -o json'"""
+    words = [arg for arg in argv[1:] if not arg.startswith("-")][:2]
+    if len(words) == 2:
+        words[1] = words[1].partition("/")[0]
+    return " ".join(["kubectl"] + words)
+
+
+class PhaseDurations:
+    def __init__(self) -> None:
+        self.categories: Dict[str, List[float]] = {}  # category: [calls, seconds]
+        self.kubectl_calls = 0
+        self.commands: Dict[str, int] = {}
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.categories.values())
+
+
+class DurationReport:
+    """Attribute the time of cluster operations and kubectl calls to the phases of tests.
+
+    Only the outermost operations are timed (e.g. the kubectl calls of wait() count as
+    'wait'), so that nothing is counted twice; all kubectl calls are counted, though.
+    Concurrent operations are summed up.
+    """
+
+    def __init__(self) -> None:
+        self._phases: Dict[Tuple[str, str], PhaseDurations] = {}
+        self._lock = threading.Lock()
+
+    def start(self, span: Span) -> None:
+        pass
+
+    def finish(self, span: Span) -> None:
+        if span.attributes.get("fallback"):
+            # the kubectl binary call is traced on its own
+            return
+        key = _phase.get() or ("(background)", "")
+        root = span.parent is None
+        with self._lock:
+            durations = self._phases.setdefault(key, PhaseDurations())
+            if span.operation == "kubectl":
+                durations.kubectl_calls += 1
+                if root:
+                    command = _command(span.argv or [])
+                    durations.commands[command] = durations.commands.get(command, 0) + 1
+            if root:
+                category = CATEGORIES.get(span.operation, "other")
+                calls, seconds = durations.categories.get(category, [0, 0.0])
+                durations.categories[category] = [
+                    calls + 1,
+                    seconds + (span.duration or 0),
+                ]
+
+    def lines(self, limit: int) -> List[str]:
+        """The report of the (limit, or all if 0) phases with the most cluster time"""
+        with self._lock:
+            phases = sorted(
+                self._phases.items(), key=lambda item: item[1].total, reverse=True
+            )
+        lines = []
+        for (nodeid, when), durations in phases[: limit or None]:
+            breakdown = ", ".join(
+                f"{category} {int(calls)}x {seconds:.2f}s"
+                for category, (calls, seconds) in sorted(
+                    durations.categories.items(), key=lambda item: -item[1][1]
+                )
+            )
+            lines.append(f"{durations.total:.2f}s {when:<8} {nodeid}")
+            lines.append(
+                f"    {breakdown} ({durations.kubectl_calls} kubectl calls in total)"
+            )
+        return lines
+
+    def repetitive(self) -> List[str]:
+        """Phases of tests that repeat kubectl commands (N+1 patterns)"""
+        with self._lock:
+            phases = list(self._phases.items())
+        return [
+            f"{nodeid} ({when}): {calls}x '{command}'"
+            for (nodeid, when), durations in phases
+            for command, calls in sorted(
+                durations.commands.items(), key=lambda item: -item[1]
+            )
+            if calls >= REPETITIVE_CALLS
+        ]
@@ -0,0 +1,12 @@
+from pytest_kubernetes.tracing import Span
+
+
+def pytest_k8s_operation_start(span: Span) -> None:
+    """Called when an operation of pytest-kubernetes starts, e.g. creating a cluster or a
+    kubectl call. It may be called from other threads than the main thread."""
+
+
+def pytest_k8s_operation_finish(span: Span) -> None:
+    """Called when an operation of pytest-kubernetes finished; span.duration, span.error and
+    (for processes) span.exit_code are set. It may be called from other threads than the
+    main thread."""
@@ -1,33 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import json
-from typing import Dict, Union
+from typing import Any, Callable, Dict, Union
 import os
 from pathlib import Path
-import shutil
 import subprocess
 from typing import List
 
+from pytest_kubernetes import binaries, tracing
+from pytest_kubernetes.client import KubernetesClient
+from pytest_kubernetes.native import NativeKubectl
+
+# runs blocking operations for async callers; larger than asyncio's default executor, so
+# that dozens of waits and port forwardings can be pending at the same time
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="k8s-async")
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in a thread without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, tracing.propagate(partial(func, *args, **kwargs))
+    )
+
 
 class Kubectl:
-    """A wrapper for the kubectl command."""
+    """A wrapper for the kubectl command.
+
+    If an API client is passed, common verbs are run in-process against the API server
+    and everything else falls back to the kubectl binary.
+    """
 
     _kubeconfig = None
     _context = None
+    _cache_dir = None
+    # provider and cluster name for the spans of this object, see tracing
+    trace_labels: Dict[str, str] = {}
 
     def __init__(
         self,
         kubeconfig: Path | None = None,
         context: str | None = None,
         command_prefix: List[str] | None = None,
+        client: KubernetesClient | None = None,
+        cache_dir: Path | None = None,
     ) -> None:
         if kubeconfig is None:
             raise RuntimeError("The kubeconfig is not set. Did you create the cluster?")
         self._kubeconfig = kubeconfig
         self._context = context
         self._prefix = command_prefix
+        self._client = client
+        self._cache_dir = cache_dir
 
     @property
     def _exec_path(self) -> Path:
-        return Path(str(shutil.which("kubectl")).strip())
+        return Path(str(binaries.which("kubectl")).strip())
 
     def _ensure_executable(self) -> None:
         if not self._exec_path:
@@ -46,44 +74,132 @@ class Kubectl:
         args = ["--kubeconfig", str(self._kubeconfig)]
         if self._context:
             args += ["--context", str(self._context)]
+        if self._cache_dir:
+            args += ["--cache-dir", str(self._cache_dir)]
         return args
 
+    def _command(self, arguments: List[str]) -> str:
+        return " ".join(
+            self._get_command_prefix()
+            + [str(self._exec_path)]
+            + self._get_kubeconfig_args()
+            + arguments
+        )
+
+    def popen(self, arguments: List[str]) -> subprocess.Popen:
+        """Start kubectl as a long-running process (e.g. following logs); the caller has to
+        wait for it"""
+        return subprocess.Popen(
+            [str(self._exec_path)] + self._get_kubeconfig_args() + arguments,
+            env=self._get_exec_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
     def _exec(
-        self, arguments: List[str], timeout: int = 60
+        self, arguments: List[str], timeout: int = 60, stdin: bytes | None = None
     ) -> subprocess.CompletedProcess:
-        try:
-            proc = subprocess.run(
-                " ".join(
-                    self._get_command_prefix()
-                    + [str(self._exec_path)]
-                    + self._get_kubeconfig_args()
-                    + arguments
-                ),
-                shell=True,
-                env=self._get_exec_env(),
-                capture_output=True,
-                check=True,
-                timeout=timeout,
-            )
-            return proc
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(e.stderr.decode("utf-8")) from None
+        with tracing.span(
+            "kubectl", argv=["kubectl"] + arguments, **self.trace_labels
+        ) as span:
+            span.bytes_sent = len(stdin or b"")
+            try:
+                proc = subprocess.run(
+                    self._command(arguments),
+                    shell=True,
+                    env=self._get_exec_env(),
+                    input=stdin,
+                    capture_output=True,
+                    check=True,
+                    timeout=timeout,
+                )
+                span.exit_code = proc.returncode
+                span.bytes_received = len(proc.stdout)
+                return proc
+            except subprocess.CalledProcessError as e:
+                span.exit_code = e.returncode
+                raise RuntimeError(e.stderr.decode("utf-8")) from None
 
     def __call__(
-        self, args: List[str], as_dict: bool = True, timeout: int = 60
+        self,
+        args: List[str],
+        as_dict: bool = True,
+        timeout: int = 60,
+        stdin: bytes | None = None,
     ) -> Union[Dict, str]:
         if as_dict:
             args += ["-o", "json"]
+        if self._client is not None and not self._prefix and stdin is None:
+            with tracing.span(
+                "kubectl", argv=["kubectl"] + args, native=True, **self.trace_labels
+            ) as span:
+                result = NativeKubectl(self._client)(args, as_dict, timeout)
+                # not supported natively, the kubectl binary is traced on its own
+                span.attributes["fallback"] = result is None
+            if result is not None:
+                return result
         try:
-            proc = self._exec(args, timeout=timeout)
+            proc = self._exec(args, timeout=timeout, stdin=stdin)
         except RuntimeError as e:
-            if as_dict and "unknown shorthand flag" in str(e):
-                raise RuntimeError(
-                    "Cannot parse kubectl command into Dict. Please use kubectl([..], as_dict=False) to return a string"
-                ) from None
-            else:
-                raise e
-        output: str = proc.stdout.decode("utf-8")
+            raise self._command_error(e, as_dict) from None
+        return self._decode(proc.stdout, as_dict)
+
+    @staticmethod
+    def _command_error(error: RuntimeError, as_dict: bool) -> RuntimeError:
+        if as_dict and "unknown shorthand flag" in str(error):
+            return RuntimeError(
+                "Cannot parse kubectl command into Dict. Please use kubectl([..], as_dict=False) to return a string"
+            )
+        return error
+
+    @staticmethod
+    def _decode(stdout: bytes, as_dict: bool) -> Union[Dict, str]:
+        output: str = stdout.decode("utf-8")
         if as_dict:
             return json.loads(output)  # type: ignore
         return output
+
+    async def acall(
+        self,
+        args: List[str],
+        as_dict: bool = True,
+        timeout: int = 60,
+        stdin: bytes | None = None,
+    ) -> Union[Dict, str]:
+        """Like calling this object, but without blocking the event loop"""
+        if as_dict:
+            args = args + ["-o", "json"]
+        if self._client is not None and not self._prefix and stdin is None:
+            with tracing.span(
+                "kubectl", argv=["kubectl"] + args, native=True, **self.trace_labels
+            ) as span:
+                result = await run_blocking(
+                    NativeKubectl(self._client), args, as_dict, timeout
+                )
+                span.attributes["fallback"] = result is None
+            if result is not None:
+                return result  # type: ignore
+        with tracing.span(
+            "kubectl", argv=["kubectl"] + args, **self.trace_labels
+        ) as span:
+            span.bytes_sent = len(stdin or b"")
+            proc = await asyncio.create_subprocess_shell(
+                self._command(args),
+                env=self._get_exec_env(),
+                stdin=subprocess.PIPE if stdin is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(stdin), timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise subprocess.TimeoutExpired(self._command(args), timeout) from None
+            span.exit_code = proc.returncode
+            span.bytes_received = len(stdout)
+        if proc.returncode:
+            raise self._command_error(RuntimeError(stderr.decode("utf-8")), as_dict)
+        return self._decode(stdout, as_dict)
@@ -0,0 +1,158 @@
+import queue
+import socket
+import subprocess
+import threading
+from time import monotonic
+from typing import Iterator, List, Tuple
+
+from pytest_kubernetes.client import KubernetesClient
+from pytest_kubernetes.kubectl import Kubectl
+from pytest_kubernetes.native import _duration
+
+_END = object()
+
+
+class LogStream:
+    """Stream the logs of one or many containers line by line.
+
+    The logs of all (pod, container) sources are read concurrently and merged in the order the
+    lines arrive. With more than one source, each line is prefixed with
+    '[pod/<pod>/<container>] ' like 'kubectl logs --prefix' does. Iterating ends when all
+    sources ended (with follow only when the pods terminate), the timeout passed, or the
+    stream was closed.
+
+    The logs are read by kubectl processes, or over the API server with a client.
+    """
+
+    def __init__(
+        self,
+        sources: List[Tuple[str, str]],
+        namespace: str = "default",
+        follow: bool = False,
+        since: int | str | None = None,
+        tail: int | None = None,
+        prefix: bool | None = None,
+        timeout: float | None = None,
+        kubectl: Kubectl | None = None,
+        client: KubernetesClient | None = None,
+    ) -> None:
+        if kubectl is None and client is None:
+            raise ValueError("Either a kubectl or a client is required")
+        self._kubectl = kubectl
+        self._client = client
+        self._sources = sources
+        self._namespace = namespace
+        self._follow = follow
+        self._since = _duration(since) if isinstance(since, str) else since
+        self._tail = tail
+        self._line_prefix = len(sources) > 1 if prefix is None else prefix
+        self._timeout = timeout
+        self._lines: queue.Queue = queue.Queue()
+        self._closed = False
+        self._connections: List[socket.socket] = []
+        self._processes: List[subprocess.Popen] = []
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self) -> "LogStream":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[str]:
+        if not self._threads:
+            self._start()
+        deadline = monotonic() + self._timeout if self._timeout else None
+        running = len(self._threads)
+        while running and not self._closed:
+            try:
+                line = self._lines.get(
+                    timeout=max(deadline - monotonic(), 0) if deadline else None
+                )
+            except queue.Empty:
+                return
+            if line is _END:
+                running -= 1
+            elif isinstance(line, Exception):
+                raise line
+            else:
+                yield line
+
+    def _start(self) -> None:
+        read = self._read_native if self._client else self._read_kubectl
+        for pod, container in self._sources:
+            thread = threading.Thread(
+                target=read,
+                args=(
+                    pod,
+                    container,
+                    f"[pod/{pod}/{container}] " if self._line_prefix else "",
+                ),
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _read_native(self, pod: str, container: str, prefix: str) -> None:
+        params = {"container": container}
+        if self._follow:
+            params["follow"] = "true"
+        if self._since is not None:
+            params["sinceSeconds"] = str(int(self._since))
+        if self._tail is not None:
+            params["tailLines"] = str(self._tail)
+        try:
+            connection, response = self._client.open_stream(  # type: ignore
+                f"/api/v1/namespaces/{self._namespace}/pods/{pod}/log",
+                params,
+                timeout=None if self._follow else (self._timeout or 60),
+            )
+            self._connections.append(connection.sock)  # type: ignore
+            try:
+                while not self._closed and (line := response.readline()):
+                    self._lines.put(prefix + line.decode("utf-8").rstrip("\n"))
+            finally:
+                connection.close()
+        except (RuntimeError, OSError, ValueError) as e:
+            if not self._closed:
+                self._lines.put(RuntimeError(f"Reading the logs of {pod} failed: {e}"))
+        finally:
+            self._lines.put(_END)
+
+    def _read_kubectl(self, pod: str, container: str, prefix: str) -> None:
+        args = ["logs", pod, "--container", container, "--namespace", self._namespace]
+        if self._follow:
+            args.append("--follow")
+        if self._since is not None:
+            args.append(f"--since={int(self._since)}s")
+        if self._tail is not None:
+            args.append(f"--tail={self._tail}")
+        process = self._kubectl.popen(args)  # type: ignore
+        self._processes.append(process)
+        if self._closed:
+            process.terminate()
+        try:
+            for line in process.stdout:  # type: ignore
+                self._lines.put(prefix + line.decode("utf-8").rstrip("\n"))
+            if process.wait() and not self._closed:
+                error = process.stderr.read().decode("utf-8")  # type: ignore
+                self._lines.put(
+                    RuntimeError(f"Reading the logs of {pod} failed: {error}")
+                )
+        finally:
+            self._lines.put(_END)
+
+    def close(self) -> None:
+        """Stop reading the logs"""
+        self._closed = True
+        for sock in self._connections:
+            try:
+                # unblocks the reading thread
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.terminate()
+            process.wait()
+        self._connections = []
+        self._processes = []
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import subprocess
+import tempfile
+from typing import Iterator
+
+from pytest_kubernetes import docker
+
+
+@dataclass
+class RegistryMirror:
+    """A local pull-through cache for a container registry, wired into created clusters as mirror.
+
+    The registry container is started on first use and reused by all clusters (and sessions).
+    Pass a storage directory to keep the cached images across container restarts; without an
+    upstream, the registry only serves what is in its storage (offline).
+    """
+
+    registry: str = "docker.io"  # the registry that is mirrored
+    upstream: str | None = "https://registry-1.docker.io"
+    name: str = "pytest-kubernetes-mirror"
+    port: int = 5001  # published on the host
+    storage: Path | None = None
+    image: str = "registry:2"
+
+    def _running(self) -> bool | None:
+        """Whether the registry container is running; None if it does not exist"""
+        try:
+            return docker.inspect(self.name, "{{.State.Running}}") == "true"
+        except subprocess.CalledProcessError:
+            return None
+
+    def start(self) -> None:
+        """Start the registry container, or reuse an existing one"""
+        running = self._running()
+        if running:
+            return
+        if running is False:
+            docker.run(["start", self.name])
+            return
+        arguments = [
+            "run",
+            "--detach",
+            "--name",
+            self.name,
+            "--publish",
+            f"{self.port}:5000",
+        ]
+        if self.upstream:
+            arguments += ["--env", f"REGISTRY_PROXY_REMOTEURL={self.upstream}"]
+        if self.storage:
+            arguments += [
+                "--volume",
+                f"{Path(self.storage).resolve()}:/var/lib/registry",
+            ]
+        try:
+            docker.run(arguments + [self.image])
+        except subprocess.CalledProcessError:
+            # another process may have started it in the meantime
+            if not self._running():
+                raise
+
+    def connect(self, network: str) -> None:
+        """Attach the registry container to a docker network, so that nodes reach it by name"""
+        try:
+            docker.run(["network", "connect", network, self.name])
+        except subprocess.CalledProcessError:
+            # already attached, or the network does not exist (yet)
+            pass
+
+    def endpoint(self, host: str | None = None) -> str:
+        """The URL of this mirror for nodes, via a host alias or (by default) the container name"""
+        return f"http://{host}:{self.port}" if host else f"http://{self.name}:5000"
+
+    def registries_yaml(self, endpoint: str) -> str:
+        """The mirror configuration of k3s (registries.yaml)"""
+        return f'mirrors:\n  "{self.registry}":\n    endpoint:\n      - "{endpoint}"\n'
+
+    def containerd_patch(self, endpoint: str) -> str:
+        """The mirror configuration of containerd's CRI plugin"""
+        return (
+            f'[plugins."io.containerd.grpc.v1.cri".registry.mirrors."{self.registry}"]\n'
+            f'  endpoint = ["{endpoint}"]\n'
+        )
+
+
+@contextmanager
+def config_file(content: str) -> Iterator[Path]:
+    """A temporary (YAML) file with the given content for a provider CLI"""
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    try:
+        yield Path(path)
+    finally:
+        Path(path).unlink(missing_ok=True)
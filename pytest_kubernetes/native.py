@@ -0,0 +1,398 @@
+import json
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Dict, List, Tuple, Union
+
+import yaml
+
+from pytest_kubernetes.client import APIResource, KubernetesClient, backoff
+
+# flags taking a value, mapped to the option name used in NativeKubectl
+_VALUE_FLAGS = {
+    "-n": "namespace",
+    "--namespace": "namespace",
+    "-o": "output",
+    "--output": "output",
+    "-l": "selector",
+    "--selector": "selector",
+    "-c": "container",
+    "--container": "container",
+    "-f": "filename",
+    "--filename": "filename",
+    "--for": "for",
+    "--timeout": "timeout",
+    "--raw": "raw",
+    "--wait": "wait",
+    "--ignore-not-found": "ignore_not_found",
+    "--field-manager": "field_manager",
+}
+_BOOL_FLAGS = {
+    "-A": "all_namespaces",
+    "--all-namespaces": "all_namespaces",
+    "--wait": "wait",
+    "--ignore-not-found": "ignore_not_found",
+    "--server-side": "server_side",
+    "--force-conflicts": "force_conflicts",
+}
+
+
+def _unquote(value: str) -> str:
+    if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def parse_arguments(args: List[str]) -> Tuple[List[str], Dict[str, str]] | None:
+    """Split kubectl arguments into positionals and known options; None if there are unknown flags"""
+    positionals: List[str] = []
+    options: Dict[str, str] = {}
+    i = 0
+    while i < len(args):
+        arg = _unquote(args[i])
+        if not arg.startswith("-"):
+            positionals.append(arg)
+        elif "=" in arg and arg.split("=", 1)[0] in _VALUE_FLAGS:
+            flag, value = arg.split("=", 1)
+            options[_VALUE_FLAGS[flag]] = _unquote(value)
+        elif arg in _BOOL_FLAGS:
+            options[_BOOL_FLAGS[arg]] = "true"
+        elif arg in _VALUE_FLAGS and i + 1 < len(args):
+            options[_VALUE_FLAGS[arg]] = _unquote(args[i + 1])
+            i += 1
+        else:
+            return None
+        i += 1
+    return positionals, options
+
+
+def _duration(value: str) -> float:
+    """Parse a kubectl duration like '90s', '2m' or '1h'"""
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class NativeKubectl:
+    """Run common kubectl verbs in-process with the KubernetesClient.
+
+    Calling an instance returns the same dict or str results as the kubectl binary would,
+    or None if the command is not supported natively, so the caller can fall back to kubectl.
+    """
+
+    def __init__(self, client: KubernetesClient) -> None:
+        self._client = client
+
+    def __call__(
+        self, args: List[str], as_dict: bool = True, timeout: int = 60
+    ) -> Union[Dict, str, None]:
+        parsed = parse_arguments(args)
+        if not parsed or not parsed[0]:
+            return None
+        positionals, options = parsed
+        verb = positionals.pop(0)
+        if options.get("output", "json") != "json" or (
+            as_dict and options.get("output") != "json"
+        ):
+            return None
+        handler = getattr(self, f"_{verb}", None)
+        if handler is None:
+            return None
+        return handler(positionals, options, as_dict, timeout)  # type: ignore
+
+    def _namespace(self, options: Dict[str, str]) -> str:
+        return options.get("namespace") or self._client.namespace
+
+    def _targets(self, positionals: List[str]) -> List[Tuple[APIResource, str | None]]:
+        """Resolve 'type name1 name2', 'type/name' and 'type' forms"""
+        if not positionals:
+            raise ValueError("no resource type")
+        if all("/" in p for p in positionals):
+            return [
+                (self._client.resource(p.split("/", 1)[0]), p.split("/", 1)[1])
+                for p in positionals
+            ]
+        if any("/" in p or "," in p for p in positionals):
+            raise ValueError("mixed resource arguments")
+        resource = self._client.resource(positionals[0])
+        return [(resource, name) for name in positionals[1:]] or [(resource, None)]
+
+    def _raise_for(self, status: int, data: bytes) -> None:
+        if status >= 400:
+            try:
+                reason = json.loads(data).get("reason", "")
+            except ValueError:
+                reason = ""
+            message = self._client._error_message(status, data)
+            raise RuntimeError(f"Error from server ({reason}): {message}\n")
+
+    def _get_object(self, resource: APIResource, namespace: str, name: str) -> Dict:
+        status, data = self._client.request(
+            "GET", resource.path(namespace, name), timeout=60
+        )
+        self._raise_for(status, data)
+        return json.loads(data)  # type: ignore
+
+    def _get(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        if "raw" in options:
+            if positionals or as_dict:
+                return None
+            status, data = self._client.request("GET", options["raw"], timeout=timeout)
+            self._raise_for(status, data)
+            return data.decode("utf-8")
+        if not as_dict or set(options) - {
+            "namespace",
+            "output",
+            "selector",
+            "all_namespaces",
+        }:
+            return None
+        try:
+            targets = self._targets(positionals)
+        except ValueError:
+            return None
+        namespace = None if options.get("all_namespaces") else self._namespace(options)
+        if len(targets) == 1 and targets[0][1] and "selector" not in options:
+            resource, name = targets[0]
+            return self._get_object(resource, namespace or "", name)  # type: ignore
+        items = []
+        for resource, name in targets:
+            if name:
+                items.append(self._get_object(resource, namespace or "", name))
+                continue
+            params = (
+                {"labelSelector": options["selector"]}
+                if "selector" in options
+                else None
+            )
+            status, data = self._client.request(
+                "GET", resource.path(namespace), params, timeout=timeout
+            )
+            self._raise_for(status, data)
+            for item in json.loads(data).get("items", []):
+                items.append(
+                    {"apiVersion": resource.api_version, "kind": resource.kind} | item
+                )
+        return {
+            "apiVersion": "v1",
+            "items": items,
+            "kind": "List",
+            "metadata": {"resourceVersion": ""},
+        }
+
+    def apply_manifest(
+        self,
+        manifest: Dict,
+        namespace: str | None = None,
+        field_manager: str = "kubectl",
+        force: bool = False,
+        timeout: int = 60,
+    ) -> Dict:
+        """Server-side apply a single manifest and return the resulting object"""
+        resource = self._client.resource_for(manifest["apiVersion"], manifest["kind"])
+        _namespace = (
+            manifest["metadata"].get("namespace") or namespace or self._client.namespace
+        )
+        params = {"fieldManager": field_manager}
+        if force:
+            params["force"] = "true"
+        status, data = self._client.request(
+            "PATCH",
+            resource.path(_namespace, manifest["metadata"]["name"]),
+            params,
+            body=json.dumps(manifest).encode("utf-8"),
+            headers={"Content-Type": "application/apply-patch+yaml"},
+            timeout=timeout,
+        )
+        self._raise_for(status, data)
+        if resource.kind == "CustomResourceDefinition":
+            self._client.invalidate_discovery()
+        return json.loads(data)  # type: ignore
+
+    def _apply(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        filename = options.get("filename")
+        # a client-side apply (with its 'created'/'configured' results) is left to kubectl
+        if (
+            positionals
+            or as_dict
+            or not filename
+            or options.get("server_side") != "true"
+            or set(options)
+            - {
+                "namespace",
+                "filename",
+                "server_side",
+                "field_manager",
+                "force_conflicts",
+            }
+            or not Path(filename).is_file()
+        ):
+            return None
+        manifests = [m for m in yaml.safe_load_all(Path(filename).read_text()) if m]
+        if any(m.get("kind") == "List" or "metadata" not in m for m in manifests):
+            return None
+        output = ""
+        for manifest in manifests:
+            obj = self.apply_manifest(
+                manifest,
+                options.get("namespace"),
+                field_manager=options.get("field_manager", "kubectl"),
+                force=options.get("force_conflicts") == "true",
+                timeout=timeout,
+            )
+            resource = self._client.resource_for(obj["apiVersion"], obj["kind"])
+            output += f"{resource.qualified_name}/{obj['metadata']['name']} serverside-applied\n"
+        return output
+
+    def _delete(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        if as_dict or set(options) - {"namespace", "wait", "ignore_not_found"}:
+            return None
+        try:
+            targets = self._targets(positionals)
+        except ValueError:
+            return None
+        if any(name is None for _, name in targets):
+            return None
+        namespace = self._namespace(options)
+        ignore_not_found = options.get("ignore_not_found", "false") == "true"
+        output = ""
+        deleted = []
+        for resource, name in targets:
+            status, data = self._client.request(
+                "DELETE",
+                resource.path(namespace, name),
+                {"propagationPolicy": "Background"},
+                timeout=timeout,
+            )
+            if status == 404 and ignore_not_found:
+                continue
+            self._raise_for(status, data)
+            output += f'{resource.qualified_name} "{name}" deleted\n'
+            deleted.append((resource, name))
+        if options.get("wait", "true") == "true":
+            for resource, name in deleted:
+                self._wait_deleted(resource, namespace, name, timeout)  # type: ignore
+        return output
+
+    def _wait_deleted(
+        self, resource: APIResource, namespace: str, name: str, timeout: float
+    ) -> bool:
+        for delay in backoff(timeout, initial=0.05):
+            status, _ = self._client.request("GET", resource.path(namespace, name))
+            if status == 404:
+                return True
+            sleep(delay)
+        return False
+
+    def _logs(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        if (
+            as_dict
+            or len(positionals) != 1
+            or set(options) - {"namespace", "container"}
+        ):
+            return None
+        pod = positionals[0]
+        if "/" in pod:
+            kind, _, pod = pod.partition("/")
+            if kind not in ["pod", "pods", "po"]:
+                return None
+        params = {"container": options["container"]} if "container" in options else None
+        status, data = self._client.request(
+            "GET",
+            f"/api/v1/namespaces/{self._namespace(options)}/pods/{pod}/log",
+            params,
+            timeout=timeout,
+        )
+        self._raise_for(status, data)
+        return data.decode("utf-8")
+
+    def _version(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        if not as_dict or positionals or set(options) - {"output"}:
+            return None
+        return {"serverVersion": self._client.get("/version", timeout=timeout)}
+
+    def _wait(
+        self,
+        positionals: List[str],
+        options: Dict[str, str],
+        as_dict: bool,
+        timeout: int,
+    ) -> Union[Dict, str, None]:
+        condition = options.get("for", "")
+        if (
+            as_dict
+            or set(options) - {"namespace", "for", "timeout"}
+            or not (condition.startswith("condition=") or condition == "delete")
+        ):
+            return None
+        try:
+            targets = self._targets(positionals)
+        except ValueError:
+            return None
+        if any(name is None for _, name in targets):
+            return None
+        namespace = self._namespace(options)
+        deadline = monotonic() + _duration(options.get("timeout", "30s"))
+        output = ""
+        for resource, name in targets:
+            remaining = max(deadline - monotonic(), 0)
+            if condition == "delete":
+                if not self._wait_deleted(resource, namespace, name, remaining):  # type: ignore
+                    raise RuntimeError(
+                        f"error: timed out waiting for the condition on {resource.name}/{name}\n"
+                    )
+                output += f"{resource.qualified_name}/{name} condition met\n"
+                continue
+            condition_type, _, expected = condition[len("condition=") :].partition("=")
+            for delay in backoff(remaining, initial=0.05):
+                status, data = self._client.request(
+                    "GET", resource.path(namespace, name)
+                )
+                if status != 404:
+                    self._raise_for(status, data)
+                    conditions = (
+                        json.loads(data).get("status", {}).get("conditions", [])
+                    )
+                    if any(
+                        c.get("type", "").lower() == condition_type.lower()
+                        and c.get("status", "").lower() == (expected or "true").lower()
+                        for c in conditions
+                    ):
+                        break
+                sleep(delay)
+            else:
+                raise RuntimeError(
+                    f"error: timed out waiting for the condition on {resource.name}/{name}\n"
+                )
+            output += f"{resource.qualified_name}/{name} condition met\n"
+        return output
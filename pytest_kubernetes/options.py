@@ -1,6 +1,8 @@
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 
+from pytest_kubernetes.mirror import RegistryMirror
+
 
 @dataclass
 class ClusterOptions:
@@ -10,9 +12,15 @@ class ClusterOptions:
     kubeconfig_path: Path | None = None
     provider_config: Path | None = None  # Path to a Provider cluster config file
     cluster_timeout: int = field(default=240)
+    native_client: bool | None = None  # run common kubectl verbs in-process
+    cache_dir: Path | None = None  # root directory for kubectl's discovery caches
+    registry_mirror: RegistryMirror | None = None  # pull-through cache for image pulls
 
     # https://stackoverflow.com/questions/77673392/merging-two-dataclasses
     def __or__(self, other):
-        this = {k: v for k, v in asdict(self).items() if v is not None}
-        other = {k: v for k, v in asdict(other).items() if v is not None}
+        # not asdict(), it would turn nested dataclasses (RegistryMirror) into dicts
+        this = {f.name: getattr(self, f.name) for f in fields(self)}
+        other = {f.name: getattr(other, f.name) for f in fields(other)}
+        this = {k: v for k, v in this.items() if v is not None}
+        other = {k: v for k, v in other.items() if v is not None}
         return self.__class__(**this | other)
@@ -1,15 +1,49 @@
-from typing import Dict, Type
+from pathlib import Path
+import re
+import secrets
+from typing import TYPE_CHECKING, Dict, Type
+import warnings
 import pytest
 from pytest import FixtureRequest
 
-from pytest_kubernetes.providers import select_provider_manager
-from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes import binaries, durations, hooks, tracing
+from pytest_kubernetes.deletion import DeletionQueue
+from pytest_kubernetes.options import ClusterOptions
+from pytest_kubernetes.sharing import SharedClusters
 
-cluster_cache: Dict[str, Type[AClusterManager]] = {}
+# the providers (and their dependencies) are imported when a fixture needs them, so that
+# this plugin adds next to nothing to the startup of sessions that do not use it
+if TYPE_CHECKING:
+    from pytest_kubernetes.providers.base import AClusterManager
+    from pytest_kubernetes.registry import ClusterRegistry
+
+cluster_cache: Dict[str, Type["AClusterManager"]] = {}
+# set on pytest-xdist workers, coordinates the kept clusters of all workers of a run
+shared_clusters: SharedClusters | None = None
+# set with --k8s-reuse, records kept clusters for later sessions
+cluster_registry: "ClusterRegistry | None" = None
+
+
+class HookTracer:
+    """Forward the spans of all operations to the pytest_k8s_operation_* hooks"""
+
+    def __init__(self, config: pytest.Config) -> None:
+        self._hook = config.hook
+
+    def start(self, span: tracing.Span) -> None:
+        self._hook.pytest_k8s_operation_start(span=span)
+
+    def finish(self, span: tracing.Span) -> None:
+        self._hook.pytest_k8s_operation_finish(span=span)
+
+
+hook_tracer: HookTracer | None = None
+# set with --k8s-durations, attributes the time of cluster operations to tests
+duration_report: durations.DurationReport | None = None
 
 
 @pytest.fixture
-def k8s(request: FixtureRequest, k8s_manager):
+def k8s(request: FixtureRequest, k8s_manager, k8s_cluster_pool, k8s_deletion_queue):
     """Provide a Kubernetes cluster as test fixture."""
 
     provider = None
@@ -17,6 +51,7 @@ def k8s(request: FixtureRequest, k8s_manager):
     keep = False
     provider_config = None
     external_kubeconfig = None
+    req = {}
     if "k8s" in request.keywords:
         req = dict(request.keywords["k8s"].kwargs)
         provider = req.get("provider")
@@ -29,17 +64,43 @@ def k8s(request: FixtureRequest, k8s_manager):
     if not cluster_name:
         cluster_name = request.config.getoption("k8s_cluster_name")
 
+    # hand out a pre-created cluster if the test does not ask for a special one
+    if (
+        k8s_cluster_pool
+        and not keep
+        and not any(
+            [
+                req.get("provider"),
+                req.get("cluster_name"),
+                provider_config,
+                external_kubeconfig,
+            ]
+        )
+    ):
+        pooled = k8s_cluster_pool.acquire(timeout=ClusterOptions().cluster_timeout)
+        request.addfinalizer(lambda: k8s_cluster_pool.release(pooled))
+        return pooled
+
     manager_klass = k8s_manager(provider)
     cache_key = f"{manager_klass.__name__}-{cluster_name}"
+    if shared_clusters and not keep:
+        # kept clusters are shared with other xdist workers, this one gets a private cluster
+        manager = manager_klass(cluster_name, provider_config, external_kubeconfig)  # type: ignore
+        shared_clusters.make_private(manager)
     # check if this provider is kept from another test function
-    if cache_key in cluster_cache:
+    elif cache_key in cluster_cache:
         manager = cluster_cache[cache_key]
         del cluster_cache[cache_key]
     else:
         manager = manager_klass(cluster_name, provider_config, external_kubeconfig)  # type: ignore
+        if keep:
+            _keep(request, manager, req.get("provider"))
+    # a cluster with this name may still be deleted after a previous test
+    k8s_deletion_queue.guard(manager)
 
     def delete_cluster():
-        manager.delete()
+        # the next test starts while this cluster is deleted
+        k8s_deletion_queue.submit(manager)
 
     if not keep:
         request.addfinalizer(delete_cluster)
@@ -49,27 +110,139 @@ def k8s(request: FixtureRequest, k8s_manager):
     return manager
 
 
+@pytest.fixture
+def ak8s(k8s):
+    """Provide a Kubernetes cluster as test fixture for async tests (e.g. with pytest-asyncio).
+
+    This is the manager of the k8s fixture (honoring the k8s mark); await its async methods
+    (acreate(), akubectl(), aapply(), await_for(), alogs_stream(), ...) to overlap operations.
+    """
+    return k8s
+
+
+@pytest.fixture
+def k8s_namespace(request: FixtureRequest, k8s_manager, k8s_deletion_queue):
+    """Provide a unique namespace on a shared Kubernetes cluster as test fixture.
+
+    The returned manager runs its operations in this namespace by default; the namespace is
+    deleted in the background after the test.
+    """
+    req = dict(request.keywords["k8s"].kwargs) if "k8s" in request.keywords else {}
+    provider = req.get("provider") or request.config.getoption("k8s_provider")
+    cluster_name = req.get("cluster_name") or request.config.getoption(
+        "k8s_cluster_name"
+    )
+    manager_klass = k8s_manager(provider)
+    cache_key = f"{manager_klass.__name__}-{cluster_name}"
+    if cache_key not in cluster_cache:
+        cluster_cache[cache_key] = manager_klass(
+            cluster_name, req.get("provider_config"), req.get("k8s_kubeconfig")
+        )  # type: ignore
+        _keep(request, cluster_cache[cache_key], req.get("provider"))  # type: ignore
+        # a cluster with this name may still be deleted after a previous test
+        k8s_deletion_queue.guard(cluster_cache[cache_key])
+    manager: AClusterManager = cluster_cache[cache_key]  # type: ignore
+    # a kept cluster (e.g. of the k8s fixture) may not be created yet; a running one is reused
+    manager.create()
+
+    slug = re.sub(r"[^a-z0-9]+", "-", request.node.name.lower()).strip("-")
+    namespace = f"pytest-{slug[:48].strip('-')}-{secrets.token_hex(3)}"
+    manager.kubectl(["create", "namespace", namespace], as_dict=False)
+    manager._wait_for_service_account(namespace)
+
+    def delete_namespace():
+        # the API server removes the namespace's objects asynchronously
+        manager.kubectl(
+            ["delete", "namespace", namespace, "--wait=false"], as_dict=False
+        )
+
+    request.addfinalizer(delete_namespace)
+    return manager.scoped(namespace)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def k8s_cluster_pool(request: FixtureRequest):
+    """Boot --k8s-pool-size clusters in the background at session start"""
+    size = request.config.getoption("k8s_pool_size")
+    if not size:
+        yield None
+        return
+    k8s_manager = request.getfixturevalue("k8s_manager")
+    cluster_name = request.config.getoption("k8s_cluster_name")
+    if shared_clusters:
+        cluster_name = f"{cluster_name}-{shared_clusters.worker}"
+    from pytest_kubernetes.pool import ClusterPool
+
+    pool = ClusterPool(k8s_manager(), cluster_name, size)
+    pool.start()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="session")
+def k8s_deletion_queue(request: FixtureRequest):
+    """Delete clusters in the background; all deletions are awaited at the end of the session"""
+    deletions = DeletionQueue()
+    yield deletions
+    for problem in deletions.join(request.config.getoption("k8s_teardown_timeout")):
+        warnings.warn(problem, RuntimeWarning)
+
+
 @pytest.fixture(scope="session", autouse=True)
-def remaining_clusters_teardown():
+def remaining_clusters_teardown(k8s_deletion_queue):
     yield
     for _, cluster in cluster_cache.items():
-        cluster.delete()
+        if cluster_registry and cluster_registry.is_registered(cluster):  # type: ignore
+            # reused by the next session
+            cluster.stop_port_forwardings()  # type: ignore
+            continue
+        # clusters shared with other xdist workers are deleted by the last worker
+        if not (shared_clusters and shared_clusters.is_shared(cluster)):  # type: ignore
+            k8s_deletion_queue.submit(cluster)
+        else:
+            cluster.stop_port_forwardings()  # type: ignore
+
+
+def _keep(request: FixtureRequest, manager: "AClusterManager", provider: str | None):
+    """Reuse a kept cluster in later sessions or share it with other xdist workers"""
+    # clusters with a given kubeconfig are not created by pytest-kubernetes
+    if manager.kubeconfig:
+        return
+    if cluster_registry:
+        cluster_registry.attach(manager)
+    elif shared_clusters:
+        shared_clusters.attach(
+            manager,
+            provider or request.config.getoption("k8s_provider"),
+            request.config.getoption("k8s_xdist_clusters"),
+        )
+
+
+def _pytest_options(config: pytest.Config) -> dict:
+    return {
+        "cluster_name": config.getoption("k8s_cluster_name"),
+        "provider": config.getoption("k8s_provider"),
+        "version": config.getoption("k8s_version"),
+        "provider_config": config.getoption("k8s_provider_config"),
+        "kubeconfig_override": config.getoption("k8s_kubeconfig_override"),
+        "kubeconfig": config.getoption("k8s_kubeconfig"),
+        "native_client": config.getoption("k8s_native_client"),
+        "registry_mirror": config.getoption("k8s_registry_mirror"),
+    }
 
 
 @pytest.fixture(scope="session")
-def k8s_manager(request: FixtureRequest):
-    pytest_options = {
-        "cluster_name": request.config.getoption("k8s_cluster_name"),
-        "provider": request.config.getoption("k8s_provider"),
-        "version": request.config.getoption("k8s_version"),
-        "provider_config": request.config.getoption("k8s_provider_config"),
-        "kubeconfig_override": request.config.getoption("k8s_kubeconfig_override"),
-        "kubeconfig": request.config.getoption("k8s_kubeconfig"),
+def k8s_manager(request: FixtureRequest, tmp_path_factory: pytest.TempPathFactory):
+    pytest_options = _pytest_options(request.config) | {
+        # kubectl discovery caches shared by all clusters of this session
+        "cache_dir": tmp_path_factory.mktemp("k8s-cache"),
     }
 
     def k8s_factory(provider_name: str | None = None):
         if not provider_name:
             provider_name = pytest_options.get("provider")
+        from pytest_kubernetes.providers import select_provider_manager
+
         return select_provider_manager(provider_name, pytest_options)
 
     yield k8s_factory
@@ -102,9 +275,57 @@ def pytest_addoption(parser):
         "--k8s-kubeconfig",
         help="Path to a kubeconfig of a cluster not created by pytest-kubernetes",
     )
+    k8s_group.addoption(
+        "--k8s-pool-size",
+        type=int,
+        default=0,
+        help="Number of clusters to create in the background for the k8s fixture (default 0, no pool)",
+    )
+    k8s_group.addoption(
+        "--k8s-native-client",
+        action="store_true",
+        default=False,
+        help="Run common kubectl commands (get, apply, delete, logs, wait, version) in-process",
+    )
+    k8s_group.addoption(
+        "--k8s-registry-mirror",
+        action="store_true",
+        default=False,
+        help="Pull Docker Hub images of created clusters through a local registry mirror container",
+    )
+    k8s_group.addoption(
+        "--k8s-durations",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Show the N test phases with the most cluster time (N=0 for all) and repetitive kubectl calls",
+    )
+    k8s_group.addoption(
+        "--k8s-reuse",
+        action="store_true",
+        default=False,
+        help="Keep kept clusters running after the session and re-attach to them in the next one",
+    )
+    k8s_group.addoption(
+        "--k8s-teardown-timeout",
+        type=float,
+        default=300,
+        help="Seconds to wait for the background deletion of clusters at the end of the session (default 300)",
+    )
+    k8s_group.addoption(
+        "--k8s-xdist-clusters",
+        type=int,
+        default=1,
+        help="Number of clusters the pytest-xdist workers share for each kept cluster (default 1)",
+    )
+
+
+def pytest_addhooks(pluginmanager: pytest.PytestPluginManager):
+    pluginmanager.add_hookspecs(hooks)
 
 
 def pytest_configure(config: pytest.Config):
+    global hook_tracer
     cluster_name = config.getoption("k8s_cluster_name")
     provider = config.getoption("k8s_provider")
     provider_config = config.getoption("k8s_provider_config")
@@ -129,6 +350,17 @@ def pytest_configure(config: pytest.Config):
         raise pytest.UsageError(
             "Cannot specify both --k8s-provider-config and --k8s-kubeconfig[-override]"
         )
+    if config.getoption("k8s_pool_size") and (
+        external_kubeconfig or external_kubeconfig_override
+    ):
+        raise pytest.UsageError(
+            "Cannot use --k8s-pool-size with --k8s-kubeconfig[-override]"
+        )
+    if getattr(config, "cache", None) is not None:
+        # probes of provider binaries (e.g. 'k3d --version') are reused by later sessions
+        binaries.use_cache(config.cache)
+    if config.getoption("k8s_reuse") and getattr(config, "cache", None) is None:
+        raise pytest.UsageError("--k8s-reuse requires the pytest cache (cacheprovider)")
     if provider and provider.lower() not in available_providers:
         raise pytest.UsageError(
             f"Provider '{provider}' not available in {available_providers}"
@@ -141,3 +373,93 @@ def pytest_configure(config: pytest.Config):
         raise pytest.UsageError(
             "Cannot request 'external' provider without --k8s-kubeconfig[-override]"
         )
+    global duration_report
+    hook_tracer = HookTracer(config)
+    tracing.add_tracer(hook_tracer)
+    if config.getoption("k8s_durations") is not None:
+        duration_report = durations.DurationReport()
+        tracing.add_tracer(duration_report)
+
+
+def pytest_unconfigure(config: pytest.Config):
+    global hook_tracer, duration_report
+    if hook_tracer:
+        tracing.remove_tracer(hook_tracer)
+        hook_tracer = None
+    if duration_report:
+        tracing.remove_tracer(duration_report)
+        duration_report = None
+
+
+def _runtest_phase(item: pytest.Item, when: str):
+    if not duration_report:
+        return (yield)
+    with durations.phase(item.nodeid, when):
+        return (yield)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_setup(item: pytest.Item):
+    return (yield from _runtest_phase(item, "setup"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item: pytest.Item):
+    return (yield from _runtest_phase(item, "call"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_teardown(item: pytest.Item):
+    return (yield from _runtest_phase(item, "teardown"))
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter):
+    if not duration_report:
+        return
+    limit = terminalreporter.config.getoption("k8s_durations")
+    lines = duration_report.lines(limit)
+    title = "cluster time per test phase"
+    terminalreporter.write_sep(
+        "=", title if not limit else f"{title} (slowest {limit})"
+    )
+    for line in lines or ["no cluster operations"]:
+        terminalreporter.write_line(line)
+    repetitive = duration_report.repetitive()
+    if repetitive:
+        terminalreporter.write_sep("-", "repetitive kubectl calls (N+1 patterns)")
+        for line in repetitive:
+            terminalreporter.write_line(line)
+
+
+def pytest_sessionstart(session: pytest.Session):
+    global shared_clusters, cluster_registry
+    if session.config.getoption("k8s_reuse"):
+        from pytest_kubernetes.registry import ClusterRegistry
+
+        cluster_registry = ClusterRegistry(session.config.cache)  # type: ignore
+    shared_clusters = SharedClusters.from_environment()
+    if shared_clusters:
+        shared_clusters.register()
+
+
+def pytest_sessionfinish(session: pytest.Session):
+    if not shared_clusters:
+        return
+    clusters = shared_clusters.unregister()
+    if not clusters:
+        return
+    from pytest_kubernetes.providers import select_provider_manager
+
+    # this is the last worker of the run: delete the shared clusters that were created
+    for shared in clusters.values():
+        kubeconfig = Path(shared["kubeconfig"])
+        if not kubeconfig.is_file() or not kubeconfig.stat().st_size:
+            continue
+        manager = select_provider_manager(
+            shared["provider"], _pytest_options(session.config)
+        )()  # type: ignore
+        manager._cluster_options.cluster_name = shared["cluster_name"]
+        manager._cluster_options.kubeconfig_path = kubeconfig
+        manager._created = True
+        manager.delete()
+    shared_clusters.close()
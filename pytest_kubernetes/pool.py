@@ -0,0 +1,101 @@
+import itertools
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Type
+
+from pytest_kubernetes.providers.base import AClusterManager
+
+
+class ClusterPool:
+    """A pool of clusters that are created in the background, ahead of demand.
+
+    acquire() hands out a ready cluster. release() cleans up a used cluster with a soft reset
+    in the background; if that fails, the cluster is deleted and a replacement is booted.
+    A cluster that fails to boot is deleted again, and its error is raised by every later
+    acquire() that would otherwise wait for it. All clusters are deleted when the pool is
+    closed.
+    """
+
+    def __init__(
+        self, manager_klass: Type[AClusterManager], cluster_name: str, size: int
+    ) -> None:
+        self._manager_klass = manager_klass
+        self._cluster_name = cluster_name
+        self._size = size
+        self._ready: queue.Queue[AClusterManager | Exception] = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix="k8s-pool"
+        )
+        self._index = itertools.count()
+        self._managers: List[AClusterManager] = []
+        self._closed = False
+
+    def start(self) -> None:
+        """Start booting all clusters of this pool in the background"""
+        for _ in range(self._size):
+            self._executor.submit(self._provision)
+
+    def _provision(self) -> None:
+        if self._closed:
+            return
+        manager = self._manager_klass(self._cluster_name)  # type: ignore
+        manager._cluster_options.cluster_name = (
+            f"{self._cluster_name}-pool-{next(self._index)}"
+        )
+        self._managers.append(manager)
+        try:
+            manager.create()
+            manager._pooled = True
+        except Exception as e:
+            self._discard(manager)
+            self._ready.put(e)
+        else:
+            self._ready.put(manager)
+
+    def _discard(self, manager: AClusterManager) -> None:
+        """Delete a cluster that failed to boot, whatever it left behind"""
+        try:
+            manager.delete()
+        except Exception:
+            pass
+        finally:
+            self._managers.remove(manager)
+
+    def _replace(self, manager: AClusterManager) -> None:
+        try:
+            manager.delete()
+        finally:
+            self._managers.remove(manager)
+            self._provision()
+
+    def _recycle(self, manager: AClusterManager) -> None:
+        try:
+            manager.reset(mode="soft")
+        except Exception:
+            self._replace(manager)
+        else:
+            self._ready.put(manager)
+
+    def acquire(self, timeout: float | None = None) -> AClusterManager:
+        """Get a ready cluster from this pool, wait for one if none is ready yet"""
+        try:
+            manager = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError("No cluster of the pool became ready in time") from None
+        if isinstance(manager, Exception):
+            # the slot of this cluster is lost: all waiters get the error instead of hanging
+            self._ready.put(manager)
+            raise RuntimeError(f"Creating a pooled cluster failed: {manager}")
+        return manager
+
+    def release(self, manager: AClusterManager) -> None:
+        """Give back a used cluster; it is recycled or replaced asynchronously"""
+        self._executor.submit(self._recycle, manager)
+
+    def close(self) -> None:
+        """Wait for pending work and delete all clusters of this pool"""
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        with ThreadPoolExecutor(max_workers=self._size) as executor:
+            list(executor.map(lambda manager: manager.delete(), self._managers))
+        self._managers = []
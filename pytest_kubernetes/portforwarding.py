@@ -1,11 +1,21 @@
-import io
+import asyncio
+from functools import partial
 from pathlib import Path
+import re
+import socket
 import subprocess
-import tempfile
+import threading
 from time import sleep
-from typing import List, Tuple
+from typing import Dict, List, Set, Tuple
 
+from pytest_kubernetes.client import KubernetesClient, backoff
 from pytest_kubernetes.kubectl import Kubectl
+from pytest_kubernetes.tracing import traced
+from pytest_kubernetes.websocket import WebSocket
+
+_FORWARDING = re.compile(r"Forwarding from .*:(\d+) -> (\d+)")
+# kubectl keeps running (older versions) or exits when the pod behind it is gone
+_FORWARDING_ERROR = re.compile(r"error occurred forwarding|lost connection to pod")
 
 
 class PortForwarding(Kubectl):
@@ -14,82 +24,147 @@ class PortForwarding(Kubectl):
     This class is responsible for setting up port forwarding for the target. It
     will start a process that will forward the specified ports to the pod.
     The process will be stopped when the object is destroyed.
+
+    Several (source, target) port pairs are forwarded by a single process. A source port of
+    0 or None picks a free local port; see local_port and local_ports once started.
+
+    A shared port forwarding is started once and reused; leaving its context does not stop
+    it (see AClusterManager.port_forwarding(shared=True)).
     """
 
     def __init__(
         self,
         target: str,
-        ports: Tuple[int, int],
+        ports: Tuple[int | None, int] | List[Tuple[int | None, int]],
         namespace: str = "default",
         kubeconfig: Path | None = None,
         context: str | None = None,
         timeout: int = 90,
+        shared: bool = False,
     ):
         self._target = target
-        self._ports = ports
-        self._process = None
+        self._ports = [ports] if isinstance(ports, tuple) else list(ports)
+        self._process: subprocess.Popen | None = None
         self._kubeconfig = kubeconfig
         self._context = context
         self._namespace = namespace
         self._timeout = timeout
+        self._output: List[str] = []
+        # (local port, target port) pairs, in the order of the ports
+        self._forwarded: List[Tuple[int, int]] = []
+        self._failed = False
+        self._ready = threading.Event()
+        self._reader: threading.Thread | None = None
+        self.shared = shared
+
+    @property
+    def started(self) -> bool:
+        return self._process is not None
 
     def __enter__(self):
-        self.start()
+        if not (self.shared and self.started):
+            self.start()
         return self
 
     def __exit__(self, type, value, traceback):
-        self.stop()
+        if not self.shared:
+            self.stop()
 
+    @traced("port_forwarding")
     def start(self):
         """Start the port forwarding process."""
         if self._process:
             raise RuntimeError("Port forwarding already started")
-        self._log = tempfile.TemporaryFile()
+        self._output = []
+        self._forwarded = []
+        self._failed = False
+        self._ready.clear()
         self._forward()
-        _t = self._timeout
-        while _t > 0:
-            self._log.seek(0)
-            if "Forwarding from" in self._log.read().decode("utf-8"):
-                break
-            self._log.seek(0, io.SEEK_END)
-            sleep(1)
-            _t -= 1
-        else:
-            self._log.seek(0)
-            logs = self._log.read().decode("utf-8")
+        self._reader = threading.Thread(
+            target=self._read, args=(self._process,), daemon=True
+        )
+        self._reader.start()
+        # set as soon as kubectl listens, or when it exited
+        self._ready.wait(self._timeout)
+        if self._process.poll() is not None or len(self._forwarded) < len(self._ports):  # type: ignore
             self.stop()
-            raise RuntimeError(f"Port forwarding failed with error: {logs}")
+            raise RuntimeError(
+                f"Port forwarding failed with error: {''.join(self._output)}"
+            )
+
+    def _read(self, process: subprocess.Popen) -> None:
+        """Collect the output of kubectl; it must be drained for kubectl not to block"""
+        for line in process.stdout:  # type: ignore
+            self._output.append(line.decode("utf-8"))
+            if self._ready.is_set() and _FORWARDING_ERROR.search(self._output[-1]):
+                self._failed = True
+            elif match := _FORWARDING.match(self._output[-1]):
+                # one line per port and address family, in the order of the ports
+                pair = (int(match[1]), int(match[2]))
+                if pair not in self._forwarded:
+                    self._forwarded.append(pair)
+                if len(self._forwarded) == len(self._ports):
+                    self._ready.set()
+        self._ready.set()
+
+    @property
+    def local_ports(self) -> Dict[Tuple[int, int], int]:
+        """The local port for each (source, target) port pair of a started port forwarding;
+        the source port is 0 if a free local port was picked"""
+        if not self.started:
+            raise RuntimeError("Port forwarding is not started")
+        return {
+            (source or 0, target): local
+            for (source, target), (local, _) in zip(self._ports, self._forwarded)
+        }
+
+    @property
+    def local_port(self) -> int:
+        """The local port of the (first) forwarded port of a started port forwarding"""
+        if not self.started:
+            raise RuntimeError("Port forwarding is not started")
+        return self._forwarded[0][0]
+
+    def healthy(self) -> bool:
+        """Whether this port forwarding is running and did not fail to reach its target"""
+        if not self._process or self._process.poll() is not None or self._failed:
+            return False
+        for port, _ in self._forwarded:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    pass
+            except OSError:
+                return False
+        return True
+
+    def restart(self) -> None:
+        """Restart this port forwarding (e.g. after the target pod was replaced) on the same ports"""
+        if self._forwarded:
+            self._ports = list(self._forwarded)
+        self.stop()
+        self.start()
 
     def stop(self):
         """Stop the port forwarding process."""
-        import socket
-
         if self._process:
             self._process.terminate()
-            self._process.wait()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            # the local port is released when the process exited
+            if self._reader:
+                self._reader.join(timeout=10)
+                self._reader = None
+            self._process.stdout.close()  # type: ignore
             self._process = None
-            self._log.close()
-            _t = self._timeout
-            # make sure this port forwarding is stopped
-            while _t > 0:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                socket.setdefaulttimeout(2.0)
-                result = s.connect_ex(("127.0.0.1", int(self._ports[0])))
-                s.close()
-                if result == 0:
-                    _t -= 1
-                    sleep(1)
-                    continue
-                else:
-                    break
-            else:
-                raise RuntimeError("Port forwarding failed to stop")
 
     def _exec(self, arguments: List[str]) -> subprocess.Popen:  # type: ignore
         proc = subprocess.Popen(
             [str(self._exec_path)] + self._get_kubeconfig_args() + arguments,
-            stdout=self._log,
-            stderr=self._log,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
         )
         return proc
 
@@ -102,7 +177,248 @@ class PortForwarding(Kubectl):
                 self._target,
                 "--namespace",
                 self._namespace,
-                f"{self._ports[0]}:{self._ports[1]}",
+                *[f"{source or ''}:{target}" for source, target in self._ports],
                 f"--pod-running-timeout={self._timeout}s",
             ]
         )
+
+
+class NativePortForwarding(PortForwarding):
+    """Port forwarding in-process, over WebSockets to the portforward subresource of a pod.
+
+    Services and workloads (deployments, statefulsets, ...) are resolved to a ready pod of
+    theirs. The local ports are served by an asyncio event loop in a background thread and
+    each local connection is forwarded over its own WebSocket. If the pod cannot be reached
+    anymore (e.g. it was rescheduled), the target is resolved again for the next connection.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        ports: Tuple[int | None, int] | List[Tuple[int | None, int]],
+        namespace: str = "default",
+        kubeconfig: Path | None = None,
+        context: str | None = None,
+        timeout: int = 90,
+        shared: bool = False,
+        client: KubernetesClient | None = None,
+    ):
+        super().__init__(target, ports, namespace, kubeconfig, context, timeout, shared)
+        self._client = client
+        self._pod: Dict | None = None
+        self._service: Dict | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._servers: List[asyncio.AbstractServer] = []
+        self._connections: Set[asyncio.Task] = set()
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    @traced("port_forwarding")
+    def start(self):
+        """Start serving the local ports."""
+        if self._loop:
+            raise RuntimeError("Port forwarding already started")
+        self._output = []
+        self._forwarded = []
+        # fail early if there is no pod to forward to, like kubectl does
+        self._resolve()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result(
+                self._timeout
+            )
+        except OSError as e:
+            self.stop()
+            raise RuntimeError(f"Port forwarding failed with error: {e}") from None
+
+    async def _listen(self) -> None:
+        for source, target in self._ports:
+            server = await asyncio.start_server(
+                partial(self._accept, target),
+                "127.0.0.1",
+                source or 0,
+            )
+            self._servers.append(server)
+            self._forwarded.append((server.sockets[0].getsockname()[1], target))
+
+    def _resolve(self) -> Dict:
+        """Find a ready pod of the target, waiting for one up to the timeout"""
+        client: KubernetesClient = self._client  # type: ignore
+        kind, _, name = self._target.rpartition("/")
+        resource = client.resource(kind or "pods")
+        obj = client.get(resource.path(self._namespace, name))
+        if resource.kind == "Pod":
+            selector = None
+        elif resource.kind == "Service":
+            selector = obj["spec"].get("selector")
+        else:
+            selector = obj["spec"].get("selector", {}).get("matchLabels")
+        if resource.kind != "Pod" and not selector:
+            raise RuntimeError(f"{self._target} does not select any pods")
+        for delay in backoff(self._timeout, initial=0.1):
+            if selector:
+                pods = client.get(
+                    f"/api/v1/namespaces/{self._namespace}/pods",
+                    {
+                        "labelSelector": ",".join(
+                            f"{k}={v}" for k, v in selector.items()
+                        )
+                    },
+                )["items"]
+            else:
+                pods = [client.get(resource.path(self._namespace, name))]
+            for pod in pods:
+                if _pod_ready(pod):
+                    self._pod = pod
+                    self._service = obj if resource.kind == "Service" else None
+                    return pod  # type: ignore
+            sleep(delay)
+        raise RuntimeError(f"Timed out waiting for a running pod of {self._target}")
+
+    def _pod_port(self, pod: Dict, port: int) -> int:
+        """The port of the pod a (service) port is forwarded to"""
+        if not self._service:
+            return port
+        for service_port in self._service["spec"].get("ports", []):
+            if service_port["port"] == port:
+                target_port = service_port.get("targetPort", port)
+                break
+        else:
+            raise RuntimeError(
+                f"Service {self._service['metadata']['name']} does not have a service "
+                f"port {port}"
+            )
+        if isinstance(target_port, int):
+            return target_port
+        for container in pod["spec"]["containers"]:
+            for container_port in container.get("ports", []):
+                if container_port.get("name") == target_port:
+                    return int(container_port["containerPort"])
+        raise RuntimeError(f"Pod {pod['metadata']['name']} has no port {target_port}")
+
+    async def _connect(self, port: int) -> WebSocket:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pod = self._pod
+            try:
+                if attempt or pod is None:
+                    # the pod was not reachable: resolve the target again
+                    pod = await loop.run_in_executor(None, self._resolve)
+                return await WebSocket.connect(
+                    self._client,  # type: ignore
+                    f"/api/v1/namespaces/{self._namespace}/pods/"
+                    f"{pod['metadata']['name']}/portforward",
+                    {"ports": str(self._pod_port(pod, port))},
+                    ["v4.channel.k8s.io"],
+                    timeout=self._timeout,
+                )
+            except RuntimeError:
+                self._pod = None
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    async def _accept(
+        self, port: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)  # type: ignore
+        try:
+            try:
+                websocket = await self._connect(port)
+            except RuntimeError as e:
+                self._output.append(f"an error occurred forwarding {port}: {e}\n")
+                return
+            upstream = asyncio.ensure_future(self._upstream(reader, websocket))
+            try:
+                await self._downstream(websocket, writer, port)
+            finally:
+                upstream.cancel()
+                await websocket.close()
+        finally:
+            writer.close()
+            self._connections.discard(task)  # type: ignore
+
+    async def _upstream(self, reader: asyncio.StreamReader, websocket: WebSocket):
+        """Forward local data to the data channel (0) of the WebSocket"""
+        try:
+            while data := await reader.read(65536):
+                await websocket.send(b"\x00" + data)
+        except ConnectionError:
+            pass
+        await websocket.close()
+
+    async def _downstream(
+        self, websocket: WebSocket, writer: asyncio.StreamWriter, port: int
+    ) -> None:
+        """Forward the data channel of the WebSocket to the local connection"""
+        # the first message of each channel is the port number
+        prefixed: Set[int] = set()
+        while (message := await websocket.receive()) is not None:
+            if not message:
+                continue
+            channel, data = message[0], message[1:]
+            if channel not in prefixed:
+                prefixed.add(channel)
+                data = data[2:]
+            if not data:
+                continue
+            if channel == 0:
+                writer.write(data)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    return
+            else:
+                # the pod may be gone; connect to another one next time
+                self._pod = None
+                self._output.append(
+                    f"an error occurred forwarding {port}: {data.decode('utf-8')}\n"
+                )
+                return
+
+    def healthy(self) -> bool:
+        """Whether the local ports are being served"""
+        return bool(self._thread and self._thread.is_alive()) and all(
+            server.is_serving() for server in self._servers
+        )
+
+    def stop(self):
+        """Stop serving the local ports and close all forwarded connections."""
+        if not self._loop:
+            return
+        loop = self._loop
+
+        async def shutdown():
+            for server in self._servers:
+                server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=10)  # type: ignore
+            loop.close()
+            self._loop = None
+            self._servers = []
+            self._connections = set()
+
+
+def _pod_ready(pod: Dict) -> bool:
+    status = pod.get("status", {})
+    return (
+        status.get("phase") == "Running"
+        and not pod["metadata"].get("deletionTimestamp")
+        and any(
+            c.get("type") == "Ready" and c.get("status") == "True"
+            for c in status.get("conditions", [])
+        )
+    )
@@ -1,7 +1,9 @@
-import shutil
 from typing import Type
+from pytest_kubernetes import binaries
+from pytest_kubernetes.mirror import RegistryMirror
 from pytest_kubernetes.options import ClusterOptions
 from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes.providers.base import create_clusters as create_clusters
 from .k3d import K3dManagerBase
 from .kind import KindManagerBase
 from .minikube import MinikubeDockerManagerBase, MinikubeKVM2ManagerBase
@@ -44,6 +46,12 @@ def select_provider_manager(
         cluster_options.cluster_name = pytest_options.get("cluster_name")
     if pytest_options and pytest_options.get("version"):
         cluster_options.api_version = str(pytest_options.get("version"))
+    if pytest_options and pytest_options.get("native_client"):
+        cluster_options.native_client = True
+    if pytest_options and pytest_options.get("cache_dir"):
+        cluster_options.cache_dir = pytest_options.get("cache_dir")
+    if pytest_options and pytest_options.get("registry_mirror"):
+        cluster_options.registry_mirror = RegistryMirror()
 
     if not name and default_provider:
         name = default_provider
@@ -73,7 +81,9 @@ def select_provider_manager(
             {"_cluster_options": cluster_options},
         ),
         EXTERNAL: type(
-            "ExternalManager", (ExternalManagerBase,), {"_kubeconfig": kubeconfig}
+            "ExternalManager",
+            (ExternalManagerBase,),
+            {"_kubeconfig": kubeconfig, "_cluster_options": cluster_options},
         ),
     }
 
@@ -91,7 +101,7 @@ def select_provider_manager(
             providers.get(KIND),
             providers.get(MINIKUBE_DOCKER),
         ]:
-            if provider is None or not shutil.which(provider.get_binary_name()):  # type: ignore
+            if provider is None or not binaries.which(provider.get_binary_name()):  # type: ignore
                 continue
             return provider
         else:
@@ -1,17 +1,45 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from contextlib import AbstractContextManager, nullcontext
+import copy
+from dataclasses import replace
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 from pathlib import Path
 import tempfile
-from time import sleep
-from typing import Dict, List, Tuple, Union
+from time import monotonic, sleep
+from typing import AsyncIterator, Dict, List, Set, Tuple
 
 import yaml
 
-from pytest_kubernetes.kubectl import Kubectl
+from pytest_kubernetes.client import KubernetesClient, backoff
+from pytest_kubernetes.conditions import Target, Waiter, supported
+from pytest_kubernetes.kubectl import Kubectl, run_blocking
+from pytest_kubernetes.logs import LogStream
+from pytest_kubernetes.native import NativeKubectl
 from pytest_kubernetes.options import ClusterOptions
-from pytest_kubernetes.portforwarding import PortForwarding
+from pytest_kubernetes.portforwarding import NativePortForwarding, PortForwarding
+from pytest_kubernetes.resources import (
+    ManifestInput,
+    ObjectReference,
+    collect_manifests,
+    fingerprints,
+    group_manifests,
+)
+from pytest_kubernetes import binaries, docker, snapshot, tracing
+from pytest_kubernetes.tracing import traced
+
+SYSTEM_NAMESPACES = [
+    "kube-system",
+    "kube-public",
+    "kube-node-lease",
+    "local-path-storage",
+]
+# seconds until the identity of an unreachable server is looked up again
+SERVER_IDENTITY_RETRY = 10
 
 
 class AClusterManager(ABC):
@@ -26,35 +54,72 @@ class AClusterManager(ABC):
         a Path instance to the kubeconfig file for this cluster (after it was created)
     context : str
         the name of the context (usually None)
+    namespace : str
+        the default namespace of this manager's operations (usually None, see scoped())
+    restored : bool
+        whether this cluster was created from a snapshot
 
     Methods
     -------
     kubectl():
         Execute kubectl command against this cluster
     apply():
-        Apply resources to this cluster, either from YAML file, or Python dict
+        Apply resources to this cluster from YAML files, directories, kustomize roots, YAML strings or dicts
+    apply_many():
+        Apply many resources concurrently, in dependency order (CRDs and Namespaces first)
     load_image():
         Load a container image into this cluster
+    load_images():
+        Load container images into this cluster concurrently, skip the ones already present
     logs():
         Get the logs of a pod
+    logs_stream():
+        Stream the logs of pods line by line (follow, since, tail, label selector)
+    assert_log_contains():
+        Wait for a log line containing a text
     port_forwarding():
-        Port forward a target
+        Port forward a target, or get a port forwarding shared across tests
+    stop_port_forwardings():
+        Stop the shared port forwardings of this cluster
     wait():
-        Wait for a target to be ready
+        Wait for one or many targets to meet a condition
     version():
         Get the Kubernetes version of this cluster
     create():
         Create this cluster
     delete():
         Delete this cluster
+    acreate(), adelete(), akubectl(), aapply(), await_for(), alogs(), alogs_stream():
+        Async counterparts that do not block the event loop
     reset():
-        Delete this cluster (if it exists) and create it again
+        Delete this cluster (if it exists) and create it again, or only remove all objects created since (soft)
+    snapshot():
+        Save the state of this cluster to create new clusters from it (k3d and kind)
+    scoped():
+        Get a manager for this cluster that operates in the given namespace by default
     """
 
     _binary_name = ""
     _cluster_options: ClusterOptions = ClusterOptions()
     context = None
+    namespace: str | None = None
+    restored = False
     _created = True
+    _booted = False
+    _baseline: Set[Tuple[str, str, str, str]] | None = None
+    _seeded: frozenset = frozenset()
+    _client: KubernetesClient | None = None
+    _client_key: Tuple | None = None
+    _cache_dir: Path | None = None
+    _cache_dir_key: Tuple | None = None
+    # the key of a failed server identity lookup and when to try it again
+    _cache_dir_failure: Tuple[Tuple, float] | None = None
+    # held while creating, so that processes sharing a kubeconfig boot the cluster only once
+    _creation_lock: AbstractContextManager = nullcontext()
+    # a deletion of a cluster with the same name that has to finish before creating
+    _pending_deletion: Future | None = None
+    # handed out by a ClusterPool, running already
+    _pooled = False
 
     def __init__(
         self,
@@ -62,6 +127,12 @@ class AClusterManager(ABC):
         provider_config: str | None = None,
         kubeconfig: Path | None = None,
     ) -> None:
+        # each manager works on its own copy of the (class-level) cluster options
+        self._cluster_options = replace(self._cluster_options)
+        # fingerprints of everything applied with apply() or apply_many(), see snapshot()
+        self._applied: Set[str] = set()
+        # port forwardings reused across tests, see port_forwarding(shared=True)
+        self._port_forwardings: Dict[Tuple, PortForwarding] = {}
         self._set_cluster_name(cluster_name, provider_config)
         self._ensure_executable()
         if kubeconfig:
@@ -90,7 +161,7 @@ class AClusterManager(ABC):
 
     @property
     def _exec_path(self) -> Path:
-        return Path(str(shutil.which(self.get_binary_name())))
+        return Path(str(binaries.which(self.get_binary_name())))
 
     def _ensure_executable(self) -> None:
         if not self._exec_path:
@@ -109,14 +180,19 @@ class AClusterManager(ABC):
         timeout: int | None = None,
     ) -> subprocess.CompletedProcess:
         _timout = timeout or self._cluster_options.cluster_timeout
-        proc = subprocess.run(
-            f"{self._exec_path} {' '.join(arguments)}",
-            env=self._get_exec_env().update(additional_env),
-            shell=True,
-            capture_output=True,
-            check=True,
-            timeout=_timout,
-        )
+        with tracing.span(
+            "exec", argv=[self.get_binary_name()] + arguments, **self.trace_labels
+        ) as span:
+            proc = subprocess.run(
+                f"{self._exec_path} {' '.join(arguments)}",
+                env={**self._get_exec_env(), **additional_env},
+                shell=True,
+                capture_output=True,
+                check=True,
+                timeout=_timout,
+            )
+            span.exit_code = proc.returncode
+            span.bytes_received = len(proc.stdout) + len(proc.stderr)
         return proc
 
     @abstractmethod
@@ -139,46 +215,353 @@ class AClusterManager(ABC):
     def cluster_name(self) -> str:
         return self._cluster_options.cluster_name or "pytest"
 
+    @property
+    def trace_labels(self) -> Dict[str, str]:
+        """Provider and cluster name of the spans of this cluster's operations"""
+        return {
+            "provider": self.get_binary_name() or "external",
+            "cluster_name": self.cluster_name,
+        }
+
+    def _api_client(self) -> KubernetesClient | None:
+        """Get an API client for this cluster; None if the kubeconfig is not usable for it"""
+        kubeconfig = self.kubeconfig
+        if not kubeconfig or not kubeconfig.is_file():
+            return None
+        key = (str(kubeconfig), kubeconfig.stat().st_mtime_ns, self.context)
+        if self._client is None or self._client_key != key:
+            try:
+                self._client = KubernetesClient(kubeconfig, self.context)
+            except (RuntimeError, OSError, ValueError, yaml.YAMLError):
+                self._client = None
+            self._client_key = key
+        return self._client
+
+    def _server_identity(self) -> Tuple[str, str]:
+        """Get the API server address and its git version"""
+        client = self._api_client()
+        if client is not None:
+            return client.server, client.get("/version", timeout=5)["gitVersion"]
+        data = Kubectl(self.kubeconfig, self.context)(["version"], timeout=5)
+        return "", data["serverVersion"]["gitVersion"]  # type: ignore
+
+    def _kubectl_cache_dir(self) -> Path | None:
+        """Get the kubectl discovery cache directory, keyed by cluster identity and server version"""
+        kubeconfig = self.kubeconfig
+        if (
+            not self._cluster_options.cache_dir
+            or not kubeconfig
+            or not kubeconfig.is_file()
+        ):
+            return None
+        key = (str(kubeconfig), kubeconfig.stat().st_mtime_ns, self.context)
+        if self._cache_dir_key != key:
+            failure = self._cache_dir_failure
+            if failure and failure[0] == key and monotonic() < failure[1]:
+                return None
+            try:
+                server, version = self._server_identity()
+            except (RuntimeError, KeyError, subprocess.TimeoutExpired):
+                # the cluster is not reachable (yet), do not settle on a cache directory;
+                # calls in the meantime run without one instead of probing the server again
+                self._cache_dir_failure = (key, monotonic() + SERVER_IDENTITY_RETRY)
+                return None
+            identity = hashlib.sha256(
+                f"{self.cluster_name}|{server}".encode("utf-8")
+            ).hexdigest()[:12]
+            self._cache_dir = Path(self._cluster_options.cache_dir) / (
+                f"{self.cluster_name}-{identity}-{version.replace('+', '_')}"
+            )
+            self._cache_dir_key = key
+        return self._cache_dir
+
+    def _invalidate_discovery(self) -> None:
+        """Drop cached API discovery, e.g. after a CustomResourceDefinition was applied"""
+        if self._cache_dir:
+            shutil.rmtree(self._cache_dir / "discovery", ignore_errors=True)
+        if self._client:
+            self._client.invalidate_discovery()
+
+    def _wait_for_service_account(self, namespace: str, timeout: float = 30) -> bool:
+        """Wait for the default service account of a namespace, pods can't be created before"""
+        client = self._api_client()
+        if client is None:
+            return True
+        return client.wait_for_object(
+            f"/api/v1/namespaces/{namespace}/serviceaccounts", "default", timeout
+        )
+
+    def _probe_ready(self, timeout: float) -> bool:
+        """Probe once whether the API server is ready and the default service account exists"""
+        client = self._api_client()
+        if client is not None:
+            if not client.readyz(timeout=min(timeout, 5)):
+                return False
+            try:
+                return client.wait_for_object(
+                    "/api/v1/namespaces/default/serviceaccounts",
+                    "default",
+                    timeout=timeout,
+                )
+            except RuntimeError:
+                return False
+        # fall back to the kubectl binary, e.g. for kubeconfigs with credential plugins
+        try:
+            ready = str(self.kubectl(["get", "--raw='/readyz?verbose'"], as_dict=False))
+            sa_available = str(
+                self.kubectl(["get", "sa", "default", "-n", "default"], as_dict=False)
+            )
+        except RuntimeError:
+            return False
+        return "readyz check passed" in ready and "not found" not in sa_available
+
     #
     # Interface
     #
 
+    def _kubectl(self) -> Kubectl:
+        kubectl = Kubectl(
+            self.kubeconfig,
+            self.context,
+            client=self._api_client() if self._cluster_options.native_client else None,
+            cache_dir=self._kubectl_cache_dir(),
+        )
+        kubectl.trace_labels = self.trace_labels
+        return kubectl
+
+    def _scope(self, args: List[str]) -> List[str]:
+        """Add this manager's namespace to the arguments, unless they select one themselves"""
+        if not self.namespace or any(
+            arg in ["-n", "--namespace", "-A", "--all-namespaces"]
+            or arg.startswith(("-n=", "--namespace="))
+            for arg in args
+        ):
+            return args
+        return args + [f"--namespace={self.namespace}"]
+
     def kubectl(
         self, args: List[str], as_dict: bool = True, timeout: int = 60
     ) -> dict | str:
         """Execute kubectl command against this cluster"""
-        return Kubectl(self.kubeconfig, self.context)(args, as_dict, timeout)
-
-    def apply(self, input: Union[Path, Dict]) -> None:
-        """Apply resources to this cluster, either from YAML file, or Python dict"""
-        if type(input) in [Path, str] or isinstance(input, Path):
-            self.kubectl(["apply", "-f", str(input)], as_dict=False)
-        elif type(input) is dict:
-            _yaml = yaml.dump(input)
-            Kubectl(
-                self.kubeconfig,
-                self.context,
-                command_prefix=[
-                    "echo",
-                    f"'{_yaml}'",
-                    "|",
-                ],
-            )(["apply", "-f", "-"], as_dict=False)
-        else:
-            raise RuntimeError(f"Input must be of type Path or dict, was {type(input)}")
+        return self._kubectl()(self._scope(args), as_dict, timeout)
+
+    async def akubectl(
+        self,
+        args: List[str],
+        as_dict: bool = True,
+        timeout: int = 60,
+        stdin: bytes | None = None,
+    ) -> dict | str:
+        """Execute kubectl command against this cluster without blocking the event loop"""
+        return await self._kubectl().acall(self._scope(args), as_dict, timeout, stdin)
+
+    def scoped(self, namespace: str) -> "AClusterManager":
+        """Get a manager for this cluster that operates in the given namespace by default"""
+        manager = copy.copy(self)
+        manager.namespace = namespace
+        return manager
+
+    @traced("apply")
+    def apply(
+        self,
+        input: ManifestInput,
+        server_side: bool = True,
+        field_manager: str = "pytest-kubernetes",
+        force_conflicts: bool = False,
+        timeout: int = 60,
+    ) -> List[ObjectReference]:
+        """Apply resources to this cluster and return the identities of the applied objects
+
+        The input can be a YAML file, a directory, a kustomize root, a (multi-document) YAML
+        string, a Python dict or an iterable of those. All manifests are applied with a single
+        kubectl call (or in-process with the native client), server-side by default.
+        """
+        manifests, sources = collect_manifests(input)
+        self._applied.update(fingerprints(manifests, sources))
+        return self._apply(
+            manifests, sources, server_side, field_manager, force_conflicts, timeout
+        )
+
+    async def aapply(self, *args, **kwargs) -> List[ObjectReference]:
+        """Apply resources without blocking the event loop; see apply() for the arguments"""
+        return await run_blocking(self.apply, *args, **kwargs)  # type: ignore
+
+    def _apply(
+        self,
+        manifests: List[Dict],
+        sources: List[Tuple[str, str]],
+        server_side: bool = True,
+        field_manager: str = "pytest-kubernetes",
+        force_conflicts: bool = False,
+        timeout: int = 60,
+    ) -> List[ObjectReference]:
+        flags = []
+        if server_side:
+            flags += ["--server-side", f"--field-manager={field_manager}"]
+            if force_conflicts:
+                flags.append("--force-conflicts")
+        applied: List[Dict] = []
+        client = self._api_client() if self._cluster_options.native_client else None
+        if manifests and client and server_side:
+            native = NativeKubectl(client)
+            applied += [
+                native.apply_manifest(
+                    manifest,
+                    self.namespace,
+                    field_manager=field_manager,
+                    force=force_conflicts,
+                    timeout=timeout,
+                )
+                for manifest in manifests
+            ]
+        elif manifests:
+            batch = {"apiVersion": "v1", "kind": "List", "items": manifests}
+            applied += self._objects(
+                self._kubectl()(
+                    self._scope(["apply", "-f", "-"] + flags),
+                    timeout=timeout,
+                    stdin=json.dumps(batch).encode("utf-8"),
+                )
+            )
+        for flag, location in sources:
+            applied += self._objects(
+                self._kubectl()(
+                    self._scope(["apply", flag, location] + flags), timeout=timeout
+                )
+            )
+        if any(obj.get("kind") == "CustomResourceDefinition" for obj in applied):
+            self._invalidate_discovery()
+        return [ObjectReference.from_manifest(obj) for obj in applied]
+
+    @traced("apply_many")
+    def apply_many(
+        self,
+        input: ManifestInput,
+        max_workers: int = 4,
+        timeout: int = 60,
+        **kwargs,
+    ) -> List[ObjectReference]:
+        """Apply many resources concurrently in dependency order
+
+        Manifests are grouped by kind (CRDs, Namespaces, RBAC, config, workloads and everything
+        else). Each group is applied by up to max_workers concurrent apply() calls; CRDs are awaited
+        to be established before the next group. Kustomize roots are rendered with kubectl first.
+        Additional keyword arguments are passed on to apply().
+        """
+        manifests, sources = collect_manifests(input)
+        self._applied.update(fingerprints(manifests, sources))
+        urls = []
+        for flag, location in sources:
+            if flag == "-k":
+                rendered = self.kubectl(["kustomize", location], as_dict=False)
+                manifests += collect_manifests(str(rendered))[0]
+            else:
+                urls.append(location)
+
+        applied: List[ObjectReference] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for group in group_manifests(manifests):
+                size = -(-len(group) // max_workers)
+                chunks = [group[i : i + size] for i in range(0, len(group), size)]
+                for result in executor.map(
+                    tracing.propagate(
+                        lambda chunk: self._apply(chunk, [], timeout=timeout, **kwargs)
+                    ),
+                    chunks,
+                ):
+                    applied += result
+                crds = [
+                    f"crd/{m['metadata']['name']}"
+                    for m in group
+                    if m.get("kind") == "CustomResourceDefinition"
+                ]
+                if crds:
+                    self.kubectl(
+                        ["wait", "--for=condition=Established", f"--timeout={timeout}s"]
+                        + crds,
+                        as_dict=False,
+                        timeout=timeout,
+                    )
+        if urls:
+            applied += self._apply(
+                [], [("-f", url) for url in urls], timeout=timeout, **kwargs
+            )
+        return applied
+
+    @staticmethod
+    def _objects(output: Dict | str) -> List[Dict]:
+        if not isinstance(output, dict):
+            return []
+        if output.get("kind") == "List":
+            return output.get("items", [])  # type: ignore
+        return [output]
 
+    @traced("wait")
     def wait(
-        self, name: str, waitfor: str, timeout: int = 90, namespace: str = "default"
+        self,
+        name: str | List[Tuple[str, str]],
+        waitfor: str | None = None,
+        timeout: int = 90,
+        namespace: str | None = None,
+    ) -> None:
+        """Wait for a target and a condition, or for a list of (target, condition) pairs
+
+        Conditions use the syntax of 'kubectl wait --for' (condition=..., jsonpath=..., create,
+        delete) or are 'rollout' for a completed rollout. With the native client, all targets are
+        watched at once and waiting fails early if a target cannot recover (e.g. ImagePullBackOff);
+        otherwise 'kubectl wait' (or 'kubectl rollout status') runs for each target.
+        """
+        if isinstance(name, str) and waitfor is None:
+            raise ValueError(f"Waiting for {name} needs a condition (waitfor)")
+        targets = [(name, str(waitfor))] if isinstance(name, str) else list(name)
+        _namespace = namespace or self.namespace or "default"
+        client = self._api_client() if self._cluster_options.native_client else None
+        if client and all(
+            "/" in target and supported(condition) for target, condition in targets
+        ):
+            try:
+                resolved = [
+                    Target(
+                        client.resource(target.split("/", 1)[0]),
+                        target.split("/", 1)[1],
+                        _namespace,
+                        condition,
+                    )
+                    for target, condition in targets
+                ]
+            except RuntimeError:
+                # unknown resource types are reported by kubectl
+                pass
+            else:
+                Waiter(client, resolved).wait(timeout)
+                return
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = [
+                executor.submit(
+                    tracing.propagate(self._kubectl_wait),
+                    target,
+                    condition,
+                    timeout,
+                    _namespace,
+                )
+                for target, condition in targets
+            ]
+            for future in futures:
+                future.result()
+
+    async def await_for(self, *args, **kwargs) -> None:
+        """Wait for targets without blocking the event loop; see wait() for the arguments"""
+        await run_blocking(self.wait, *args, **kwargs)
+
+    def _kubectl_wait(
+        self, target: str, condition: str, timeout: int, namespace: str
     ) -> None:
-        """Wait for a target and a contition"""
+        if condition in ["rollout", "rollout complete"]:
+            args = ["rollout", "status", target]
+        else:
+            args = ["wait", target, f"--for={condition}"]
         self.kubectl(
-            [
-                "wait",
-                name,
-                f"--for={waitfor}",
-                f"--timeout={timeout}s",
-                f"--namespace={namespace}",
-            ],
+            args + [f"--timeout={timeout}s", f"--namespace={namespace}"],
             as_dict=False,
             timeout=timeout,
         )
@@ -186,26 +569,101 @@ class AClusterManager(ABC):
     def port_forwarding(
         self,
         target: str,
-        source_port: int,
-        target_port: int,
-        namespace: str = "default",
+        source_port: int | None = None,
+        target_port: int | None = None,
+        namespace: str | None = None,
         timeout: int = 90,
+        ports: List[Tuple[int | None, int]] | None = None,
+        shared: bool = False,
     ) -> PortForwarding:
-        """Forward a local port to a pod"""
-        return PortForwarding(
-            target,
-            (source_port, target_port),
-            namespace,
-            self.kubeconfig,
-            self.context,
-            timeout,
-        )
+        """Forward a local port to a pod
+
+        A source_port of 0 or None picks a free local port (see PortForwarding.local_port).
+        Pass a list of (source_port, target_port) pairs as ports to forward several ports of
+        the target with a single process.
+
+        With the native client, the ports are forwarded in-process over WebSockets (see
+        NativePortForwarding) instead of by a kubectl process.
+
+        With shared, a started port forwarding is returned that is reused by all calls with
+        the same target, namespace and ports. It is restarted if it is not healthy anymore
+        (e.g. the pod was rescheduled), and stopped when this cluster is deleted.
+        """
+        if ports is None:
+            if target_port is None:
+                raise ValueError("Either a target_port or ports are required")
+            ports = [(source_port, target_port)]
+        _namespace = namespace or self.namespace or "default"
+        key = (target, _namespace, tuple((s or 0, t) for s, t in ports))
+        forwarding = self._port_forwardings.get(key) if shared else None
+        if forwarding is None:
+            client = self._api_client() if self._cluster_options.native_client else None
+            if client:
+                forwarding = NativePortForwarding(
+                    target,
+                    ports,
+                    _namespace,
+                    self.kubeconfig,
+                    self.context,
+                    timeout,
+                    shared=shared,
+                    client=client,
+                )
+            else:
+                forwarding = PortForwarding(
+                    target,
+                    ports,
+                    _namespace,
+                    self.kubeconfig,
+                    self.context,
+                    timeout,
+                    shared=shared,
+                )
+            forwarding.trace_labels = self.trace_labels
+            if not shared:
+                return forwarding
+            forwarding.start()
+            self._port_forwardings[key] = forwarding
+        elif not forwarding.healthy():
+            forwarding.restart()
+        return forwarding
+
+    def stop_port_forwardings(self) -> None:
+        """Stop the shared port forwardings of this cluster"""
+        for forwarding in self._port_forwardings.values():
+            forwarding.stop()
+        self._port_forwardings.clear()
 
     @abstractmethod
     def load_image(self, image: str) -> None:
         """Load a container image into this cluster"""
         raise NotImplementedError
 
+    @traced("load_images")
+    def load_images(self, images: List[str], max_workers: int = 4) -> List[str]:
+        """Load container images into this cluster, returns the images that were loaded
+
+        Images that are present on all nodes with the same ID as the local image are skipped,
+        the others are loaded concurrently.
+        """
+        present = self._node_image_ids()
+        missing = []
+        for image in images:
+            image_id = docker.image_id(image)
+            if image_id is None or image_id not in present:
+                missing.append(image)
+        if missing:
+            self._load_images(missing, max_workers)
+        return missing
+
+    def _load_images(self, images: List[str], max_workers: int) -> None:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(tracing.propagate(self.load_image), images))
+
+    def _node_image_ids(self) -> Set[str]:
+        """The IDs of the images present on all nodes of this cluster (empty if unknown)"""
+        return set()
+
     def logs(
         self, pod: str, container: str | None = None, namespace: str | None = None
     ) -> str:
@@ -219,18 +677,145 @@ class AClusterManager(ABC):
 
         return self.kubectl(args, as_dict=False)  # type: ignore
 
+    def logs_stream(
+        self,
+        pod: str | None = None,
+        container: str | None = None,
+        namespace: str | None = None,
+        label_selector: str | None = None,
+        follow: bool = False,
+        since: int | str | None = None,
+        tail: int | None = None,
+        prefix: bool | None = None,
+        timeout: float | None = None,
+    ) -> LogStream:
+        """Stream the logs of a pod, or of all pods matching a label selector, line by line
+
+        All containers of the pods are streamed unless a container is given; since is given in
+        seconds or as duration ('5m'). Pods that are created after the stream was opened are
+        not included. Iterate over the returned stream; use it as context manager to close it.
+        """
+        _namespace = namespace or self.namespace or "default"
+        if pod:
+            pods = [self.kubectl(["get", "pod", pod.split("/")[-1], "-n", _namespace])]
+        elif label_selector:
+            pods = self.kubectl(
+                ["get", "pods", "-l", label_selector, "-n", _namespace]
+            )["items"]  # type: ignore
+        else:
+            raise ValueError("Either a pod or a label_selector is required")
+        sources = [
+            (p["metadata"]["name"], c)  # type: ignore
+            for p in pods
+            for c in (
+                [container]
+                if container
+                else [c["name"] for c in p["spec"]["containers"]]  # type: ignore
+            )
+        ]
+        return LogStream(
+            sources,
+            _namespace,
+            follow=follow,
+            since=since,
+            tail=tail,
+            prefix=prefix,
+            timeout=timeout,
+            kubectl=self._kubectl(),
+            client=self._api_client() if self._cluster_options.native_client else None,
+        )
+
+    def assert_log_contains(self, text: str, timeout: float = 60, **kwargs) -> str:
+        """Wait for a log line containing text and return it; see logs_stream() for the arguments"""
+        with self.logs_stream(follow=True, timeout=timeout, **kwargs) as stream:
+            for line in stream:
+                if text in line:
+                    return line
+        raise AssertionError(f"'{text}' did not appear in the logs within {timeout}s")
+
+    async def alogs(
+        self, pod: str, container: str | None = None, namespace: str | None = None
+    ) -> str:
+        """Get the logs of a pod without blocking the event loop"""
+        args = ["logs", pod]
+        if namespace:
+            args.extend(["-n", namespace])
+        if container:
+            args.extend(["-c", container])
+        return await self.akubectl(args, as_dict=False)  # type: ignore
+
+    async def alogs_stream(self, **kwargs) -> AsyncIterator[str]:
+        """Stream log lines asynchronously; see logs_stream() for the arguments"""
+        stream = await run_blocking(self.logs_stream, **kwargs)
+        lines = iter(stream)
+        try:
+            while (line := await run_blocking(next, lines, None)) is not None:
+                yield line
+        finally:
+            stream.close()
+
     def version(self) -> Tuple[int, int]:
         """Get the Kubernetes version of this cluster"""
         data = self.kubectl(["version"])
         return int(data["serverVersion"]["major"]), int(data["serverVersion"]["minor"])  # type: ignore
 
+    @traced("create")
     def create(
         self,
         cluster_options: ClusterOptions | None = None,
         timeout: int = 20,
+        from_snapshot: str | None = None,
+        seed: ManifestInput | None = None,
+        **kwargs,
+    ) -> None:
+        """Create this cluster
+
+        With from_snapshot, the cluster is restored from the snapshot of this name that was
+        taken after applying exactly the seed manifests (see snapshot()). If there is no such
+        snapshot, the cluster is booted and the seed manifests are applied; check 'restored'.
+        """
+        if self._pooled and (
+            kwargs
+            or from_snapshot
+            or seed is not None
+            or self._changes_cluster(cluster_options)
+        ):
+            raise RuntimeError(
+                f"Cluster '{self.cluster_name}' is a pooled cluster and already running, it "
+                "can't be created with other options; request a dedicated cluster with "
+                "@pytest.mark.k8s(cluster_name=...)"
+            )
+        if self._pending_deletion is not None:
+            # errors of the deletion are reported at the end of the session
+            wait_futures([self._pending_deletion])
+            self._pending_deletion = None
+        with self._creation_lock:
+            self._create(cluster_options, timeout, from_snapshot, seed, **kwargs)
+
+    def _changes_cluster(self, cluster_options: ClusterOptions | None) -> bool:
+        """Whether creating with these options would result in another cluster"""
+        if cluster_options is None:
+            return False
+        merged = self._cluster_options | cluster_options
+        return any(
+            getattr(merged, name) != getattr(self._cluster_options, name)
+            for name in [
+                "cluster_name",
+                "api_version",
+                "kubeconfig_path",
+                "provider_config",
+                "registry_mirror",
+            ]
+        )
+
+    def _create(
+        self,
+        cluster_options: ClusterOptions | None,
+        timeout: int,
+        from_snapshot: str | None = None,
+        seed: ManifestInput | None = None,
         **kwargs,
     ) -> None:
-        """Create this cluster"""
         if cluster_options:
             self._cluster_options = (
                 self._cluster_options | cluster_options
@@ -244,52 +829,251 @@ class AClusterManager(ABC):
             self._set_cluster_name(
                 self.cluster_name, self._cluster_options.provider_config
             )
-        if self.ready(timeout=2):
-            self._created = False
-            return
-        self._on_create(self._cluster_options, **kwargs)
+        # a freshly generated kubeconfig is empty, so there can't be a running cluster yet
+        kubeconfig = self.kubeconfig
+        if kubeconfig and kubeconfig.is_file() and kubeconfig.stat().st_size:
+            if self.ready(timeout=2):
+                # a running cluster is only owned if this manager booted it earlier; listing
+                # all objects of a cluster it did not boot (for a baseline) is too expensive
+                self._created = self._booted
+                return
+        seeded = fingerprints(*collect_manifests(seed)) if seed is not None else set()
+        image = self._snapshot_image(from_snapshot, seeded) if from_snapshot else None
+        self.restored = bool(image and docker.image_exists(image))
+        if self.restored:
+            self._on_restore(image, self._cluster_options, **kwargs)  # type: ignore
+            # a restored control plane takes a while to come up again
+            timeout = max(timeout, self._cluster_options.cluster_timeout)
+        else:
+            self._on_create(self._cluster_options, **kwargs)
+        self._created = self._booted = True
         # check if this cluster is ready: readyz check passed and default service account is available
         if not self.ready(timeout):
             raise RuntimeError(f"Cluster '{self.cluster_name}' is not ready.")
+        # the server is reachable now, look up its identity for the cache directory again
+        self._cache_dir_failure = None
+        if not self.restored and seed is not None:
+            self.apply(seed)
+        self._seeded = frozenset(seeded)
+        self._applied = set(seeded)
+        # the seed belongs to the baseline; this also pre-warms the discovery cache
+        self._capture_baseline()
+
+    async def acreate(self, *args, **kwargs) -> None:
+        """Create this cluster without blocking the event loop; see create() for the arguments"""
+        await run_blocking(self.create, *args, **kwargs)
+
+    def _snapshot_image(self, name: str, applied: Set[str]) -> str:
+        """The image of a snapshot, tagged with a digest of the applied manifests"""
+        digest = hashlib.sha256(
+            "\n".join(
+                sorted(applied) + [f"version {self._cluster_options.api_version}"]
+            ).encode()
+        ).hexdigest()
+        return f"{snapshot.SNAPSHOT_REPOSITORY}/{self.get_binary_name()}-{name.lower()}:{digest[:16]}"
+
+    @traced("snapshot")
+    def snapshot(self, name: str) -> str:
+        """Save the state of this cluster as a snapshot to create clusters from; returns its image
+
+        The snapshot is keyed by everything applied with apply() or apply_many() since this
+        cluster was created, so create(from_snapshot=name, seed=...) only restores it for the
+        same seed manifests. Only single-node k3d and kind clusters support snapshots.
+        """
+        image = self._snapshot_image(name, self._applied)
+        self._on_snapshot(image)
+        if not self.ready(self._cluster_options.cluster_timeout):
+            raise RuntimeError(f"Cluster '{self.cluster_name}' is not ready.")
+        return image
+
+    def _on_snapshot(self, image: str) -> None:
+        raise RuntimeError(f"Snapshots are not supported by {type(self).__name__}")
+
+    def _on_restore(
+        self, image: str, cluster_options: ClusterOptions, **kwargs
+    ) -> None:
+        raise RuntimeError(f"Snapshots are not supported by {type(self).__name__}")
 
+    @traced("ready")
     def ready(self, timeout: int = 20) -> bool:
-        """Check if this cluster is ready"""
-        _i = 0
-        ready = "Nope"
-        sa_available = "Nope"
-        while _i < timeout:
-            sleep(1)
-            try:
-                ready = str(
-                    self.kubectl(["get", "--raw='/readyz?verbose'"], as_dict=False)
-                )
-                sa_available = str(
-                    self.kubectl(
-                        ["get", "sa", "default", "-n", "default"], as_dict=False
-                    )
-                )
-            except RuntimeError:
-                _i += 1
-                continue
-            if "readyz check passed" in ready and "not found" not in sa_available:
-                break
-            else:
-                _i += 1
-        else:
-            return False
-        return True
+        """Check if this cluster is ready (probed with exponential backoff)"""
+        deadline = monotonic() + timeout
+        for delay in backoff(timeout):
+            if self._probe_ready(max(deadline - monotonic(), 0.1)):
+                return True
+            sleep(delay)
+        return False
 
+    @traced("delete")
     def delete(self) -> None:
         """Delete this cluster"""
+        self.stop_port_forwardings()
         if self._created:
             # if this cluster was not created by this manager, leave it alone
             self._on_delete()
+            self._booted = False
+            self._applied.clear()
             if self.kubeconfig:
                 self.kubeconfig.unlink(missing_ok=True)
                 self._cluster_options.kubeconfig_path = None
-            sleep(1)
 
-    def reset(self) -> None:
-        """Reset this cluster (delete if exists and recreates)"""
-        self.delete()
-        self.create()
+    async def adelete(self) -> None:
+        """Delete this cluster without blocking the event loop"""
+        await run_blocking(self.delete)
+
+    @staticmethod
+    def _identity(obj: Dict) -> Tuple[str, str, str, str]:
+        return (
+            obj["apiVersion"].rpartition("/")[0],
+            obj["kind"],
+            obj["metadata"].get("namespace", ""),
+            obj["metadata"]["name"],
+        )
+
+    def _list_objects(self) -> List[Dict]:
+        """List all objects of this cluster that can be deleted"""
+        resources = str(
+            self.kubectl(
+                ["api-resources", "--verbs=list,delete", "-o", "name"], as_dict=False
+            )
+        ).split()
+        data = self.kubectl(
+            ["get", ",".join(resources), "--all-namespaces"], timeout=120
+        )
+        return data.get("items", [])  # type: ignore
+
+    def _capture_baseline(self) -> None:
+        """Remember the objects present in the fresh cluster, for soft resets"""
+        try:
+            self._baseline = {self._identity(obj) for obj in self._list_objects()}
+        except RuntimeError:
+            self._baseline = None
+
+    def _delete_objects(
+        self, kind: str, namespace: str, names: List[str], timeout: int
+    ) -> None:
+        args = ["delete", kind] + names
+        if namespace:
+            args += ["--namespace", namespace]
+        self.kubectl(
+            args
+            + [
+                "--cascade=foreground",
+                "--wait=true",
+                "--ignore-not-found",
+                f"--timeout={timeout}s",
+            ],
+            as_dict=False,
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def _is_system_object(obj: Dict) -> bool:
+        """Objects in system namespaces, or installed by the distribution (e.g. k3s' addons)"""
+        metadata = obj["metadata"]
+        return (
+            metadata.get("namespace", "") in SYSTEM_NAMESPACES
+            or (metadata.get("annotations") or {}).get("meta.helm.sh/release-namespace")
+            in SYSTEM_NAMESPACES
+            or "objectset.rio.cattle.io/hash" in (metadata.get("labels") or {})
+        )
+
+    def _soft_reset(self, timeout: int) -> None:
+        if self._baseline is None:
+            raise RuntimeError(
+                f"There is no baseline for a soft reset of cluster '{self.cluster_name}'"
+            )
+        objects = [
+            obj
+            for obj in self._list_objects()
+            if self._identity(obj) not in self._baseline
+            # owned objects are garbage collected along with their owners
+            and not obj["metadata"].get("ownerReferences")
+            and obj["kind"] != "Event"
+            and not self._is_system_object(obj)
+        ]
+        # objects in deleted namespaces are removed along with the namespace
+        namespaces = {
+            obj["metadata"]["name"] for obj in objects if obj["kind"] == "Namespace"
+        }
+        batches: Dict[Tuple[str, str], List[str]] = {}
+        for obj in objects:
+            group, kind, namespace, name = self._identity(obj)
+            if namespace in namespaces:
+                continue
+            version = obj["apiVersion"].rpartition("/")[2]
+            _kind = f"{kind.lower()}.{version}.{group}" if group else kind.lower()
+            batches.setdefault((_kind, namespace), []).append(name)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(
+                    tracing.propagate(self._delete_objects),
+                    kind,
+                    namespace,
+                    names,
+                    timeout,
+                )
+                for (kind, namespace), names in batches.items()
+            ]
+            for future in futures:
+                future.result()
+        self._applied.intersection_update(self._seeded)
+        if not self.ready(timeout):
+            raise RuntimeError(f"Cluster '{self.cluster_name}' is not ready.")
+
+    @traced("reset")
+    def reset(self, mode: str = "hard", timeout: int = 90) -> None:
+        """Reset this cluster
+
+        A hard reset deletes this cluster (if it exists) and creates it again. A soft reset
+        deletes all objects that were not present right after the cluster was created; it
+        is only supported for clusters this manager booted.
+        """
+        if mode == "soft":
+            self._soft_reset(timeout)
+        elif mode == "hard":
+            self.delete()
+            self.create()
+        else:
+            raise ValueError(f"Reset mode must be 'hard' or 'soft', was '{mode}'")
+
+
+def create_clusters(
+    managers: List[AClusterManager],
+    cluster_options: ClusterOptions | None = None,
+    timeout: int = 20,
+    **kwargs,
+) -> None:
+    """Create many clusters concurrently, e.g. for multi-cluster tests
+
+    Each cluster is created (with the same arguments as create()) in its own thread, so
+    the clusters boot independently of each other within their own timeout. Returns once
+    all clusters are ready. If any of them failed, a RuntimeError lists the failure of each
+    cluster; the clusters that were created are left running and have to be deleted by
+    the caller.
+    """
+    if not managers:
+        return
+    names = [manager.cluster_name for manager in managers]
+    if len(set(names)) < len(names):
+        raise ValueError(f"The clusters need distinct names, got {names}")
+    with ThreadPoolExecutor(
+        max_workers=len(managers), thread_name_prefix="k8s-create"
+    ) as executor:
+        futures = [
+            executor.submit(
+                tracing.propagate(manager.create), cluster_options, timeout, **kwargs
+            )
+            for manager in managers
+        ]
+        errors = []
+        for manager, future in zip(managers, futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"{manager.cluster_name}: {e}")
+    if errors:
+        raise RuntimeError(
+            f"Creating {len(errors)} of {len(managers)} clusters failed:\n"
+            + "\n".join(errors)
+        )
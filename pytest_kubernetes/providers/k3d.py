@@ -1,7 +1,10 @@
+from pytest_kubernetes import binaries, docker, snapshot
+from pytest_kubernetes.mirror import config_file
 from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes.tracing import traced
 from pytest_kubernetes.options import ClusterOptions
-import subprocess
 import re
+from typing import List, Set
 
 
 class K3dManagerBase(AClusterManager):
@@ -11,15 +14,9 @@ class K3dManagerBase(AClusterManager):
 
     @classmethod
     def get_k3d_version(self) -> str:
-        version_proc = subprocess.run(
-            "k3d --version",
-            shell=True,
-            capture_output=True,
-            check=True,
-            timeout=10,
-        )
+        # probed once per binary (and cached in the pytest cache)
         version_match = re.match(
-            r"k3d version v(\d+\.\d+\.\d+)", version_proc.stdout.decode()
+            r"k3d version v(\d+\.\d+\.\d+)", binaries.probe("k3d", ["--version"])
         )
         if not version_match:
             return "0.0.0"
@@ -29,7 +26,7 @@ class K3dManagerBase(AClusterManager):
         return f"rancher/k3s:v{version}-k3s1"
 
     def _on_create(self, cluster_options: ClusterOptions, **kwargs) -> None:
-        opts = kwargs.get("options", [])
+        opts = list(kwargs.get("options", []))
 
         # see https://k3d.io/v5.1.0/usage/configfile/
         if (
@@ -64,13 +61,30 @@ class K3dManagerBase(AClusterManager):
                     f"--timeout={cluster_options.cluster_timeout}s",
                 ]
 
-        self._exec(
-            [
-                "cluster",
-                "create",
-            ]
-            + opts
-        )
+        self._create_cluster(opts, cluster_options)
+
+    def _create_cluster(self, opts: List[str], cluster_options: ClusterOptions) -> None:
+        """Run 'k3d cluster create' with the registry mirror, and write the kubeconfig"""
+        mirror = cluster_options.registry_mirror
+        if mirror:
+            mirror.start()
+            # k3d makes the host reachable as host.k3d.internal from the nodes
+            with config_file(
+                mirror.registries_yaml(mirror.endpoint("host.k3d.internal"))
+            ) as registries:
+                self._exec(
+                    ["cluster", "create"]
+                    + opts
+                    + ["--registry-config", str(registries)]
+                )
+        else:
+            self._exec(
+                [
+                    "cluster",
+                    "create",
+                ]
+                + opts
+            )
         self._exec(
             [
                 "kubeconfig",
@@ -84,5 +98,58 @@ class K3dManagerBase(AClusterManager):
     def _on_delete(self) -> None:
         self._exec(["cluster", "delete", self.cluster_name])
 
+    def _on_snapshot(self, image: str) -> None:
+        nodes = docker.containers(f"k3d.cluster={self.cluster_name}", "k3d.role=server")
+        agents = docker.containers(f"k3d.cluster={self.cluster_name}", "k3d.role=agent")
+        if len(nodes) != 1 or agents:
+            raise RuntimeError("Snapshots are only supported for single-node clusters")
+        labels = {
+            snapshot.NODE_NAME_LABEL: docker.inspect(nodes[0], "{{.Config.Hostname}}"),
+            # the datastore is encrypted with the cluster token
+            "pytest-kubernetes.token": docker.inspect(
+                nodes[0], '{{index .Config.Labels "k3d.cluster.token"}}'
+            ),
+        }
+        self._exec(["cluster", "stop", self.cluster_name])
+        try:
+            snapshot.commit(nodes[0], image, "/var/lib/rancher/k3s", labels)
+        finally:
+            self._exec(["cluster", "start", self.cluster_name])
+
+    def _on_restore(
+        self, image: str, cluster_options: ClusterOptions, **kwargs
+    ) -> None:
+        labels = docker.image_labels(image)
+        opts = list(kwargs.get("options", []))
+        opts += [
+            self.cluster_name,
+            "--kubeconfig-update-default=0",
+            "--image",
+            image,
+            "--token",
+            labels["pytest-kubernetes.token"],
+            # keep the node of the snapshot, so that its workloads are not rescheduled
+            "--k3s-arg",
+            f"--node-name={labels[snapshot.NODE_NAME_LABEL]}@server:0",
+            "--wait",
+            f"--timeout={cluster_options.cluster_timeout}s",
+        ]
+        self._create_cluster(opts, cluster_options)
+
+    @traced("load_image")
     def load_image(self, image: str) -> None:
         self._exec(["image", "import", image, "--cluster", self.cluster_name])
+
+    def _load_images(self, images: List[str], max_workers: int) -> None:
+        # k3d imports several images with a single tarball
+        self._exec(["image", "import"] + images + ["--cluster", self.cluster_name])
+
+    def _node_image_ids(self) -> Set[str]:
+        nodes = [
+            node
+            for role in ["server", "agent"]
+            for node in docker.containers(
+                f"k3d.cluster={self.cluster_name}", f"k3d.role={role}"
+            )
+        ]
+        return set.intersection(*map(docker.node_image_ids, nodes)) if nodes else set()
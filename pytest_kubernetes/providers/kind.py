@@ -1,5 +1,11 @@
+from pytest_kubernetes import docker, snapshot
+from pytest_kubernetes.mirror import config_file
 from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes.tracing import traced
 from pytest_kubernetes.options import ClusterOptions
+from typing import Dict, List, Set
+
+import yaml
 
 
 class KindManagerBase(AClusterManager):
@@ -8,7 +14,7 @@ class KindManagerBase(AClusterManager):
         return "kind"
 
     def _on_create(self, cluster_options: ClusterOptions, **kwargs) -> None:
-        opts = kwargs.get("options", [])
+        opts = list(kwargs.get("options", []))
 
         # see https://kind.sigs.k8s.io/docs/user/configuration/#getting-started
         if cluster_options.provider_config:
@@ -28,16 +34,117 @@ class KindManagerBase(AClusterManager):
                 f"kindest/node:v{cluster_options.api_version}",
             ]
 
-        _ = self._exec(
+        mirror = cluster_options.registry_mirror
+        if mirror:
+            mirror.start()
+            # nodes resolve the mirror by name on the 'kind' network (if it exists already)
+            mirror.connect("kind")
+            config: Dict = {"kind": "Cluster", "apiVersion": "kind.x-k8s.io/v1alpha4"}
+            if cluster_options.provider_config:
+                config = yaml.safe_load(cluster_options.provider_config.read_text())
+            config.setdefault("containerdConfigPatches", []).append(
+                mirror.containerd_patch(mirror.endpoint())
+            )
+            with config_file(yaml.safe_dump(config)) as path:
+                # the last --config flag takes effect
+                _ = self._exec(["create", "cluster"] + opts + ["--config", str(path)])
+            mirror.connect("kind")
+        else:
+            _ = self._exec(
+                [
+                    "create",
+                    "cluster",
+                ]
+                + opts
+            )
+
+    def _on_delete(self) -> None:
+        _ = self._exec(["delete", "cluster", "--name", self.cluster_name])
+
+    def _on_snapshot(self, image: str) -> None:
+        nodes = docker.containers(f"io.x-k8s.kind.cluster={self.cluster_name}")
+        if len(nodes) != 1:
+            raise RuntimeError("Snapshots are only supported for single-node clusters")
+        labels = {
+            snapshot.NODE_NAME_LABEL: docker.inspect(nodes[0], "{{.Config.Hostname}}")
+        }
+        docker.stop(nodes[0])
+        try:
+            # /var holds the etcd data and containerd's images
+            snapshot.commit(nodes[0], image, "/var", labels)
+        finally:
+            docker.start(nodes[0])
+
+    def _on_restore(
+        self, image: str, cluster_options: ClusterOptions, **kwargs
+    ) -> None:
+        # 'kind create cluster' would run kubeadm again, so the node is started like kind does
+        hostname = docker.image_labels(image)[snapshot.NODE_NAME_LABEL]
+        self._run_node(
             [
-                "create",
-                "cluster",
+                "--hostname",
+                hostname,
+                "--name",
+                f"{self.cluster_name}-control-plane",
+                "--label",
+                f"io.x-k8s.kind.cluster={self.cluster_name}",
+                "--label",
+                "io.x-k8s.kind.role=control-plane",
+                "--publish=127.0.0.1::6443/TCP",
+                image,
+            ]
+        )
+        self._exec(
+            [
+                "get",
+                "kubeconfig",
+                "--name",
+                self.cluster_name,
+                ">",
+                str(cluster_options.kubeconfig_path),
             ]
-            + opts
         )
 
-    def _on_delete(self) -> None:
-        _ = self._exec(["delete", "cluster", "--name", self.cluster_name])
+    @staticmethod
+    def _run_node(arguments: List[str]) -> None:
+        docker.run(
+            [
+                "run",
+                "--detach",
+                "--tty",
+                "--privileged",
+                "--security-opt",
+                "seccomp=unconfined",
+                "--security-opt",
+                "apparmor=unconfined",
+                "--tmpfs",
+                "/tmp",
+                "--tmpfs",
+                "/run",
+                "--volume",
+                "/var",
+                "--volume",
+                "/lib/modules:/lib/modules:ro",
+                "--net",
+                "kind",
+                "--restart=on-failure:1",
+                "--cgroupns=private",
+                "--env",
+                "container=docker",
+                "--env",
+                "KUBECONFIG=/etc/kubernetes/admin.conf",
+            ]
+            + arguments
+        )
 
+    @traced("load_image")
     def load_image(self, image: str) -> None:
         self._exec(["load", "docker-image", image, "--name", self.cluster_name])
+
+    def _load_images(self, images: List[str], max_workers: int) -> None:
+        # kind saves all images to one archive and loads it to the nodes concurrently
+        self._exec(["load", "docker-image"] + images + ["--name", self.cluster_name])
+
+    def _node_image_ids(self) -> Set[str]:
+        nodes = docker.containers(f"io.x-k8s.kind.cluster={self.cluster_name}")
+        return set.intersection(*map(docker.node_image_ids, nodes)) if nodes else set()
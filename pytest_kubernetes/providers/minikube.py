@@ -1,5 +1,10 @@
 from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes.tracing import traced
+from pytest_kubernetes.mirror import RegistryMirror
 from pytest_kubernetes.options import ClusterOptions
+import json
+from typing import List, Set
+
 import yaml
 
 
@@ -11,13 +16,33 @@ class MinikubeManager(AClusterManager):
     def _on_delete(self) -> None:
         self._exec(["delete", "-p", self.cluster_name])
 
+    @staticmethod
+    def _registry_mirror_options(mirror: RegistryMirror) -> List[str]:
+        # the docker runtime of minikube only supports mirrors of Docker Hub
+        mirror.start()
+        return ["--registry-mirror", mirror.endpoint("host.minikube.internal")]
+
+    @traced("load_image")
     def load_image(self, image: str) -> None:
         self._exec(["image", "load", image, "-p", self.cluster_name])
 
+    def _node_image_ids(self) -> Set[str]:
+        images = json.loads(
+            self._exec(
+                ["image", "ls", "--format", "json", "-p", self.cluster_name]
+            ).stdout
+        )
+        return {
+            image["id"]
+            if image["id"].startswith("sha256:")
+            else f"sha256:{image['id']}"
+            for image in images
+        }
+
 
 class MinikubeKVM2ManagerBase(MinikubeManager):
     def _on_create(self, cluster_options: ClusterOptions, **kwargs) -> None:
-        opts = kwargs.get("options", [])
+        opts = list(kwargs.get("options", []))
 
         if cluster_options.provider_config:
             config_yaml = yaml.safe_load(cluster_options.provider_config.read_text())
@@ -47,6 +72,8 @@ class MinikubeKVM2ManagerBase(MinikubeManager):
                 "--kubernetes-version",
                 f"v{cluster_options.api_version}",
             ]
+        if cluster_options.registry_mirror:
+            opts += self._registry_mirror_options(cluster_options.registry_mirror)
 
         self._exec(
             [
@@ -61,7 +88,7 @@ class MinikubeKVM2ManagerBase(MinikubeManager):
 
 class MinikubeDockerManagerBase(MinikubeManager):
     def _on_create(self, cluster_options: ClusterOptions, **kwargs) -> None:
-        opts = kwargs.get("options", [])
+        opts = list(kwargs.get("options", []))
 
         if cluster_options.provider_config:
             config_yaml = yaml.safe_load(cluster_options.provider_config.read_text())
@@ -91,6 +118,8 @@ class MinikubeDockerManagerBase(MinikubeManager):
                 "--kubernetes-version",
                 f"v{cluster_options.api_version}",
             ]
+        if cluster_options.registry_mirror:
+            opts += self._registry_mirror_options(cluster_options.registry_mirror)
 
         self._exec(
             [
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import subprocess
+from typing import Dict, List
+
+import pytest
+
+from pytest_kubernetes.providers.base import AClusterManager
+from pytest_kubernetes.sharing import FileLock
+
+
+class ClusterRegistry:
+    """Remember kept clusters in the pytest cache, so that later sessions re-attach to them.
+
+    The kubeconfig of a registered cluster is stored in the cache directory, too. A recorded
+    cluster is reused as long as it is running and its fingerprint (provider, name,
+    Kubernetes version and provider config) did not change; otherwise it is rebuilt.
+    """
+
+    _cache_key = "pytest-kubernetes/clusters"
+
+    def __init__(self, cache: pytest.Cache) -> None:
+        self._cache = cache
+        self._root = cache.mkdir("pytest-kubernetes")
+        self._managers: List[AClusterManager] = []
+
+    @staticmethod
+    def fingerprint(manager: AClusterManager) -> str:
+        provider_config = manager._cluster_options.provider_config
+        data = {
+            "provider": type(manager).__name__,
+            "cluster_name": manager.cluster_name,
+            "api_version": manager._cluster_options.api_version,
+            "provider_config": hashlib.sha256(provider_config.read_bytes()).hexdigest()
+            if provider_config
+            else None,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def attach(self, manager: AClusterManager) -> None:
+        """Make a manager use the registered cluster with its name, rebuild it if it is stale"""
+        key = f"{type(manager).__name__}-{manager.cluster_name}"
+        kubeconfig = self._root / f"{key}.kubeconfig"
+        manager._cluster_options.kubeconfig_path = kubeconfig
+        # other processes (e.g. xdist workers) may create the same cluster concurrently
+        manager._creation_lock = FileLock(self._root / f"{key}.lock")
+        self._managers.append(manager)
+        fingerprint = self.fingerprint(manager)
+        # a cluster another process is still booting is not ready yet and must not be deleted
+        with manager._creation_lock, FileLock(self._root / "registry.lock"):
+            clusters: Dict[str, Dict] = self._cache.get(self._cache_key, {})
+            entry = clusters.get(key)
+            if (
+                entry
+                and kubeconfig.is_file()
+                and (
+                    entry["fingerprint"] != fingerprint or not manager.ready(timeout=2)
+                )
+            ):
+                # the cluster was created with another configuration or is not running anymore
+                try:
+                    manager._on_delete()
+                except subprocess.CalledProcessError:
+                    pass
+                kubeconfig.unlink(missing_ok=True)
+            clusters[key] = {
+                "cluster_name": manager.cluster_name,
+                "provider": type(manager).__name__,
+                "api_version": manager._cluster_options.api_version,
+                "kubeconfig": str(kubeconfig),
+                "fingerprint": fingerprint,
+            }
+            self._cache.set(self._cache_key, clusters)
+
+    def is_registered(self, manager: AClusterManager) -> bool:
+        return manager in self._managers
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+import hashlib
+import json
+from pathlib import Path
+import re
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+import yaml
+
+KUSTOMIZATION_FILES = ["kustomization.yaml", "kustomization.yml", "Kustomization"]
+MANIFEST_SUFFIXES = [".yaml", ".yml", ".json"]
+# a YAML mapping entry, a colon followed by a space or at the end
+_MAPPING = re.compile(r":(\s|$)")
+
+# objects of these kinds are applied in this order, everything else comes last
+KIND_ORDER = [
+    ["CustomResourceDefinition"],
+    ["Namespace"],
+    [
+        "ServiceAccount",
+        "ClusterRole",
+        "Role",
+        "ClusterRoleBinding",
+        "RoleBinding",
+        "PriorityClass",
+    ],
+    [
+        "ConfigMap",
+        "Secret",
+        "StorageClass",
+        "PersistentVolume",
+        "PersistentVolumeClaim",
+        "LimitRange",
+        "ResourceQuota",
+        "Service",
+    ],
+]
+
+ManifestInput = Union[Path, str, Dict, Iterable[Union[Path, str, Dict]]]
+
+
+@dataclass(frozen=True)
+class ObjectReference:
+    """The identity of an object in the cluster."""
+
+    api_version: str
+    kind: str
+    name: str
+    namespace: str | None = None
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict) -> "ObjectReference":
+        metadata = manifest.get("metadata", {})
+        return cls(
+            manifest["apiVersion"],
+            manifest["kind"],
+            metadata["name"],
+            metadata.get("namespace"),
+        )
+
+
+def is_kustomization(path: Path) -> bool:
+    return path.is_dir() and any((path / f).is_file() for f in KUSTOMIZATION_FILES)
+
+
+def _flatten(documents: Iterable) -> List[Dict]:
+    """Drop empty documents and expand 'kind: List' documents into their items"""
+    manifests: List[Dict] = []
+    for document in documents:
+        if not document:
+            continue
+        if not isinstance(document, dict):
+            raise RuntimeError(f"Manifest must be a mapping, was {type(document)}")
+        if document.get("kind", "").endswith("List") and "items" in document:
+            manifests.extend(_flatten(document["items"]))
+        else:
+            manifests.append(document)
+    return manifests
+
+
+def _from_path(path: Path) -> List[Dict]:
+    if path.is_dir():
+        files = sorted(
+            f for f in path.iterdir() if f.is_file() and f.suffix in MANIFEST_SUFFIXES
+        )
+    else:
+        files = [path]
+    return [m for f in files for m in _flatten(yaml.safe_load_all(f.read_text()))]
+
+
+def _is_path(value: str) -> bool:
+    # multi-line strings, flow mappings and 'key: value' mappings are YAML; everything else
+    # (including Windows paths like 'C:\manifests') is taken as a path
+    return (
+        "\n" not in value
+        and not value.lstrip().startswith("{")
+        and not _MAPPING.search(value)
+    )
+
+
+def collect_manifests(
+    input: ManifestInput,
+) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+    """Collect manifests from dicts, YAML strings, files, directories and iterables of those.
+
+    Returns the manifests as dicts, and the sources kubectl has to read itself as pairs of
+    kubectl flag and location: kustomize roots ("-k") and URLs ("-f").
+    """
+    manifests: List[Dict] = []
+    sources: List[Tuple[str, str]] = []
+    if isinstance(input, dict):
+        manifests.extend(_flatten([input]))
+    elif isinstance(input, str) and input.startswith(("http://", "https://")):
+        sources.append(("-f", input))
+    elif isinstance(input, Path) or (isinstance(input, str) and _is_path(input)):
+        path = Path(input)
+        if not path.exists():
+            raise RuntimeError(f"Manifest path '{path}' does not exist")
+        if is_kustomization(path):
+            sources.append(("-k", str(path)))
+        else:
+            manifests.extend(_from_path(path))
+    elif isinstance(input, str):
+        manifests.extend(_flatten(yaml.safe_load_all(input)))
+    elif isinstance(input, Iterable):
+        for item in input:
+            _manifests, _sources = collect_manifests(item)
+            manifests.extend(_manifests)
+            sources.extend(_sources)
+    else:
+        raise RuntimeError(
+            f"Input must be of type Path, str, dict or an iterable of those, was {type(input)}"
+        )
+    return manifests, sources
+
+
+def group_manifests(manifests: List[Dict]) -> List[List[Dict]]:
+    """Group manifests by kind in dependency order (CRDs, Namespaces, RBAC, config, the rest)"""
+    groups: List[List[Dict]] = [[] for _ in range(len(KIND_ORDER) + 1)]
+    for manifest in manifests:
+        for index, kinds in enumerate(KIND_ORDER):
+            if manifest.get("kind") in kinds:
+                groups[index].append(manifest)
+                break
+        else:
+            groups[-1].append(manifest)
+    return [group for group in groups if group]
+
+
+def fingerprints(manifests: List[Dict], sources: List[Tuple[str, str]]) -> Set[str]:
+    """Stable fingerprints of manifests and kubectl sources, to detect changes of applied content"""
+    entries = {json.dumps(manifest, sort_keys=True) for manifest in manifests}
+    for flag, location in sources:
+        content = hashlib.sha256()
+        path = Path(location)
+        if flag == "-k" and path.is_dir():
+            for f in sorted(p for p in path.rglob("*") if p.is_file()):
+                content.update(str(f.relative_to(path)).encode() + f.read_bytes())
+        entries.add(f"{flag} {location} {content.hexdigest()}")
+    return entries
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict
+
+if TYPE_CHECKING:
+    from pytest_kubernetes.providers.base import AClusterManager
+
+
+def xdist_worker() -> str | None:
+    """The id of the pytest-xdist worker this process is (e.g. 'gw3'); None without xdist"""
+    return os.environ.get("PYTEST_XDIST_WORKER")
+
+
+class FileLock:
+    """An exclusive lock on a file, held across all processes of this host"""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._file = None
+
+    def __enter__(self) -> "FileLock":
+        import fcntl
+
+        self._file = open(self._path, "a")  # type: ignore
+        fcntl.flock(self._file, fcntl.LOCK_EX)  # type: ignore
+        return self
+
+    def __exit__(self, *args) -> None:
+        import fcntl
+
+        fcntl.flock(self._file, fcntl.LOCK_UN)  # type: ignore
+        self._file.close()  # type: ignore
+        self._file = None
+
+
+class SharedClusters:
+    """Share kept clusters between the pytest-xdist workers of one test run.
+
+    All workers of a run use the same state directory. The first worker that creates a shared
+    cluster does so while holding a lock on that cluster; the other workers wait for the lock
+    and find the cluster running behind the shared kubeconfig. The state file tracks the
+    workers of the run: the last one to finish deletes all shared clusters.
+    """
+
+    def __init__(self, root: Path, worker: str) -> None:
+        self._root = root
+        self.worker = worker
+        self._keys: Dict[str, "AClusterManager"] = {}
+
+    @classmethod
+    def from_environment(cls) -> "SharedClusters | None":
+        """Get the shared clusters of this xdist run; None if not running as xdist worker"""
+        worker = xdist_worker()
+        run = os.environ.get("PYTEST_XDIST_TESTRUNUID")
+        if not worker or not run:
+            return None
+        root = Path(tempfile.gettempdir()) / f"pytest-kubernetes-{run}"
+        root.mkdir(exist_ok=True)
+        return cls(root, worker)
+
+    @property
+    def _state_file(self) -> Path:
+        return self._root / "state.json"
+
+    def _update(self, change: Callable[[Dict], None]) -> Dict:
+        with FileLock(self._root / "state.lock"):
+            state: Dict = {"workers": [], "clusters": {}}
+            if self._state_file.is_file():
+                state = json.loads(self._state_file.read_text())
+            change(state)
+            self._state_file.write_text(json.dumps(state))
+        return state
+
+    def register(self) -> None:
+        """Register this worker as running"""
+        self._update(lambda state: state["workers"].append(self.worker))
+
+    def unregister(self) -> Dict[str, Dict]:
+        """Unregister this worker; returns the shared clusters to delete if it was the last one"""
+        clusters: Dict[str, Dict] = {}
+
+        def change(state: Dict) -> None:
+            if self.worker in state["workers"]:
+                state["workers"].remove(self.worker)
+            if not state["workers"]:
+                clusters.update(state["clusters"])
+                state["clusters"] = {}
+
+        self._update(change)
+        return clusters
+
+    def shard(self, count: int) -> int:
+        """The cluster shard of this worker when sharing `count` clusters"""
+        return int(re.sub(r"\D", "", self.worker) or 0) % max(count, 1)
+
+    def make_private(self, manager: "AClusterManager") -> None:
+        """Give a cluster that is not shared a name unique to this worker"""
+        manager._cluster_options.cluster_name = f"{manager.cluster_name}-{self.worker}"
+
+    def attach(
+        self, manager: "AClusterManager", provider: str | None, clusters: int = 1
+    ) -> None:
+        """Make a manager use the shared cluster (of this worker's shard) with its name"""
+        if clusters > 1:
+            manager._cluster_options.cluster_name = (
+                f"{manager.cluster_name}-{self.shard(clusters)}"
+            )
+        key = f"{type(manager).__name__}-{manager.cluster_name}"
+        kubeconfig = self._root / f"{key}.kubeconfig"
+        manager._cluster_options.kubeconfig_path = kubeconfig
+        manager._creation_lock = FileLock(self._root / f"{key}.lock")
+        self._keys[key] = manager
+
+        def change(state: Dict) -> None:
+            state["clusters"][key] = {
+                "provider": provider,
+                "cluster_name": manager.cluster_name,
+                "kubeconfig": str(kubeconfig),
+            }
+
+        self._update(change)
+
+    def is_shared(self, manager: "AClusterManager") -> bool:
+        return manager in self._keys.values()
+
+    def close(self) -> None:
+        """Remove the state of this run, after the last worker deleted the shared clusters"""
+        shutil.rmtree(self._root, ignore_errors=True)
@@ -0,0 +1,37 @@
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from pytest_kubernetes.docker import run
+
+SNAPSHOT_REPOSITORY = "pytest-kubernetes-snapshot"
+NODE_NAME_LABEL = "pytest-kubernetes.node-name"
+
+
+def commit(container: str, image: str, state_path: str, labels: Dict[str, str]) -> None:
+    """Commit a stopped node container to an image, including the data of its state volume
+
+    'docker commit' does not capture volumes, so the content of state_path is added to the
+    image; docker populates the (anonymous) volume of a new container with it.
+    """
+    base = f"{image}-base"
+    run(["commit", container, base])
+    try:
+        with tempfile.TemporaryDirectory() as context:
+            with open(Path(context) / "state.tar", "wb") as state:
+                subprocess.run(
+                    ["docker", "cp", f"{container}:{state_path}", "-"],
+                    stdout=state,
+                    stderr=subprocess.PIPE,
+                    check=True,
+                )
+            (Path(context) / "Dockerfile").write_text(
+                f"FROM {base}\n"
+                f"ADD state.tar {Path(state_path).parent}\n"
+                + "".join(f"LABEL {k}={json.dumps(v)}\n" for k, v in labels.items())
+            )
+            run(["build", "--tag", image, context], timeout=1800)
+    finally:
+        run(["rmi", base])
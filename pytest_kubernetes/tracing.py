@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+import functools
+import subprocess
+from time import monotonic, time
+from typing import Any, Callable, Dict, Iterator, List, Protocol
+
+
+@dataclass
+class Span:
+    """A traced operation of pytest-kubernetes, like creating a cluster or a kubectl call"""
+
+    operation: str
+    provider: str | None = None
+    cluster_name: str | None = None
+    argv: List[str] | None = None
+    parent: "Span | None" = None
+    start_time: float = 0.0  # seconds since the epoch
+    duration: float | None = None  # seconds, set when the operation finished
+    exit_code: int | None = None  # of the process, for operations that run one
+    bytes_sent: int | None = None  # to the process or the API server
+    bytes_received: int | None = None  # from the process or the API server
+    error: str | None = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer(Protocol):
+    def start(self, span: Span) -> None: ...
+
+    def finish(self, span: Span) -> None: ...
+
+
+_tracers: List[Tracer] = []
+_current: ContextVar[Span | None] = ContextVar("pytest_kubernetes_span", default=None)
+
+
+def add_tracer(tracer: Tracer) -> None:
+    """Receive all spans (from all threads) from now on"""
+    _tracers.append(tracer)
+
+
+def remove_tracer(tracer: Tracer) -> None:
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def span(
+    operation: str,
+    provider: str | None = None,
+    cluster_name: str | None = None,
+    argv: List[str] | None = None,
+    **attributes,
+) -> Iterator[Span]:
+    """Trace an operation; nested spans inherit provider and cluster name of their parent"""
+    parent = _current.get()
+    _span = Span(
+        operation,
+        provider or (parent.provider if parent else None),
+        cluster_name or (parent.cluster_name if parent else None),
+        argv,
+        parent,
+        start_time=time(),
+        attributes=attributes,
+    )
+    token = _current.set(_span)
+    started = monotonic()
+    for tracer in list(_tracers):
+        tracer.start(_span)
+    try:
+        yield _span
+    except BaseException as e:
+        _span.error = str(e) or type(e).__name__
+        if isinstance(e, subprocess.CalledProcessError):
+            _span.exit_code = e.returncode
+        raise
+    finally:
+        _span.duration = monotonic() - started
+        _current.reset(token)
+        for tracer in list(_tracers):
+            tracer.finish(_span)
+
+
+def propagate(func: Callable) -> Callable:
+    """Run func (e.g. in a thread pool) in a copy of the current context, so that its spans
+    have the current span as parent"""
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        # a context cannot be entered by several threads at once
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+def traced(operation: str) -> Callable:
+    """Trace a method of a cluster manager (or an object with trace_labels) as operation"""
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with span(operation, **getattr(self, "trace_labels", {})):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+from typing import Dict, List, Tuple
+
+from pytest_kubernetes.client import KubernetesClient
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebSocket:
+    """A minimal WebSocket client (RFC 6455) on asyncio streams.
+
+    It is made for the channel protocols of the API server (exec, attach, portforward):
+    no extensions, and a message is only returned once all its fragments arrived.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        protocol: str | None = None,
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self.protocol = protocol
+        self.closed = False
+
+    @classmethod
+    async def connect(
+        cls,
+        client: KubernetesClient,
+        path: str,
+        params: Dict | None = None,
+        protocols: List[str] | None = None,
+        timeout: float = 60,
+    ) -> "WebSocket":
+        """Open a WebSocket to a path of the API server"""
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        headers = {
+            "Upgrade": "websocket",
+            "Sec-WebSocket-Version": "13",
+            "Sec-WebSocket-Key": key,
+        }
+        if protocols:
+            headers["Sec-WebSocket-Protocol"] = ", ".join(protocols)
+        reader, writer, response_headers = await client.open_upgrade(
+            path, params, headers, timeout
+        )
+        accept = base64.b64encode(
+            hashlib.sha1(key.encode("ascii") + _GUID).digest()
+        ).decode("ascii")
+        if response_headers.get("sec-websocket-accept") != accept:
+            writer.close()
+            raise RuntimeError("The API server did not accept the WebSocket upgrade")
+        return cls(reader, writer, response_headers.get("sec-websocket-protocol"))
+
+    async def send(self, data: bytes, opcode: int = OPCODE_BINARY) -> None:
+        """Send a (masked, unfragmented) frame"""
+        length = len(data)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+        mask = os.urandom(4)
+        # xor the whole payload with the repeated mask at once, as big integers
+        key = (mask * (length // 4 + 1))[:length]
+        masked = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(
+            length, "big"
+        )
+        self._writer.write(header + mask + masked)
+        await self._writer.drain()
+
+    async def _frame(self) -> Tuple[bool, int, bytes]:
+        first, second = await self._reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await self._reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await self._reader.readexactly(8))
+        # frames of the server are not masked
+        return bool(first & 0x80), first & 0x0F, await self._reader.readexactly(length)
+
+    async def receive(self) -> bytes | None:
+        """Receive the payload of the next data message; None once the WebSocket is closed"""
+        fragments: List[bytes] = []
+        try:
+            while not self.closed:
+                final, opcode, payload = await self._frame()
+                if opcode == OPCODE_CLOSE:
+                    await self.close(payload[:2])
+                    return None
+                if opcode == OPCODE_PING:
+                    await self.send(payload, OPCODE_PONG)
+                    continue
+                if opcode == OPCODE_PONG:
+                    continue
+                fragments.append(payload)
+                if final:
+                    return b"".join(fragments)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.closed = True
+            self._writer.close()
+        return None
+
+    async def close(self, code: bytes = struct.pack("!H", 1000)) -> None:
+        """Send a close frame (if not closed yet) and close the connection"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.send(code, OPCODE_CLOSE)
+        except ConnectionError:
+            pass
+        self._writer.close()
@@ -6,6 +6,30 @@ import pytest
 pytest_plugins = ["pytester"]
 
 
+class FakeCache:
+    """An in-memory stand-in for pytest's cache (config.cache)"""
+
+    def __init__(self, root: Path):
+        self._root = root
+        self.values: dict = {}
+
+    def mkdir(self, name: str) -> Path:
+        path = self._root / name
+        path.mkdir(exist_ok=True)
+        return path
+
+    def get(self, key, default):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+@pytest.fixture
+def fake_cache(tmp_path):
+    return FakeCache(tmp_path)
+
+
 @pytest.fixture(scope="session")
 def a_unique_image(request):
     name = "a-unique-image:latest"
@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from pytest_kubernetes import binaries
+
+
+@pytest.fixture
+def fake_k3d(tmp_path, monkeypatch):
+    monkeypatch.setattr(binaries, "_paths", {})
+    monkeypatch.setattr(binaries, "_outputs", {})
+    monkeypatch.setattr(binaries, "_cache", None)
+    monkeypatch.setenv("PATH", str(tmp_path))
+    binary = tmp_path / "k3d"
+    binary.write_text(
+        f"#!/bin/sh\necho run >> {tmp_path / 'runs'}\necho 'k3d version v5.6.0'\n"
+    )
+    binary.chmod(0o755)
+    return binary
+
+
+def runs(binary: Path) -> int:
+    path = binary.parent / "runs"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def test_which(fake_k3d, monkeypatch):
+    assert binaries.which("k3d") == str(fake_k3d)
+    fake_k3d.unlink()
+    # cached for this PATH
+    assert binaries.which("k3d") == str(fake_k3d)
+    monkeypatch.setenv("PATH", str(fake_k3d.parent) + os.pathsep + "/nonexistent")
+    assert binaries.which("k3d") is None
+
+
+def test_probe(fake_k3d, fake_cache):
+    binaries.use_cache(fake_cache)
+    assert binaries.probe("k3d", ["--version"]) == "k3d version v5.6.0\n"
+    assert binaries.probe("k3d", ["--version"]) == "k3d version v5.6.0\n"
+    assert runs(fake_k3d) == 1
+
+    # a later session reads the probe from the pytest cache
+    binaries._outputs.clear()
+    assert binaries.probe("k3d", ["--version"]) == "k3d version v5.6.0\n"
+    assert runs(fake_k3d) == 1
+
+    # an updated binary is probed again, the probe of the old one is dropped
+    fake_k3d.write_text(fake_k3d.read_text().replace("v5.6.0", "v5.10.0"))
+    assert binaries.probe("k3d", ["--version"]) == "k3d version v5.10.0\n"
+    assert runs(fake_k3d) == 2
+    assert list(fake_cache.values["pytest-kubernetes/binaries"].values()) == [
+        "k3d version v5.10.0\n"
+    ]
+    assert binaries.probe("kubectl", ["version"]) == ""
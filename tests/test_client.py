@@ -0,0 +1,264 @@
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import shutil
+import ssl
+import subprocess
+import threading
+from itertools import islice
+from time import monotonic, sleep
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import yaml
+
+from pytest_kubernetes.client import KubernetesClient, backoff
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """Answer requests with the responses of the server, record the requests"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(  # type: ignore
+            (url.path, parse_qs(url.query), dict(self.headers))
+        )
+        status, body = self.server.respond(url.path, parse_qs(url.query))  # type: ignore
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.server.close_connections:  # type: ignore
+            # drop the connection although the client expects it to be kept alive
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    servers = []
+
+    def start(respond, ssl_context=None):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), APIHandler)
+        if ssl_context:
+            server.socket = ssl_context.wrap_socket(server.socket, server_side=True)
+        server.requests = []  # type: ignore
+        server.respond = respond  # type: ignore
+        server.close_connections = False  # type: ignore
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def write_kubeconfig(path: Path, server: str, cluster=None, user=None) -> Path:
+    path.write_text(
+        yaml.dump(
+            {
+                "apiVersion": "v1",
+                "kind": "Config",
+                "current-context": "test",
+                "contexts": [
+                    {
+                        "name": "test",
+                        "context": {
+                            "cluster": "test",
+                            "user": "test",
+                            "namespace": "tests",
+                        },
+                    }
+                ],
+                "clusters": [
+                    {"name": "test", "cluster": {"server": server} | (cluster or {})}
+                ],
+                "users": [{"name": "test", "user": user or {}}],
+            }
+        )
+    )
+    return path
+
+
+def test_backoff():
+    delays = list(islice(backoff(1, initial=0.01, maximum=0.04), 4))
+    assert delays == [0.01, 0.02, 0.04, 0.04]
+    # the last delay is cut to the remaining time
+    start = monotonic()
+    slept = 0.0
+    for delay in backoff(0.1, initial=0.03):
+        sleep(delay)
+        slept += delay
+    assert 0.1 <= monotonic() - start < 0.2
+    assert slept < 0.11
+
+
+@pytest.mark.parametrize(
+    "user, authorization",
+    [
+        ({"token": "abc"}, "Bearer abc"),
+        ({"tokenFile": "token"}, "Bearer from-file"),
+        (
+            {"username": "admin", "password": "secret"},
+            f"Basic {base64.b64encode(b'admin:secret').decode()}",
+        ),
+    ],
+)
+def test_credentials(api_server, tmp_path, user, authorization):
+    (tmp_path / "token").write_text("from-file\n")
+    server = api_server(lambda path, query: (200, {"kind": "Namespace"}))
+    kubeconfig = write_kubeconfig(
+        tmp_path / "kubeconfig", f"http://127.0.0.1:{server.server_port}", user=user
+    )
+    client = KubernetesClient(kubeconfig)
+    assert client.namespace == "tests"
+    assert client.get("/api/v1/namespaces/tests") == {"kind": "Namespace"}
+    assert server.requests[0][2]["Authorization"] == authorization
+
+
+def test_invalid_kubeconfig(tmp_path):
+    (tmp_path / "empty").write_text("")
+    with pytest.raises(RuntimeError, match="empty or invalid"):
+        KubernetesClient(tmp_path / "empty")
+    with pytest.raises(RuntimeError, match="credential plugins"):
+        KubernetesClient(
+            write_kubeconfig(
+                tmp_path / "exec", "http://127.0.0.1", user={"exec": {"command": "x"}}
+            )
+        )
+    with pytest.raises(RuntimeError, match="Unsupported API server address"):
+        KubernetesClient(write_kubeconfig(tmp_path / "unix", "unix:///run/k8s"))
+
+
+def test_reconnect_once(api_server, tmp_path):
+    server = api_server(lambda path, query: (200, {"path": path}))
+    server.close_connections = True
+    client = KubernetesClient(
+        write_kubeconfig(
+            tmp_path / "kubeconfig", f"http://127.0.0.1:{server.server_port}"
+        )
+    )
+    # the second request is sent over the connection closed by the server, and retried
+    assert client.get("/a") == {"path": "/a"}
+    assert client.get("/b") == {"path": "/b"}
+    assert [request[0] for request in server.requests] == ["/a", "/b"]
+    server.shutdown()
+    server.server_close()
+    with pytest.raises(RuntimeError, match="failed"):
+        client.get("/c", timeout=1)
+
+
+def test_wait_for_object_relists_after_gone(api_server, tmp_path):
+    watched = []
+
+    def respond(path, query):
+        if "watch" not in query:
+            # the object appears after the second list
+            return 200, {
+                "metadata": {"resourceVersion": f"{len(watched) + 1}"},
+                "items": [],
+            }
+        watched.append(query["resourceVersion"][0])
+        if query["resourceVersion"] == ["1"]:
+            return 200, {"type": "ERROR", "object": {"code": 410, "reason": "Gone"}}
+        return 200, {"type": "ADDED", "object": {"metadata": {"name": "a"}}}
+
+    server = api_server(respond)
+    client = KubernetesClient(
+        write_kubeconfig(
+            tmp_path / "kubeconfig", f"http://127.0.0.1:{server.server_port}"
+        )
+    )
+    assert client.wait_for_object("/api/v1/namespaces/tests/pods", "a", timeout=5)
+    # the watch is resumed from the version of a new list, not the expired one
+    assert watched == ["1", "2"]
+    assert server.requests[0][1]["fieldSelector"] == ["metadata.name=a"]
+
+
+def test_wait_for_object_timeout(api_server, tmp_path):
+    server = api_server(
+        lambda path, query: (200, {"metadata": {"resourceVersion": "1"}, "items": []})
+    )
+    client = KubernetesClient(
+        write_kubeconfig(
+            tmp_path / "kubeconfig", f"http://127.0.0.1:{server.server_port}"
+        )
+    )
+    start = monotonic()
+    assert not client.wait_for_object("/api/v1/pods", "a", timeout=0.5)
+    assert monotonic() - start < 5
+
+
+def openssl(*arguments, cwd):
+    subprocess.run(["openssl", *arguments], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def certificates(tmp_path):
+    """A CA, a server certificate for 'kubernetes' and a client certificate"""
+    if not shutil.which("openssl"):
+        pytest.skip("openssl is not installed")
+    openssl(
+        "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-subj", "/CN=ca", "-keyout", "ca.key", "-out", "ca.crt",
+        cwd=tmp_path,
+    )  # fmt: skip
+    for name in ["server", "client"]:
+        openssl(
+            "req", "-newkey", "rsa:2048", "-nodes", "-subj", f"/CN={name}",
+            "-keyout", f"{name}.key", "-out", f"{name}.csr",
+            cwd=tmp_path,
+        )  # fmt: skip
+        (tmp_path / f"{name}.ext").write_text("subjectAltName=DNS:kubernetes\n")
+        openssl(
+            "x509", "-req", "-in", f"{name}.csr", "-CA", "ca.crt", "-CAkey", "ca.key",
+            "-CAcreateserial", "-days", "1", "-extfile", f"{name}.ext",
+            "-out", f"{name}.crt",
+            cwd=tmp_path,
+        )  # fmt: skip
+    return tmp_path
+
+
+def test_client_certificates(api_server, certificates):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certificates / "server.crt", certificates / "server.key")
+    context.load_verify_locations(certificates / "ca.crt")
+    context.verify_mode = ssl.CERT_REQUIRED
+    server = api_server(lambda path, query: (200, {"kind": "Status"}), context)
+    address = f"https://127.0.0.1:{server.server_port}"
+    inline = {
+        key: base64.b64encode((certificates / f"client.{ext}").read_bytes()).decode()
+        for key, ext in [("client-certificate-data", "crt"), ("client-key-data", "key")]
+    }
+    # the CA is read from a file relative to the kubeconfig, the client certificate inline
+    kubeconfig = write_kubeconfig(
+        certificates / "kubeconfig",
+        address,
+        cluster={"certificate-authority": "ca.crt", "tls-server-name": "kubernetes"},
+        user=inline,
+    )
+    assert KubernetesClient(kubeconfig).get("/version") == {"kind": "Status"}
+
+    # the certificate is not valid for the address of the server
+    write_kubeconfig(
+        kubeconfig, address, cluster={"certificate-authority": "ca.crt"}, user=inline
+    )
+    with pytest.raises(RuntimeError, match="failed"):
+        KubernetesClient(kubeconfig).get("/version", timeout=5)
+
+    # client certificate files
+    write_kubeconfig(
+        kubeconfig,
+        address,
+        cluster={"certificate-authority": "ca.crt", "tls-server-name": "kubernetes"},
+        user={"client-certificate": "client.crt", "client-key": "client.key"},
+    )
+    assert KubernetesClient(kubeconfig).get("/version") == {"kind": "Status"}
@@ -0,0 +1,393 @@
+from pathlib import Path
+import subprocess
+import sys
+import threading
+from time import sleep
+from typing import Dict, List
+
+import pytest
+import yaml
+
+from pytest_kubernetes import binaries, docker, snapshot
+from pytest_kubernetes.client import APIResource, KubernetesClient
+from pytest_kubernetes.conditions import Waiter
+from pytest_kubernetes.deletion import DeletionQueue
+from pytest_kubernetes.options import ClusterOptions
+from pytest_kubernetes.pool import ClusterPool
+from pytest_kubernetes.registry import ClusterRegistry
+from pytest_kubernetes.sharing import FileLock, SharedClusters
+from pytest_kubernetes.mirror import RegistryMirror
+from pytest_kubernetes.providers import (
+    K3dManagerBase,
+    KindManagerBase,
+    create_clusters,
+)
+
+
+class RecordingManager:
+    """Record the calls of the provider binary instead of running them"""
+
+    calls: Dict[str, List[List[str]]] = {}
+    lock = threading.Lock()
+
+    def _exec(self, arguments, additional_env={}, timeout=None):
+        with self.lock:
+            self.calls.setdefault(self.cluster_name, []).append(list(arguments))
+        if "fail" in self.cluster_name:
+            raise subprocess.CalledProcessError(1, arguments, b"", b"boom")
+        return subprocess.CompletedProcess(arguments, 0, b"", b"")
+
+    def ready(self, timeout: int = 20) -> bool:
+        return self.is_ready()
+
+    @staticmethod
+    def is_ready() -> bool:
+        return True
+
+    def _capture_baseline(self) -> None:
+        self._baseline = set()
+
+
+class StubK3dManager(RecordingManager, K3dManagerBase):
+    pass
+
+
+class StubKindManager(RecordingManager, KindManagerBase):
+    pass
+
+
+@pytest.fixture
+def stub_k3d(monkeypatch):
+    monkeypatch.setattr(binaries, "which", lambda name: sys.executable)
+    monkeypatch.setattr(
+        binaries, "probe", lambda name, arguments, timeout=10: "k3d version v5.6.0"
+    )
+    RecordingManager.calls = {}
+
+    def manager(cluster_name: str) -> StubK3dManager:
+        manager = StubK3dManager()
+        manager._cluster_options.cluster_name = cluster_name
+        return manager
+
+    return manager
+
+
+def test_create_clusters(stub_k3d):
+    managers = [stub_k3d("a"), stub_k3d("b")]
+    options = ["--agents", "1"]
+    create_clusters(managers, options=options)
+    # each cluster gets the options, but not the arguments of the other clusters
+    assert options == ["--agents", "1"]
+    for manager, other in zip(managers, reversed(managers)):
+        create = StubK3dManager.calls[manager.cluster_name][0]
+        assert create[:4] == ["cluster", "create", "--agents", "1"]
+        assert create.count(manager.cluster_name) == 1
+        assert other.cluster_name not in create
+
+
+def test_create_clusters_errors(stub_k3d):
+    with pytest.raises(ValueError):
+        create_clusters([stub_k3d("a"), stub_k3d("a")])
+    with pytest.raises(RuntimeError, match="Creating 1 of 2 clusters failed"):
+        create_clusters([stub_k3d("ok"), stub_k3d("fail")])
+
+
+def test_create_running_cluster_without_baseline(stub_k3d, tmp_path):
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text("apiVersion: v1\n")
+    manager = stub_k3d("running")
+    manager._cluster_options.kubeconfig_path = kubeconfig
+    manager.create()
+    # the cluster was not booted by this manager: no objects are listed for a baseline
+    assert "running" not in StubK3dManager.calls
+    assert manager._baseline is None
+    with pytest.raises(RuntimeError, match="no baseline"):
+        manager.reset(mode="soft")
+
+
+class SlowDeletion:
+    def __init__(self, cluster_name: str, seconds: float = 0.0, error: bool = False):
+        self.cluster_name = cluster_name
+        self.seconds = seconds
+        self.error = error
+        self.deleted = threading.Event()
+        self._pending_deletion = None
+
+    def delete(self) -> None:
+        sleep(self.seconds)
+        self.deleted.set()
+        if self.error:
+            raise RuntimeError("boom")
+
+
+def test_deletion_queue():
+    deletions = DeletionQueue()
+    first = SlowDeletion("a", seconds=0.2)
+    deletions.submit(first)
+    # a new manager for the same cluster waits for the pending deletion
+    again = SlowDeletion("a")
+    deletions.guard(again)
+    assert again._pending_deletion is not None
+    other = SlowDeletion("b")
+    deletions.guard(other)
+    assert other._pending_deletion is None
+    # deletions of the same cluster run one after the other
+    deletions.submit(again)
+    again.deleted.wait(5)
+    assert first.deleted.is_set()
+    deletions.submit(SlowDeletion("c", error=True))
+    # the failure of a deletion is reported, although another one is chained to it
+    deletions.submit(SlowDeletion("c"))
+    deletions.submit(SlowDeletion("d", seconds=2))
+    problems = deletions.join(timeout=0.5)
+    assert sorted(problems) == [
+        "Deleting cluster 'c' failed: boom",
+        "Deleting cluster 'd' did not finish in time",
+    ]
+
+
+def test_registry_attach(stub_k3d, fake_cache):
+    registry = ClusterRegistry(fake_cache)
+    manager = stub_k3d("kept")
+    registry.attach(manager)
+    assert registry.is_registered(manager)
+    # the cluster is booted with the kubeconfig of the registry
+    manager.kubeconfig.write_text("apiVersion: v1\n")
+
+    registry.attach(stub_k3d("kept"))
+    assert "kept" not in StubK3dManager.calls
+
+    # another Kubernetes version: the recorded cluster is stale
+    stale = stub_k3d("kept")
+    stale._cluster_options.api_version = "1.20.0"
+    registry.attach(stale)
+    assert StubK3dManager.calls["kept"] == [["cluster", "delete", "kept"]]
+    assert not stale.kubeconfig.exists()
+
+
+def test_registry_attach_waits_for_boot(stub_k3d, fake_cache, tmp_path, monkeypatch):
+    registry = ClusterRegistry(fake_cache)
+    registry.attach(stub_k3d("kept"))
+    booted = threading.Event()
+    monkeypatch.setattr(StubK3dManager, "is_ready", booted.is_set)
+    locked = threading.Event()
+
+    def boot():
+        # another process boots the cluster while holding its creation lock
+        with FileLock(tmp_path / "pytest-kubernetes" / "StubK3dManager-kept.lock"):
+            (
+                tmp_path / "pytest-kubernetes" / "StubK3dManager-kept.kubeconfig"
+            ).write_text("apiVersion: v1\n")
+            locked.set()
+            sleep(0.3)
+            booted.set()
+
+    thread = threading.Thread(target=boot)
+    thread.start()
+    locked.wait(5)
+    registry.attach(stub_k3d("kept"))
+    thread.join()
+    assert "kept" not in StubK3dManager.calls
+
+
+def test_cache_dir_of_unreachable_cluster(stub_k3d, tmp_path, monkeypatch):
+    manager = stub_k3d("unreachable")
+    manager._cluster_options.cache_dir = tmp_path / "cache"
+    manager._cluster_options.kubeconfig_path = tmp_path / "kubeconfig"
+    manager.kubeconfig.write_text("apiVersion: v1\n")
+    lookups = []
+
+    def server_identity():
+        lookups.append(1)
+        raise subprocess.TimeoutExpired("kubectl version", 5)
+
+    monkeypatch.setattr(manager, "_server_identity", server_identity)
+    assert manager._kubectl_cache_dir() is None
+    assert manager._kubectl_cache_dir() is None
+    # the failed lookup is not repeated on every call
+    assert len(lookups) == 1
+    monkeypatch.setattr(
+        manager, "_server_identity", lambda: ("https://0.0.0.0:6443", "v1.25.3+k3s1")
+    )
+    manager._cache_dir_failure = None
+    assert manager._kubectl_cache_dir().name.endswith("-v1.25.3_k3s1")
+
+
+def test_cluster_pool(stub_k3d, monkeypatch):
+    resets = []
+
+    def soft_reset(manager, timeout):
+        resets.append(manager.cluster_name)
+        if manager.cluster_name == "pool-pool-1":
+            raise RuntimeError("stuck finalizer")
+
+    monkeypatch.setattr(StubK3dManager, "_soft_reset", soft_reset)
+    pool = ClusterPool(StubK3dManager, "pool", 2)
+    pool.start()
+    first, second = pool.acquire(timeout=5), pool.acquire(timeout=5)
+    assert {first.cluster_name, second.cluster_name} == {"pool-pool-0", "pool-pool-1"}
+    # a pooled cluster is running already and can't be created differently
+    first.create()
+    with pytest.raises(RuntimeError, match="pooled cluster"):
+        first.create(cluster_options=ClusterOptions(api_version="1.30.0"))
+    with pytest.raises(RuntimeError, match="pooled cluster"):
+        first.create(options=["--agents", "1"])
+
+    pool.release(first)
+    pool.release(second)
+    recycled = {pool.acquire(timeout=5).cluster_name for _ in range(2)}
+    # pool-1 could not be reset, it was deleted and replaced by pool-2
+    assert recycled == {"pool-pool-0", "pool-pool-2"}
+    assert ["cluster", "delete", "pool-pool-1"] in StubK3dManager.calls["pool-pool-1"]
+    assert sorted(resets) == ["pool-pool-0", "pool-pool-1"]
+    pool.close()
+    for name in recycled:
+        assert StubK3dManager.calls[name][-1] == ["cluster", "delete", name]
+
+
+def test_cluster_pool_failed_boot(stub_k3d):
+    pool = ClusterPool(StubK3dManager, "fail", 1)
+    pool.start()
+    with pytest.raises(RuntimeError, match="Creating a pooled cluster failed"):
+        pool.acquire(timeout=5)
+    # the slot of the failed cluster is lost, later tests don't wait for it
+    with pytest.raises(RuntimeError, match="Creating a pooled cluster failed"):
+        pool.acquire(timeout=5)
+    assert pool._managers == []
+    pool.close()
+
+
+def test_registry_mirror(stub_k3d, monkeypatch):
+    started = []
+    monkeypatch.setattr(RegistryMirror, "start", lambda mirror: started.append(mirror))
+    monkeypatch.setattr(RegistryMirror, "connect", lambda mirror, network: None)
+    configs = []
+    record = RecordingManager._exec
+
+    def record_config(self, arguments, additional_env={}, timeout=None):
+        # the configuration files only exist while the cluster is created
+        for flag in ["--registry-config", "--config"]:
+            if flag in arguments:
+                path = Path(arguments[arguments.index(flag) + 1])
+                configs.append(path.read_text())
+        return record(self, arguments, additional_env, timeout)
+
+    monkeypatch.setattr(RecordingManager, "_exec", record_config)
+    mirror = RegistryMirror(port=5555)
+
+    k3d = stub_k3d("mirrored")
+    k3d.create(cluster_options=ClusterOptions(registry_mirror=mirror))
+    assert started == [mirror]
+    assert configs[-1] == (
+        'mirrors:\n  "docker.io":\n    endpoint:\n'
+        '      - "http://host.k3d.internal:5555"\n'
+    )
+
+    kind = StubKindManager()
+    kind._cluster_options.cluster_name = "mirrored"
+    kind.create(cluster_options=ClusterOptions(registry_mirror=mirror))
+    assert started == [mirror, mirror]
+    assert yaml.safe_load(configs[-1])["containerdConfigPatches"] == [
+        '[plugins."io.containerd.grpc.v1.cri".registry.mirrors."docker.io"]\n'
+        '  endpoint = ["http://pytest-kubernetes-mirror:5000"]\n'
+    ]
+
+
+def test_shared_clusters(stub_k3d, tmp_path):
+    root = tmp_path / "run"
+    root.mkdir()
+    workers = [SharedClusters(root, "gw0"), SharedClusters(root, "gw1")]
+    for worker in workers:
+        worker.register()
+    managers = [stub_k3d("pytest"), stub_k3d("pytest")]
+    for worker, manager in zip(workers, managers):
+        worker.attach(manager, "k3d")
+        assert worker.is_shared(manager)
+    # all workers use the same cluster
+    assert managers[0].kubeconfig == managers[1].kubeconfig
+    private = stub_k3d("pytest")
+    workers[1].make_private(private)
+    assert private.cluster_name == "pytest-gw1"
+    assert not workers[1].is_shared(private)
+    # spread over two clusters
+    sharded = [stub_k3d("pytest"), stub_k3d("pytest")]
+    for worker, manager in zip(workers, sharded):
+        worker.attach(manager, "k3d", clusters=2)
+    assert [m.cluster_name for m in sharded] == ["pytest-0", "pytest-1"]
+
+    # the last worker gets the shared clusters to delete
+    assert workers[0].unregister() == {}
+    clusters = workers[1].unregister()
+    assert sorted(c["cluster_name"] for c in clusters.values()) == [
+        "pytest",
+        "pytest-0",
+        "pytest-1",
+    ]
+    assert all(c["provider"] == "k3d" for c in clusters.values())
+    workers[1].close()
+    assert not root.exists()
+
+
+def test_wait_needs_condition(stub_k3d):
+    with pytest.raises(ValueError, match="needs a condition"):
+        stub_k3d("pytest").wait("pod/x")
+
+
+def test_wait_transport(stub_k3d, tmp_path, monkeypatch):
+    manager = stub_k3d("pytest")
+    manager._cluster_options.kubeconfig_path = tmp_path / "kubeconfig"
+    manager.kubeconfig.write_text(
+        yaml.dump(
+            {
+                "current-context": "pytest",
+                "contexts": [{"name": "pytest", "context": {"cluster": "pytest"}}],
+                "clusters": [
+                    {"name": "pytest", "cluster": {"server": "http://127.0.0.1:1"}}
+                ],
+            }
+        )
+    )
+    waited = []
+    monkeypatch.setattr(
+        manager, "_kubectl_wait", lambda *args: waited.append(("kubectl", args[:2]))
+    )
+    monkeypatch.setattr(
+        KubernetesClient,
+        "resource",
+        lambda client, name: APIResource("", "v1", "pods", "Pod", True),
+    )
+    monkeypatch.setattr(
+        Waiter,
+        "wait",
+        lambda waiter, timeout: waited.append(("native", len(waiter._targets))),
+    )
+    # kubectl wait is used unless the native client is enabled
+    manager.wait("pod/a", "condition=Ready")
+    assert waited == [("kubectl", ("pod/a", "condition=Ready"))]
+    manager._cluster_options.native_client = True
+    manager.wait("pod/a", "condition=Ready")
+    assert waited[-1] == ("native", 1)
+
+
+def test_restore_with_registry_mirror(stub_k3d, monkeypatch):
+    monkeypatch.setattr(RegistryMirror, "start", lambda mirror: None)
+    monkeypatch.setattr(
+        docker,
+        "image_labels",
+        lambda image: {
+            "pytest-kubernetes.token": "token",
+            snapshot.NODE_NAME_LABEL: "node",
+        },
+    )
+    manager = stub_k3d("restored")
+    options = ["--agents", "0"]
+    manager._on_restore(
+        "snapshot:latest",
+        ClusterOptions(registry_mirror=RegistryMirror(port=5555)),
+        options=options,
+    )
+    # a restored cluster pulls through the mirror like a created one
+    create = StubK3dManager.calls["restored"][0]
+    assert create[:5] == ["cluster", "create", "--agents", "0", "restored"]
+    assert "--registry-config" in create
+    assert options == ["--agents", "0"]
@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from pytest_kubernetes.logs import LogStream
+
+
+class FakeProcess:
+    def __init__(self, stdout: bytes, returncode: int = 0, stderr: bytes = b""):
+        self.stdout = io.BytesIO(stdout)
+        self.stderr = io.BytesIO(stderr)
+        self.returncode = returncode
+        self.terminated = False
+
+    def wait(self) -> int:
+        return self.returncode
+
+    def terminate(self) -> None:
+        self.terminated = True
+
+
+class FakeKubectl:
+    """Start a fake kubectl process per call of popen() instead of the kubectl binary"""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.calls = []
+
+    def popen(self, arguments):
+        self.calls.append(arguments)
+        return self.processes[arguments[1]]
+
+
+def test_kubectl_logs():
+    kubectl = FakeKubectl(
+        {
+            "a": FakeProcess(b"first\nsecond\n"),
+            "b": FakeProcess(b"third\n"),
+        }
+    )
+    stream = LogStream(
+        [("a", "app"), ("b", "app")],
+        "tests",
+        follow=True,
+        since="5m",
+        tail=10,
+        timeout=5,
+        kubectl=kubectl,  # type: ignore
+    )
+    with stream:
+        lines = list(stream)
+    # the lines of each source keep their order, the sources are merged
+    assert [line for line in lines if "pod/a" in line] == [
+        "[pod/a/app] first",
+        "[pod/a/app] second",
+    ]
+    assert sorted(lines)[-1] == "[pod/b/app] third"
+    assert sorted(kubectl.calls) == [
+        ["logs", pod, "--container", "app", "--namespace", "tests", "--follow"]
+        + ["--since=300s", "--tail=10"]
+        for pod in ["a", "b"]
+    ]
+    assert all(process.terminated for process in kubectl.processes.values())
+
+
+def test_kubectl_logs_failed():
+    kubectl = FakeKubectl(
+        {"a": FakeProcess(b"", returncode=1, stderr=b'pods "a" not found')}
+    )
+    stream = LogStream([("a", "app")], timeout=5, kubectl=kubectl)  # type: ignore
+    with pytest.raises(RuntimeError, match='logs of a failed: pods "a" not found'):
+        list(stream)
+    with pytest.raises(ValueError):
+        LogStream([("a", "app")])
@@ -0,0 +1,60 @@
+import pytest
+
+from pytest_kubernetes.native import NativeKubectl, parse_arguments
+
+
+@pytest.mark.parametrize(
+    "args,expected",
+    [
+        (["get", "pods"], (["get", "pods"], {})),
+        (
+            ["get", "pod/a", "-n", "ns", "-o", "json"],
+            (["get", "pod/a"], {"namespace": "ns", "output": "json"}),
+        ),
+        (
+            [
+                "wait",
+                "deployments/x",
+                "--for=condition=Available=True",
+                "--timeout=90s",
+            ],
+            (
+                ["wait", "deployments/x"],
+                {"for": "condition=Available=True", "timeout": "90s"},
+            ),
+        ),
+        (
+            ["get", "pods", "-A", "-l", "'app=web'"],
+            (["get", "pods"], {"all_namespaces": "true", "selector": "app=web"}),
+        ),
+        (
+            ["apply", "--server-side", "--force-conflicts", "-f", "a.yaml"],
+            (
+                ["apply"],
+                {
+                    "server_side": "true",
+                    "force_conflicts": "true",
+                    "filename": "a.yaml",
+                },
+            ),
+        ),
+        (
+            ["delete", "pod", "a", "--ignore-not-found"],
+            (["delete", "pod", "a"], {"ignore_not_found": "true"}),
+        ),
+        # unknown flags are left to kubectl
+        (["get", "pods", "--watch"], None),
+        (["logs", "a", "--previous"], None),
+    ],
+)
+def test_parse_arguments(args, expected):
+    assert parse_arguments(args) == expected
+
+
+def test_client_side_apply_falls_back(tmp_path):
+    manifest = tmp_path / "cm.yaml"
+    manifest.write_text("apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: a\n")
+    # without --server-side, kubectl reports 'created' or 'configured'; not run natively
+    native = NativeKubectl(None)  # type: ignore
+    assert native(["apply", "-f", str(manifest)], as_dict=False) is None
+    assert native(["apply", "-f", str(manifest), "--prune"], as_dict=False) is None
@@ -6,7 +6,7 @@ def test_vendor_fixture_cases(testdir):
     # testdir is a pytest fixture
     vendor_test = (Path(__file__).parent / Path("./vendor.py")).resolve()
     result = testdir.runpytest(vendor_test, "--k8s-cluster-name", "kubernetes-plugin")
-    result.assert_outcomes(passed=9)
+    result.assert_outcomes(passed=10)
     # assert no cluster is running
     process = subprocess.run(
         ["docker", "ps", "--format", '\'{"Names":"{{ .Names }}"}\''],
@@ -14,3 +14,142 @@ def test_vendor_fixture_cases(testdir):
         universal_newlines=True,
     )
     assert "pytest-kubernetes-plugin" not in process.stdout
+
+
+def test_k8s_durations(testdir):
+    testdir.makepyfile(
+        """
+        from pytest_kubernetes import tracing
+
+        def test_repetitive():
+            for i in range(12):
+                with tracing.span("kubectl", argv=["kubectl", "get", f"pod/p{i}"]):
+                    pass
+            with tracing.span("wait"):
+                with tracing.span("kubectl", argv=["kubectl", "wait", "pods"]):
+                    pass
+        """
+    )
+    result = testdir.runpytest("--k8s-durations=5")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*cluster time per test phase*",
+            "*call*test_k8s_durations.py::test_repetitive",
+            "*(13 kubectl calls in total)",
+            "*repetitive kubectl calls*",
+            "test_k8s_durations.py::test_repetitive (call): 12x 'kubectl get pod'",
+        ]
+    )
+    assert "kubectl 12x" in result.stdout.str()
+    assert "wait 1x" in result.stdout.str()
+
+
+def test_k8s_namespace_creates_kept_cluster(testdir):
+    testdir.makeconftest(
+        """
+        import pytest
+        from pytest_kubernetes.providers.base import AClusterManager
+
+        class StubManager(AClusterManager):
+            @classmethod
+            def get_binary_name(cls):
+                return "stub"
+
+            def _ensure_executable(self):
+                pass
+
+            def _on_create(self, cluster_options, **kwargs):
+                cluster_options.kubeconfig_path.write_text("apiVersion: v1\\n")
+
+            def _on_delete(self):
+                pass
+
+            def load_image(self, image):
+                pass
+
+            def ready(self, timeout=20):
+                return True
+
+            def kubectl(self, *args, **kwargs):
+                return ""
+
+            def _wait_for_service_account(self, namespace, timeout=30):
+                return True
+
+            def _capture_baseline(self):
+                self._baseline = set()
+
+        @pytest.fixture(scope="session")
+        def k8s_manager():
+            return lambda provider=None: StubManager
+        """
+    )
+    testdir.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.k8s(keep=True)
+        def test_kept(k8s):
+            # the kept cluster is not created by this test
+            assert k8s.kubeconfig is None
+
+        def test_namespace(k8s_namespace):
+            assert k8s_namespace.namespace.startswith("pytest-test-namespace-")
+            assert k8s_namespace.kubeconfig.read_text() == "apiVersion: v1\\n"
+        """
+    )
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=2)
+
+
+def test_operation_hooks(testdir):
+    testdir.makeconftest(
+        """
+        from pytest_kubernetes import durations
+
+        def pytest_k8s_operation_start(span):
+            span.attributes["started"] = True
+
+        def pytest_k8s_operation_finish(span):
+            # the test phase the operation ran in, set by the runtest wrappers
+            span.attributes["phase"] = durations._phase.get()
+        """
+    )
+    testdir.makepyfile(
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import pytest
+        from pytest_kubernetes import tracing
+
+        @pytest.fixture
+        def cluster():
+            with tracing.span("create", provider="k3d", cluster_name="pytest"):
+                pass
+
+        def kubectl_get():
+            with tracing.span("kubectl", argv=["kubectl", "get", "pods"]):
+                pass
+
+        def test_operations(cluster):
+            with tracing.span("wait", provider="k3d", cluster_name="pytest"):
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    executor.submit(tracing.propagate(kubectl_get)).result()
+        """
+    )
+    reprec = testdir.inline_run("--k8s-durations=0")
+    reprec.assertoutcome(passed=1)
+    nodeid = "test_operation_hooks.py::test_operations"
+    started = [call.span for call in reprec.getcalls("pytest_k8s_operation_start")]
+    finished = [call.span for call in reprec.getcalls("pytest_k8s_operation_finish")]
+    assert [span.operation for span in started] == ["create", "wait", "kubectl"]
+    assert [span.operation for span in finished] == ["create", "kubectl", "wait"]
+    create, kubectl, wait = finished
+    assert all(span.attributes["started"] for span in finished)
+    assert all(span.duration is not None for span in finished)
+    assert create.attributes["phase"] == (nodeid, "setup")
+    assert wait.attributes["phase"] == (nodeid, "call")
+    # the span of another thread keeps its parent, cluster and phase
+    assert kubectl.parent is wait
+    assert (kubectl.provider, kubectl.cluster_name) == ("k3d", "pytest")
+    assert kubectl.attributes["phase"] == (nodeid, "call")
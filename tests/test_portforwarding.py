@@ -0,0 +1,94 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from pytest_kubernetes.portforwarding import PortForwarding
+
+
+class FakeProcess:
+    def __init__(self, output: str, returncode: int | None = None):
+        self.stdout = io.BytesIO(output.encode("utf-8"))
+        self.returncode = returncode
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    def terminate(self) -> None:
+        self.returncode = self.returncode or -15
+
+    def wait(self, timeout=None) -> int:
+        return self.returncode  # type: ignore
+
+
+@pytest.fixture
+def kubectl_port_forward(monkeypatch):
+    """Replace the kubectl processes by fake ones printing the given outputs"""
+    calls = []
+
+    def start(*outputs: str, returncode: int | None = None):
+        processes = iter(outputs)
+
+        def _exec(forwarding, arguments):
+            calls.append(arguments)
+            return FakeProcess(next(processes), returncode)
+
+        monkeypatch.setattr(PortForwarding, "_exec", _exec)
+        return calls
+
+    return start
+
+
+def forwarding_output(*pairs) -> str:
+    # kubectl prints a line for IPv4 and one for IPv6 for each port
+    return "".join(
+        f"Forwarding from 127.0.0.1:{local} -> {target}\n"
+        f"Forwarding from [::1]:{local} -> {target}\n"
+        for local, target in pairs
+    )
+
+
+def test_local_ports(kubectl_port_forward):
+    calls = kubectl_port_forward(
+        forwarding_output((41234, 80), (9090, 80)),
+        forwarding_output((41234, 80), (9090, 80)),
+    )
+    forwarding = PortForwarding(
+        "svc/web", [(None, 80), (9090, 80)], kubeconfig=Path("kubeconfig"), timeout=5
+    )
+    with forwarding:
+        assert calls[0][:4] == ["port-forward", "svc/web", "--namespace", "default"]
+        assert calls[0][4:6] == [":80", "9090:80"]
+        # two local ports for the same target port
+        assert forwarding.local_ports == {(0, 80): 41234, (9090, 80): 9090}
+        assert forwarding.local_port == 41234
+        # the random local port is kept
+        forwarding.restart()
+        assert calls[1][4:6] == ["41234:80", "9090:80"]
+        assert forwarding.local_ports == {(41234, 80): 41234, (9090, 80): 9090}
+    assert not forwarding.started
+    with pytest.raises(RuntimeError, match="not started"):
+        forwarding.local_ports
+
+
+def test_forwarding_failed(kubectl_port_forward):
+    kubectl_port_forward(
+        "error: unable to forward port because pod is not running. Current status=Pending\n",
+        returncode=1,
+    )
+    forwarding = PortForwarding("pod/a", (8080, 80), kubeconfig=Path("kubeconfig"))
+    with pytest.raises(RuntimeError, match="pod is not running"):
+        forwarding.start()
+    assert not forwarding.started
+
+
+def test_forwarding_error_after_start(kubectl_port_forward):
+    kubectl_port_forward(
+        forwarding_output((8080, 80))
+        + "E1017 portforward.go:409] an error occurred forwarding 8080 -> 80: lost\n"
+    )
+    forwarding = PortForwarding("pod/a", (8080, 80), kubeconfig=Path("kubeconfig"))
+    forwarding.start()
+    forwarding._reader.join(5)  # type: ignore
+    assert not forwarding.healthy()
+    forwarding.stop()
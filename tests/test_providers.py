@@ -1,10 +1,14 @@
+import asyncio
 from pathlib import Path
+import subprocess
 from time import sleep
 from typing import Type
 
 import pytest
 
+from pytest_kubernetes import tracing
 from pytest_kubernetes.options import ClusterOptions
+from pytest_kubernetes.resources import ObjectReference
 from pytest_kubernetes.providers import (
     AClusterManager,
     K3dManagerBase,
@@ -42,6 +46,21 @@ class KubernetesManagerTest:
         self.cluster.kubectl(["get", "nodes"])
         assert kubeconfig1 != kubeconfig2
 
+    def test_b_soft_reset_cluster(self):
+        self.cluster.create()
+        self.cluster.apply(
+            (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()
+        )
+        kubeconfig = self.cluster.kubeconfig
+        self.cluster.reset(mode="soft")
+        assert self.cluster.kubeconfig == kubeconfig
+        data = self.cluster.kubectl(["get", "deployments"])
+        assert len(data["items"]) == 0
+        with pytest.raises(RuntimeError):
+            self.cluster.kubectl(["get", "ns", "commands"])
+        # objects of the fresh cluster are kept
+        self.cluster.kubectl(["get", "sa", "default"])
+
     def test_c_apply_yaml_file(self):
         self.cluster.create()
         self.cluster.apply(
@@ -51,6 +70,30 @@ class KubernetesManagerTest:
         assert len(data["items"]) == 1
         assert data["items"][0]["metadata"]["name"] == "hello-nginxdemo"
 
+    def test_c_tracing(self):
+        spans = []
+
+        class Collector:
+            def start(self, span):
+                pass
+
+            def finish(self, span):
+                spans.append(span)
+
+        collector = Collector()
+        tracing.add_tracer(collector)
+        try:
+            self.cluster.create()
+            self.cluster.kubectl(["get", "nodes"])
+        finally:
+            tracing.remove_tracer(collector)
+        create = next(span for span in spans if span.operation == "create")
+        assert create.error is None and create.duration > 0
+        assert create.cluster_name == self.cluster.cluster_name
+        kubectl = spans[-1]
+        assert kubectl.operation == "kubectl" and kubectl.parent is None
+        assert kubectl.argv[:3] == ["kubectl", "get", "nodes"]
+
     def test_c_apply_data(self):
         self.cluster.create()
         # apply a configmap from dict
@@ -67,6 +110,103 @@ class KubernetesManagerTest:
         assert configmap["data"]["key"] == "value"
         assert configmap["metadata"]["uid"] is not None
 
+    def test_c_apply_batch(self):
+        self.cluster.create()
+        applied = self.cluster.apply(
+            [
+                {
+                    "apiVersion": "v1",
+                    "kind": "ConfigMap",
+                    "data": {"key": 'it\'s "quoted"'},
+                    "metadata": {"name": "myconfigmap"},
+                },
+                "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: second\n"
+                "---\napiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: third\n",
+                (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve(),
+            ],
+            force_conflicts=True,
+        )
+        assert ObjectReference("v1", "ConfigMap", "third", "default") in applied
+        assert ObjectReference("v1", "Namespace", "commands") in applied
+        assert len(applied) == 8
+        configmap = self.cluster.kubectl(["get", "configmap", "myconfigmap"])
+        assert configmap["data"]["key"] == 'it\'s "quoted"'
+
+    def test_c_apply_many(self):
+        self.cluster.create()
+        applied = self.cluster.apply_many(
+            [
+                {
+                    "apiVersion": "v1",
+                    "kind": "ConfigMap",
+                    "metadata": {"name": f"config-{i}", "namespace": "commands"},
+                }
+                for i in range(10)
+            ]
+            + [(Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()]
+        )
+        # the namespace is applied before the objects it contains
+        assert applied[0] == ObjectReference("v1", "Namespace", "commands")
+        assert len(applied) == 15
+        data = self.cluster.kubectl(["get", "configmaps", "-n", "commands"])
+        assert (
+            len(
+                [
+                    c
+                    for c in data["items"]
+                    if c["metadata"]["name"].startswith("config-")
+                ]
+            )
+            == 10
+        )
+
+    def test_c_async(self):
+        async def main():
+            await self.cluster.acreate()
+            nodes, _ = await asyncio.gather(
+                self.cluster.akubectl(["get", "nodes"]),
+                self.cluster.aapply(
+                    (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()
+                ),
+            )
+            assert len(nodes["items"]) == 1
+            await self.cluster.await_for(
+                "deployments/hello-nginxdemo", "condition=Available=True"
+            )
+            lines = [
+                line
+                async for line in self.cluster.alogs_stream(
+                    label_selector="app=hello-nginx"
+                )
+            ]
+            assert lines
+
+        asyncio.run(main())
+
+    def test_c_wait_many(self):
+        self.cluster.create()
+        self.cluster.apply(
+            (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()
+        )
+        self.cluster.wait(
+            [
+                ("deployments/hello-nginxdemo", "condition=Available=True"),
+                ("deployments/hello-nginxdemo", "rollout"),
+                ("ns/commands", "jsonpath='{.status.phase}'=Active"),
+            ]
+        )
+        self.cluster.apply(
+            {
+                "apiVersion": "v1",
+                "kind": "Pod",
+                "metadata": {"name": "broken"},
+                "spec": {"containers": [{"name": "broken", "image": "invalid image"}]},
+            }
+        )
+        # a pod with an invalid image never becomes ready
+        with pytest.raises(RuntimeError, match="InvalidImageName"):
+            self.cluster.wait("pod/broken", "condition=Ready", timeout=60)
+
     def test_e_load_image_read_logs(self, a_unique_image):
         self.cluster.create()
         self.cluster.load_image(a_unique_image)
@@ -116,6 +256,28 @@ class KubernetesManagerTest:
         assert response.status == 200
         forwarding_nginx.stop()
 
+        with self.cluster.port_forwarding(
+            "svc/hello-nginx", target_port=80
+        ) as forwarding_nginx:
+            assert forwarding_nginx.local_ports == {
+                (0, 80): forwarding_nginx.local_port
+            }
+            response = urllib.request.urlopen(
+                f"http://127.0.0.1:{forwarding_nginx.local_port}", timeout=20
+            )
+            assert response.status == 200
+
+        forwarding_nginx = self.cluster.port_forwarding(
+            "svc/hello-nginx", target_port=80, shared=True
+        )
+        with self.cluster.port_forwarding(
+            "svc/hello-nginx", target_port=80, shared=True
+        ) as shared_forwarding:
+            assert shared_forwarding is forwarding_nginx
+        assert forwarding_nginx.healthy()
+        self.cluster.stop_port_forwardings()
+        assert not forwarding_nginx.healthy()
+
     def test_d_logs_namespace(self):
         self.cluster.create()
         self.cluster.apply(
@@ -156,6 +318,23 @@ class KubernetesManagerTest:
         else:
             raise exception
 
+    def test_d_logs_stream(self):
+        self.cluster.create()
+        self.cluster.apply(
+            (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()
+        )
+        self.cluster.wait("deployments/hello-nginxdemo", "condition=Available=True")
+        line = self.cluster.assert_log_contains(
+            'using the "epoll" event method',
+            timeout=30,
+            label_selector="app=hello-nginx",
+        )
+        assert not line.startswith("[pod/")
+        with self.cluster.logs_stream(
+            label_selector="app=hello-nginx", tail=1
+        ) as stream:
+            assert len(list(stream)) == 1
+
     def teardown_method(self, method):
         self.cluster.delete()
 
@@ -163,9 +342,38 @@ class KubernetesManagerTest:
         self.cluster = self.manager(self.cluster_name)
 
 
+def assert_snapshot_restore(test: KubernetesManagerTest) -> None:
+    seed = (Path(__file__).parent / Path("./fixtures/hello.yaml")).resolve()
+    test.cluster.create(from_snapshot="hello", seed=seed)
+    image = test.cluster.snapshot("hello")
+    test.cluster.delete()
+    try:
+        test.cluster = test.manager(test.cluster_name)
+        test.cluster.create(from_snapshot="hello", seed=seed)
+        assert test.cluster.restored
+        # the seeded objects are restored
+        test.cluster.kubectl(["get", "ns", "commands"])
+    finally:
+        # the restored cluster is deleted in teardown_method
+        subprocess.run(["docker", "rmi", "--force", image])
+
+
+def assert_load_images_skips_present(test: KubernetesManagerTest, image: str) -> None:
+    test.cluster.create()
+    assert test.cluster.load_images([image]) == [image]
+    # the node already has this image
+    assert test.cluster.load_images([image]) == []
+
+
 class Testk3d(KubernetesManagerTest):
     manager = K3dManagerBase
 
+    def test_snapshot_restore(self):
+        assert_snapshot_restore(self)
+
+    def test_load_images(self, a_unique_image):
+        assert_load_images_skips_present(self, a_unique_image)
+
     def test_custom_cluster_config(self):
         self.cluster.create(
             cluster_options=ClusterOptions(
@@ -180,9 +388,25 @@ class Testk3d(KubernetesManagerTest):
         assert cluster_name == "k3d-pytest-k3d-cluster"
 
 
+class Testk3dNativeClient(KubernetesManagerTest):
+    """The common tests with kubectl verbs and port forwarding run in-process"""
+
+    manager = K3dManagerBase
+
+    def setup_method(self, method):
+        self.cluster = self.manager(self.cluster_name)
+        self.cluster._cluster_options.native_client = True
+
+
 class Testkind(KubernetesManagerTest):
     manager = KindManagerBase
 
+    def test_snapshot_restore(self):
+        assert_snapshot_restore(self)
+
+    def test_load_images(self, a_unique_image):
+        assert_load_images_skips_present(self, a_unique_image)
+
     def test_custom_cluster_config(self):
         self.cluster.create(
             cluster_options=ClusterOptions(
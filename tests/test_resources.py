@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_kubernetes.resources import collect_manifests
+
+
+def test_collect_single_line_yaml():
+    manifests, _ = collect_manifests(
+        "{apiVersion: v1, kind: ConfigMap, metadata: {name: a}}"
+    )
+    assert manifests[0]["metadata"]["name"] == "a"
+    # a mapping is YAML, not a path that does not exist
+    manifests, _ = collect_manifests("kind: ConfigMap")
+    assert manifests == [{"kind": "ConfigMap"}]
+
+
+def test_collect_path(tmp_path):
+    manifest = tmp_path / "cm.yaml"
+    manifest.write_text("apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: a\n")
+    assert collect_manifests(str(manifest)) == collect_manifests(Path(manifest))
+    with pytest.raises(RuntimeError, match="does not exist"):
+        collect_manifests(str(tmp_path / "missing.yaml"))
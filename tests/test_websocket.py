@@ -0,0 +1,91 @@
+import asyncio
+import struct
+
+from pytest_kubernetes.websocket import (
+    OPCODE_BINARY,
+    OPCODE_CLOSE,
+    OPCODE_CONTINUATION,
+    OPCODE_PING,
+    OPCODE_PONG,
+    OPCODE_TEXT,
+    WebSocket,
+)
+
+
+async def read_client_frame(reader: asyncio.StreamReader):
+    first, second = await reader.readexactly(2)
+    assert second & 0x80, "client frames must be masked"
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def server_frame(payload: bytes, opcode: int, final: bool = True) -> bytes:
+    first = (0x80 if final else 0) | opcode
+    if len(payload) < 126:
+        return struct.pack("!BB", first, len(payload)) + payload
+    return struct.pack("!BBH", first, 126, len(payload)) + payload
+
+
+def run_with_server(handler, client):
+    async def main():
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await client(WebSocket(reader, writer))
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_send_masks_frames():
+    payloads = [b"", b"hello", bytes(range(256)) * 2, b"x" * 70000]
+    received = []
+
+    async def handler(reader, writer):
+        for _ in payloads:
+            received.append(await read_client_frame(reader))
+        writer.close()
+
+    async def client(websocket):
+        for payload in payloads:
+            await websocket.send(payload)
+        await asyncio.sleep(0.1)
+
+    run_with_server(handler, client)
+    assert received == [(OPCODE_BINARY, payload) for payload in payloads]
+
+
+def test_receive_fragments_ping_and_close():
+    pongs = []
+
+    async def handler(reader, writer):
+        writer.write(server_frame(b"\x00hel", OPCODE_TEXT, final=False))
+        writer.write(server_frame(b"p" * 200, OPCODE_CONTINUATION, final=False))
+        # control frames may be sent between fragments
+        writer.write(server_frame(b"are you there", OPCODE_PING))
+        writer.write(server_frame(b"!", OPCODE_CONTINUATION))
+        writer.write(server_frame(struct.pack("!H", 1000), OPCODE_CLOSE))
+        pongs.append(await read_client_frame(reader))
+        pongs.append(await read_client_frame(reader))
+        writer.close()
+
+    async def client(websocket):
+        messages = [await websocket.receive(), await websocket.receive()]
+        await asyncio.sleep(0.1)
+        return messages, websocket.closed
+
+    messages, closed = run_with_server(handler, client)
+    assert messages == [b"\x00hel" + b"p" * 200 + b"!", None]
+    assert closed
+    assert pongs == [
+        (OPCODE_PONG, b"are you there"),
+        (OPCODE_CLOSE, struct.pack("!H", 1000)),
+    ]
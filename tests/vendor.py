@@ -1,5 +1,6 @@
 from pathlib import Path
 import subprocess
+from time import monotonic, sleep
 
 import pytest
 
@@ -24,11 +25,20 @@ def test_a_feature_with_k3d(k8s: AClusterManager):
 
 
 def test_b_cluster_deleted():
-    process = subprocess.run(
-        ["docker", "ps", "--format", '\'{"Names":"{{ .Names }}"}\''],
-        stdout=subprocess.PIPE,
-        universal_newlines=True,
-    )
+    # the cluster of test_a is deleted in the background
+    deadline = monotonic() + 120
+    while True:
+        process = subprocess.run(
+            ["docker", "ps", "--format", '\'{"Names":"{{ .Names }}"}\''],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if (
+            "k3d-pytest-kubernetes-plugin" not in process.stdout
+            or monotonic() > deadline
+        ):
+            break
+        sleep(1)
     assert "k3d-pytest-kubernetes-plugin" not in process.stdout
 
 
@@ -119,6 +129,20 @@ def test_g_prepopulated_cluster_kept(k8s_with_workload: AClusterManager):
         k8s.kubectl(["get", "deployment", "hello-nginxdemo"])
 
 
+def test_h_isolated_namespace(k8s_namespace: AClusterManager):
+    assert k8s_namespace.namespace.startswith("pytest-test-h-isolated-namespace-")
+    k8s_namespace.apply(
+        {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "data": {"key": "value"},
+            "metadata": {"name": "myconfigmap"},
+        },
+    )
+    configmap = k8s_namespace.kubectl(["get", "configmap", "myconfigmap"])
+    assert configmap["metadata"]["namespace"] == k8s_namespace.namespace
+
+
 @pytest.mark.k8s(provider="minikube", keep=True)
 def test_z_feature_with_minikube(k8s: AClusterManager):
     assert k8s.get_binary_name() == "minikube"